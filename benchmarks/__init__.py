@@ -0,0 +1 @@
+"""Benchmarks of the collection hot path, see `python -m benchmarks --help`."""
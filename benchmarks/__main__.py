@@ -0,0 +1,228 @@
+"""
+Run the benchmarks of the collection hot path and print their results as JSON.
+
+    python -m benchmarks --incidents 5000 --series 20000 --output results.json
+    python -m benchmarks --baseline results.json
+
+Every benchmark is run `--repeat` times and reports the minimum, median, mean and
+maximum duration of a run in seconds. With `--baseline`, the median of every benchmark
+is compared to the results of a previous run.
+"""
+import json
+import platform
+import statistics
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from benchmarks.payloads import generate_labeled_rows, generate_splunk_incidents
+from benchmarks.stub_server import StubServer
+from collectington.collectington_api import (
+    CollectingtonApi,
+    datastore_view,
+    enable_delta_metric,
+    register_metric,
+    register_metric_class,
+)
+from collectington.metric_table import MetricTable
+from collectington.runner import process_request
+
+SERVICE_NAME = "benchmark"
+NAME_OF_DATASTORE = "incidents"
+
+SERVICE_CONFIG = {
+    "prometheus_metrics_mapping": {
+        "counter": ["number_of_incidents"],
+        "gauge": ["incidents_per_team", "series"],
+        "summary": ["transitions_per_incident"],
+    },
+    "prometheus_metric_labels": {
+        "incidents_per_team": ["team"],
+        "series": ["team", "stack"],
+    },
+}
+
+
+@register_metric_class
+class BenchmarkApi(CollectingtonApi):
+    """A service shaped like the Splunk example, which polls the stub server."""
+
+    def __init__(self, api_url):
+        super().__init__()
+        self.config = {"services": {SERVICE_NAME: SERVICE_CONFIG}}
+        self.service_name = SERVICE_NAME
+        self.api_url = api_url
+        self.name_of_datastore = NAME_OF_DATASTORE
+        self.registry = CollectorRegistry()
+
+    @register_metric("number_of_incidents")
+    @enable_delta_metric
+    def get_number_of_incidents(self):
+        """Return the total number of incidents."""
+        return self.get_data_from_store(self.name_of_datastore)["total"]
+
+    @datastore_view(NAME_OF_DATASTORE)
+    def incidents_per_team(self, response):
+        """Count the incidents paged to every team."""
+        counts = {}
+
+        for incident in response["incidents"]:
+            for team in incident["pagedTeams"]:
+                counts[team] = counts.get(team, 0) + 1
+
+        return counts
+
+    @register_metric("incidents_per_team")
+    def get_incidents_per_team(self):
+        """Return the number of incidents of every team."""
+        counts = self.incidents_per_team()
+
+        return [{"team": team, "value": count} for team, count in counts.items()]
+
+    @register_metric("transitions_per_incident")
+    def get_transitions_per_incident(self):
+        """Return the mean number of transitions of an incident."""
+        incidents = self.get_data_from_store(self.name_of_datastore)["incidents"]
+
+        return statistics.mean(len(incident["transitions"]) for incident in incidents)
+
+
+def time_runs(func, repeat):
+    """Return the duration of `repeat` runs of a function, after a warm up run."""
+    func()
+    durations = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return {
+        "runs": repeat,
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.mean(durations),
+        "max": max(durations),
+    }
+
+
+def run_benchmarks(number_of_incidents, number_of_series, repeat):
+    """Run every benchmark and return their results by name."""
+    payload = json.dumps(generate_splunk_incidents(number_of_incidents)).encode()
+    rows = generate_labeled_rows(number_of_series)
+    table = MetricTable(
+        labels={
+            "team": [row["team"] for row in rows],
+            "stack": [row["stack"] for row in rows],
+        },
+        values=[row["value"] for row in rows],
+    )
+    results = {}
+
+    with StubServer(payload) as server:
+        service = BenchmarkApi(server.url)
+        metrics_list = [
+            metric
+            for metrics in SERVICE_CONFIG["prometheus_metrics_mapping"].values()
+            for metric in metrics
+            if metric != "series"
+        ]
+        instances = service.generate_prometheus_metric_instances()
+
+        results["read_data"] = time_runs(
+            lambda: service.read_data(server.url, {}, {}), repeat
+        )
+
+        service.get_data_from_store(NAME_OF_DATASTORE)
+        results["get_data_from_store_cached"] = time_runs(
+            lambda: service.get_data_from_store(NAME_OF_DATASTORE), repeat
+        )
+
+        def get_data_from_store_uncached():
+            service.invalidate_datastore(NAME_OF_DATASTORE)
+            service.get_data_from_store(NAME_OF_DATASTORE)
+
+        results["get_data_from_store_uncached"] = time_runs(
+            get_data_from_store_uncached, repeat
+        )
+
+        def process_request_uncached():
+            service.invalidate_datastore(NAME_OF_DATASTORE)
+            process_request(service, metrics_list, instances)
+
+        results["process_request_uncached"] = time_runs(
+            process_request_uncached, repeat
+        )
+        results["process_request_cached"] = time_runs(
+            lambda: process_request(service, metrics_list, instances), repeat
+        )
+
+        results["call_prometheus_metrics_dicts"] = time_runs(
+            lambda: service.call_prometheus_metrics({"series": rows}, instances),
+            repeat,
+        )
+        results["call_prometheus_metrics_table"] = time_runs(
+            lambda: service.call_prometheus_metrics({"series": table}, instances),
+            repeat,
+        )
+
+        results["exposition"] = time_runs(
+            lambda: generate_latest(service.registry), repeat
+        )
+
+    return results
+
+
+def compare(results, baseline):
+    """Print the change of the median of every benchmark against a baseline."""
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        change = result["median"] / baseline[name]["median"] - 1
+        print(f"{name}: {change:+.1%}", file=sys.stderr)
+
+
+def main():
+    """Run the benchmarks from the command line."""
+    parser = ArgumentParser(description="Benchmark the collection hot path.")
+    parser.add_argument(
+        "--incidents", type=int, default=1000, help="incidents in the payload"
+    )
+    parser.add_argument(
+        "--series", type=int, default=10000, help="series of the labeled metric"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="runs per benchmark")
+    parser.add_argument("--output", type=str, help="write the results to a file")
+    parser.add_argument(
+        "--baseline", type=str, help="compare the results to a previous output"
+    )
+    args = parser.parse_args()
+
+    output = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "incidents": args.incidents,
+            "series": args.series,
+            "repeat": args.repeat,
+        },
+        "results": run_benchmarks(args.incidents, args.series, args.repeat),
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(output, file, indent=2)
+    else:
+        print(json.dumps(output, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            compare(output["results"], json.load(file)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Generators of synthetic API payloads."""
+import random
+
+from datetime import datetime, timedelta, timezone
+
+PHASES = ["UNACKED", "ACKED", "RESOLVED"]
+TRANSITIONS = ["triggered", "acknowledged", "resolved"]
+
+
+def generate_splunk_incidents(number_of_incidents, number_of_teams=10, seed=0):
+    """
+    Return a payload shaped like the Splunk On-Call incident report, with
+    `number_of_incidents` incidents paged to `number_of_teams` teams. The payload is the
+    same for a given seed.
+    """
+    rand = random.Random(seed)
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    incidents = []
+
+    for number in range(number_of_incidents):
+        alert_id = f"alert-{number}"
+        phase = rand.randrange(len(PHASES))
+        triggered_at = start + timedelta(seconds=rand.randrange(86400))
+        transitions = []
+        at = triggered_at
+
+        for name in TRANSITIONS[: phase + 1]:
+            transitions.append(
+                {
+                    "name": name,
+                    "at": at.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "alertId": alert_id,
+                    "by": "system",
+                }
+            )
+            at += timedelta(seconds=rand.randrange(60, 3600))
+
+        incidents.append(
+            {
+                "incidentNumber": str(number),
+                "startTime": triggered_at.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "currentPhase": PHASES[phase],
+                "entityDisplayName": f"Service {rand.randrange(100)} is down",
+                "pagedTeams": [f"team-{rand.randrange(number_of_teams)}"],
+                "transitions": transitions,
+            }
+        )
+
+    return {
+        "offset": 0,
+        "limit": number_of_incidents,
+        "total": number_of_incidents,
+        "incidents": incidents,
+    }
+
+
+def generate_labeled_rows(number_of_series, seed=0):
+    """Return the list of dicts of a labeled metric with `number_of_series` series."""
+    rand = random.Random(seed)
+
+    return [
+        {
+            "team": f"team-{number % 100}",
+            "stack": f"stack-{number // 100}",
+            "value": rand.randrange(1000),
+        }
+        for number in range(number_of_series)
+    ]
@@ -0,0 +1,48 @@
+"""A local HTTP server that answers every request with the same payload."""
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer every GET request with the payload of the server."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, with Nagle's algorithm the body of a
+    # kept-alive connection waits for the delayed ACK of the headers (about 40ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Send the payload, keeping the connection alive."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.server.payload)))
+        self.end_headers()
+        self.wfile.write(self.server.payload)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Do not log every request."""
+
+
+class StubServer:
+    """
+    Serve a payload on a local port for the duration of a `with` block:
+
+        with StubServer(b'{"total": 1}') as server:
+            requests.get(server.url)
+    """
+
+    def __init__(self, payload):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.payload = payload
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
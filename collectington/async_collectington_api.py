@@ -0,0 +1,364 @@
+"""Module to define what an asyncio API class should do and what it should look like."""
+import asyncio
+import time
+
+from collectington.cache import MISS, STALE
+from collectington.collectington_api import (
+    _METRIC_READS,
+    MISSING,
+    CollectingtonApi,
+    _get_delta_metric,
+)
+from collectington.exceptions.collection_exceptions import RateLimitedException
+from collectington.logger import setup_logging
+from collectington.pagination import PageResponse, create_pagination
+from collectington.transport import DEFAULT_TRANSPORT_CONFIG
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp is an optional dependency
+    aiohttp = None
+
+LOGGER = setup_logging()
+
+
+class AsyncCollectingtonApi(CollectingtonApi):
+    """
+    This class is the asyncio variant of CollectingtonApi.
+
+    `read_data`, `get_data_from_store` and `get_metric` are coroutines, so metric methods
+    of its subclasses must be coroutines as well and await the datastore:
+
+        @register_metric("number_of_incidents")
+        async def get_number_of_incidents(self):
+            response = await self.get_data_from_store(self.name_of_datastore)
+            return response["total"]
+
+    `iter_datastore_records` is an async generator, read with `async for`.
+
+    Every service run by the async runner shares one aiohttp session, which limits the
+    number of open connections of the whole process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # set by the async runner
+        self.http_session = None
+        self._datastore_locks = {}
+        self._refresh_tasks = {}
+
+    def get_request_timeout(self):
+        """Create the request timeout from the `transport` block of the service config."""
+        transport = {
+            **DEFAULT_TRANSPORT_CONFIG,
+            **self.config["services"][self.service_name].get("transport", {}),
+        }
+
+        return aiohttp.ClientTimeout(
+            sock_connect=transport["connect_timeout"],
+            sock_read=transport["read_timeout"],
+        )
+
+    async def read_data(self, url, params, headers):
+        """Request data from API.
+        Return API response.
+        """
+        _, _, body = await self.request(url, params, headers)
+
+        return self.decode(body)
+
+    async def request(self, url, params, headers, not_modified=False):
+        """
+        Send a GET request to the API and return the status code, the headers and the
+        body of the response. An HttpStatusException is raised for any response that is
+        not a success, or a `304 Not Modified` when `not_modified` is set.
+        """
+        governor = self.get_request_governor(url, headers)
+
+        # a metric that calls the API itself is not memoized, see get_metric
+        reads = _METRIC_READS.get()
+        if reads is not None:
+            reads.append((None, None))
+
+        if governor is not None:
+            await asyncio.sleep(self._reserve_request(governor))
+
+        async with self.http_session.get(
+            url, params=params, headers=headers, timeout=self.get_request_timeout()
+        ) as response:
+            body = await response.read()
+
+        collector_metrics = self.get_collector_metrics()
+        collector_metrics.http_responses.labels(
+            self.service_name, response.status
+        ).inc()
+        collector_metrics.http_response_bytes.labels(self.service_name).inc(len(body))
+
+        if governor is not None:
+            self._check_throttled(governor, response.status, response.headers)
+
+        self._check_status(response.status, not_modified)
+
+        return response.status, response.headers, body
+
+    async def fetch_page(self, url, params, headers):
+        """Request a page of a paginated datastore."""
+        return PageResponse(*await self.request(url, params, headers))
+
+    async def iter_datastore_records(self, name_of_datastore):
+        """
+        Yield the records of a datastore one by one, page after page, so metric methods
+        can aggregate them without holding more than a page in memory. Every page is
+        decoded whole, `stream` only applies to threaded services. Records are not
+        cached, every call reads the API again.
+        """
+        pagination = self.get_pagination(name_of_datastore) or create_pagination(
+            {}, self.decode
+        )
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+
+        async for record in pagination.iter_records_async(
+            lambda url, params: self.fetch_page(url, params, headers),
+            api_url,
+            self.get_datastore_params(name_of_datastore),
+        ):
+            yield record
+
+    async def get_data_from_store(self, name_of_datastore):
+        """
+        Instead of having to call an API for every metric, different metrics can
+        share the same response data(cache) before expiry.
+
+        Metrics are awaited concurrently, so only the first one reads the data while the
+        others wait for it. A stale datastore is served while it is refreshed in the
+        background.
+        """
+        reads = _METRIC_READS.get()
+        # the API calls of the datastore are not reads of the metric
+        token = _METRIC_READS.set(None)
+
+        try:
+            value = await self._read_datastore(name_of_datastore)
+        finally:
+            _METRIC_READS.reset(token)
+
+        if reads is not None:
+            reads.append((name_of_datastore, value))
+
+        return value
+
+    async def _read_datastore(self, name_of_datastore):
+        """Return a datastore from the cache, calling the API when it is missing."""
+        ttl, stale_ttl = self.get_datastore_ttl(name_of_datastore)
+        key = self.get_datastore_cache_key(name_of_datastore)
+        data_store = self.get_data_store()
+
+        value, state = data_store.lookup(key, ttl, stale_ttl)
+
+        self.get_collector_metrics().datastore_cache_requests.labels(
+            self.service_name, name_of_datastore, state
+        ).inc()
+
+        if state == STALE and not self._refresh_tasks.get(key):
+            self._refresh_tasks[key] = asyncio.ensure_future(
+                self._refresh_stale_datastore(name_of_datastore, key)
+            )
+
+        if state != MISS:
+            return value
+
+        lock = self._datastore_locks.setdefault(key, asyncio.Lock())
+
+        async with lock:
+            value, state = data_store.lookup(key, ttl, stale_ttl)
+
+            if state == MISS:
+                loaded_at = time.monotonic()
+
+                try:
+                    value = await self.fetch_datastore(name_of_datastore)
+                except RateLimitedException as err:
+                    return self.get_last_datastore(name_of_datastore, err)
+
+                data_store.store(key, value, loaded_at)
+
+        return value
+
+    async def fetch_datastore(self, name_of_datastore):
+        """
+        Load a datastore and record how long it took. A datastore whose API keeps failing
+        is not called until its circuit breaker resets.
+        """
+        circuit_breaker = self._before_fetch(name_of_datastore)
+
+        try:
+            with self.get_collector_metrics().datastore_fetch_seconds.labels(
+                self.service_name, name_of_datastore
+            ).time():
+                value = await self.load_datastore(name_of_datastore)
+        except BaseException as err:  # including a cancellation by a metric timeout
+            self._after_fetch(name_of_datastore, circuit_breaker, err)
+            raise
+
+        self._after_fetch(name_of_datastore, circuit_breaker)
+
+        return value
+
+    async def load_datastore(self, name_of_datastore):
+        """
+        Call the API to get the data of a datastore. Every page of a paginated
+        datastore is gathered into the first page.
+        """
+        pagination = self.get_pagination(name_of_datastore)
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+        params = self.get_datastore_params(name_of_datastore)
+
+        if pagination is not None:
+            value = await pagination.collect_async(
+                lambda url, params: self.fetch_page(url, params, headers),
+                api_url,
+                params,
+            )
+
+            return self.merge_datastore(name_of_datastore, value)
+
+        revalidation = self.get_datastore_revalidation(name_of_datastore)
+
+        if revalidation is not None:
+            return await self.revalidate_datastore(
+                name_of_datastore, revalidation, params
+            )
+
+        value = await self.read_data(api_url, params, headers)
+
+        return self.merge_datastore(name_of_datastore, value)
+
+    async def revalidate_datastore(self, name_of_datastore, revalidation, params):
+        """
+        Call the API with the validators of the last response of a datastore, and
+        return the last datastore if it did not change.
+        """
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+        status, headers, body = await self.request(
+            api_url, params, revalidation.get_headers(headers), not_modified=True
+        )
+        reason, body_hash = revalidation.check(status, headers, body)
+
+        if reason is not None:
+            self.get_collector_metrics().datastore_unchanged.labels(
+                self.service_name, name_of_datastore, reason
+            ).inc()
+            return revalidation.value
+
+        value = self.merge_datastore(name_of_datastore, self.decode(body))
+        revalidation.update(headers, body_hash, value)
+
+        return value
+
+    async def prefetch_datastores(self):
+        """
+        Read every expired datastore concurrently at the start of a cycle. A datastore
+        that fails to be read is reported by the metrics that need it.
+        """
+        names_of_datastores = self.get_expired_datastores()
+
+        results = await asyncio.gather(
+            *(
+                self.get_data_from_store(name_of_datastore)
+                for name_of_datastore in names_of_datastores
+            ),
+            return_exceptions=True,
+        )
+
+        for name_of_datastore, result in zip(names_of_datastores, results):
+            if isinstance(result, Exception):
+                LOGGER.warning("Failed to prefetch %s: %s", name_of_datastore, result)
+
+    async def refresh_datastore(self, name_of_datastore):
+        """
+        Call the API and cache the data of a datastore, whether it has expired or not.
+        A refresh that is rate limited is skipped.
+        """
+        loaded_at = time.monotonic()
+
+        try:
+            value = await self.fetch_datastore(name_of_datastore)
+        except RateLimitedException as err:
+            LOGGER.warning("Skipping refresh of %s: %s", name_of_datastore, err)
+            return
+
+        self.get_data_store().store(
+            self.get_datastore_cache_key(name_of_datastore), value, loaded_at
+        )
+
+    async def _refresh_stale_datastore(self, name_of_datastore, key):
+        """Refresh a stale datastore in the background."""
+        try:
+            await self.refresh_datastore(name_of_datastore)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.error("Failed to refresh datastore %s: %s", name_of_datastore, err)
+        finally:
+            self._refresh_tasks.pop(key, None)
+
+    async def get_metric(self, metric):
+        """
+        This method takes an argument which is a metric name defined in config and will
+        key in the value to metric_registry dictionary to get the correct metric coroutine.
+        """
+
+        evaluation_seconds = self.get_collector_metrics().metric_evaluation_seconds
+
+        try:
+            metric_func = getattr(
+                self.__class__, self.__class__._metric_registry[metric]
+            )
+            delta_metric = getattr(metric_func, "_delta_metric", False)
+            if delta_metric:
+                metric_func = metric_func.__wrapped__
+
+            value = await self._get_memoized_metric(metric)
+
+            if value is MISSING:
+                # a metric can be evaluated by another metric
+                outer_reads = _METRIC_READS.get()
+                reads = []
+                token = _METRIC_READS.set(reads)
+
+                try:
+                    with evaluation_seconds.labels(self.service_name, metric).time():
+                        value = await metric_func(self)
+                finally:
+                    _METRIC_READS.reset(token)
+                    if outer_reads is not None:
+                        outer_reads.extend(reads)
+
+                self._memoize_metric(metric, reads, value)
+        except (IndexError, KeyError) as err:
+            # Certain errors occur due to issues with API calls, the metric keeps its
+            # last value and is marked stale rather than being published as 0.
+            LOGGER.error("Failed to evaluate %s: %r", metric, err)
+            self.record_error("metric", err)
+            return MISSING
+
+        if delta_metric:
+            return _get_delta_metric(self, metric_func.__name__, value)
+
+        return value
+
+    async def _get_memoized_metric(self, metric):
+        """
+        Return the last value of a metric if none of the datastores it read changed
+        since, or MISSING.
+        """
+        memo = self._metric_memos.get(metric)
+
+        if memo is None:
+            return MISSING
+
+        reads, value = memo
+
+        for name_of_datastore, datastore in reads:
+            if await self.get_data_from_store(name_of_datastore) is not datastore:
+                return MISSING
+
+        return value
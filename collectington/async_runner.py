@@ -0,0 +1,190 @@
+"""File to run services on a single asyncio event loop."""
+import asyncio
+import sys
+import time
+import traceback
+
+from functools import partial
+
+from collectington.async_collectington_api import AsyncCollectingtonApi, aiohttp
+from collectington.collectington_api import MISSING
+from collectington.logger import setup_logging
+from collectington.scheduler import Job
+
+LOGGER = setup_logging()
+
+DEFAULT_ASYNC_HTTP_CONFIG = {
+    "connection_limit": 100,
+    "connection_limit_per_host": 10,
+}
+
+
+async def evaluate_metric(service, metric, metric_timeout):
+    """
+    Await a metric coroutine, a metric that times out or fails is reported as missing.
+    """
+    try:
+        return metric, await asyncio.wait_for(
+            service.get_metric(metric), metric_timeout
+        )
+    except asyncio.TimeoutError:
+        LOGGER.warning("Metric timed out and is reported as missing: %s", metric)
+        return metric, MISSING
+    except Exception as err:  # pylint: disable=broad-except
+        LOGGER.error("Failed to evaluate %s: %s", metric, err)
+        service.record_error("metric", err)
+        return metric, MISSING
+
+
+async def process_request_async(service_runner):
+    """
+    Receive request for an API service.
+
+    The metrics of an async service are awaited concurrently and published together.
+    Services that are not async are processed in a worker thread so they do not block
+    the event loop.
+    """
+    service = service_runner.service
+
+    if not isinstance(service, AsyncCollectingtonApi):
+        await asyncio.get_running_loop().run_in_executor(None, service_runner.process)
+        return
+
+    start = time.monotonic()
+
+    await service.prefetch_datastores()
+    results = await asyncio.gather(
+        *(
+            evaluate_metric(service, metric, service_runner.metric_timeout)
+            for metric in service_runner.metrics_list
+        )
+    )
+    metric_values = {
+        metric: metric_value
+        for metric, metric_value in results
+        if metric_value is not MISSING
+    }
+
+    successful = service.publish_metric_values(
+        metric_values, service_runner.metric_instances_list
+    )
+
+    service_runner.record_cycle(time.monotonic() - start, successful)
+
+
+async def refresh_datastore_async(service_runner, name_of_datastore):
+    """Refresh a datastore that has a schedule of its own."""
+    service = service_runner.service
+
+    if isinstance(service, AsyncCollectingtonApi):
+        await service.refresh_datastore(name_of_datastore)
+    else:
+        await asyncio.get_running_loop().run_in_executor(
+            None, service.refresh_datastore, name_of_datastore
+        )
+
+
+async def run_async_cycle(service_runner, name_of_datastore=None):
+    """
+    Try to process an API request, or to refresh a single datastore. A cycle that fails
+    is counted and reported, and the service is tried again on its next tick.
+    """
+    try:
+        if name_of_datastore is None:
+            await process_request_async(service_runner)
+        else:
+            await refresh_datastore_async(service_runner, name_of_datastore)
+    except Exception as err:  # pylint: disable=broad-except
+        traceback.print_exc()
+        LOGGER.error("Error has occurred in %s: %s", service_runner.service_name, err)
+        service_runner.service.record_error("cycle", err)
+
+
+def create_jobs(service_runners):
+    """
+    Create a job for every service, and for every datastore with its own interval.
+    Services collected on scrape have no jobs.
+    """
+    jobs = []
+
+    for service_runner in service_runners:
+        if service_runner.scrape_driven:
+            continue
+
+        jobs.append(
+            Job(
+                service_runner.service_name,
+                service_runner.interval,
+                partial(run_async_cycle, service_runner),
+                service_runner.jitter,
+            )
+        )
+
+        for name_of_datastore, interval in service_runner.datastore_intervals.items():
+            jobs.append(
+                Job(
+                    f"{service_runner.service_name}-{name_of_datastore}",
+                    interval,
+                    partial(run_async_cycle, service_runner, name_of_datastore),
+                    service_runner.jitter,
+                )
+            )
+
+    return jobs
+
+
+async def run_job_async(job):
+    """Run a job once, then on every tick of its schedule."""
+    scheduled_at = time.time()
+
+    while True:
+        await job.func()
+
+        next_tick = job.next_tick(time.time())
+        job.count_skipped_ticks(scheduled_at, next_tick)
+        scheduled_at = next_tick
+
+        await asyncio.sleep(max(0, scheduled_at - time.time()))
+
+
+async def run_async(service_runners, async_http_config, jobs=()):
+    """
+    Poll every service on one event loop. Async services share a single aiohttp session
+    so the connection limits apply to the whole process.
+
+    `jobs` are run next to the services, their function must return an awaitable.
+    """
+    options = {**DEFAULT_ASYNC_HTTP_CONFIG, **(async_http_config or {})}
+
+    connector = aiohttp.TCPConnector(
+        limit=options["connection_limit"],
+        limit_per_host=options["connection_limit_per_host"],
+    )
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for service_runner in service_runners:
+            if isinstance(service_runner.service, AsyncCollectingtonApi):
+                service_runner.service.http_session = session
+
+        jobs = [*create_jobs(service_runners), *jobs]
+
+        if not jobs:
+            # services collected on scrape are run by the HTTP servers
+            await asyncio.Event().wait()
+
+        await asyncio.gather(*(run_job_async(job) for job in jobs))
+
+
+def run_event_loop(service_runners, async_http_config=None, jobs=()):
+    """Run every service, and the given jobs, on the event loop until an error occurs."""
+    if aiohttp is None:
+        raise ImportError(
+            "aiohttp is required for the async engine: pip install collectington[async]"
+        )
+
+    try:
+        asyncio.run(run_async(service_runners, async_http_config, jobs))
+    except Exception as err:
+        traceback.print_exc()
+        LOGGER.error("Error has occurred: %s", err)
+        sys.exit(1)
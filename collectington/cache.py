@@ -0,0 +1,190 @@
+"""Module that caches API responses (datastores) so metrics can share them."""
+import threading
+import time
+
+from collections import OrderedDict
+
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+DEFAULT_CACHE_CONFIG = {
+    "ttl": None,  # defaults to CollectingtonApi.data_store_expiration_sec
+    "stale_while_revalidate": 0,
+    "max_entries": 128,
+    "shared": False,
+    "revalidate": False,
+}
+
+# datastores expire this fraction of their time to live early, so a datastore read on a
+# schedule with an interval equal to its time to live is read again on every tick
+EXPIRY_SLACK = 0.05
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class CacheEntry:
+    """A cached datastore and the time its load started at."""
+
+    __slots__ = ("value", "loaded_at")
+
+    def __init__(self, value, loaded_at):
+        self.value = value
+        self.loaded_at = loaded_at
+
+
+class _Flight:
+    """A datastore load in progress, which concurrent callers wait for."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class DatastoreCache:
+    """
+    A bounded cache of datastores with a time to live for every key.
+
+    - Concurrent misses of the same key are de-duplicated: a single caller loads the
+      datastore while the others wait for its result (single-flight).
+    - An expired datastore can still be served for `stale_ttl` seconds while it is
+      refreshed in the background (stale-while-revalidate).
+    - When the cache is full, the least recently used datastore is evicted.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_CONFIG["max_entries"]):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key, ttl, stale_ttl=0):
+        """
+        Return the cached value of a key and whether it is fresh, stale or missing.
+        A value expires a fraction `EXPIRY_SLACK` of its `ttl` early.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None, MISS
+
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry.loaded_at
+
+        ttl *= 1 - EXPIRY_SLACK
+
+        if age < ttl:
+            return entry.value, FRESH
+
+        if age < ttl + stale_ttl:
+            return entry.value, STALE
+
+        return None, MISS
+
+    def store(self, key, value, loaded_at=None):
+        """
+        Cache the value of a key, evicting the least recently used keys if full.
+        `loaded_at` is the monotonic time the load of the value started at, and defaults
+        to now.
+        """
+        if loaded_at is None:
+            loaded_at = time.monotonic()
+
+        with self._lock:
+            self._entries[key] = CacheEntry(value, loaded_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key):
+        """Return the last value of a key whether it has expired or not, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+        return None if entry is None else entry.value
+
+    def invalidate(self, key):
+        """Remove a key from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get(self, key, loader, ttl, stale_ttl=0, on_lookup=None, name=None):
+        """
+        Return the value of a key, calling `loader` to load it when it is missing or
+        expired. A stale value is returned right away and refreshed in the background.
+
+        `on_lookup` is called with the result of the lookup (fresh, stale or miss).
+        Failed loads are logged with `name`, which defaults to the key: keys of the
+        shared cache are built from requests and are not meant to be logged.
+        """
+        value, state = self.lookup(key, ttl, stale_ttl)
+
+        if on_lookup is not None:
+            on_lookup(state)
+
+        if state == FRESH:
+            return value
+
+        if state == STALE:
+            flight, is_loader = self._join_flight(key)
+            if is_loader:
+                threading.Thread(
+                    target=self._load,
+                    args=(key, loader, flight, name or key),
+                    name="collectington-cache-refresh",
+                    daemon=True,
+                ).start()
+            return value
+
+        flight, is_loader = self._join_flight(key)
+
+        if is_loader:
+            self._load(key, loader, flight, name or key)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+
+        return flight.value
+
+    def _join_flight(self, key):
+        """Return the load in progress for a key and whether the caller must run it."""
+        with self._lock:
+            flight = self._flights.get(key)
+
+            if flight is not None:
+                return flight, False
+
+            flight = self._flights[key] = _Flight()
+
+            return flight, True
+
+    def _load(self, key, loader, flight, name):
+        """Load the value of a key and hand it over to every waiting caller."""
+        # the age of a value counts from the start of its load, as the data is as old as
+        # the request, however long the response took
+        loaded_at = time.monotonic()
+
+        try:
+            flight.value = loader()
+            self.store(key, flight.value, loaded_at)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.error("Failed to load datastore %s: %s", name, err)
+            flight.error = err
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+# datastores of services that opt into sharing responses for the same request
+SHARED_CACHE = DatastoreCache()
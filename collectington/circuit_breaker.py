@@ -0,0 +1,84 @@
+"""Module that stops calling upstreams that keep failing."""
+import threading
+import time
+
+from collectington.exceptions.collection_exceptions import CircuitOpenException
+
+DEFAULT_CIRCUIT_BREAKER_CONFIG = {
+    "failure_threshold": 5,
+    "reset_timeout": 60,
+}
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing, so a broken API is not hammered and
+    metrics that depend on it fail right away instead of waiting for timeouts.
+
+    After `failure_threshold` failures in a row the circuit opens, and calls fail with a
+    CircuitOpenException for `reset_timeout` seconds. A single call is then let through:
+    the circuit closes if it succeeds, and opens again if it fails.
+    """
+
+    def __init__(
+        self,
+        failure_threshold=DEFAULT_CIRCUIT_BREAKER_CONFIG["failure_threshold"],
+        reset_timeout=DEFAULT_CIRCUIT_BREAKER_CONFIG["reset_timeout"],
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, circuit_breaker_config):
+        """Create a circuit breaker from the `circuit_breaker` block of a service config."""
+        return cls(**{**DEFAULT_CIRCUIT_BREAKER_CONFIG, **circuit_breaker_config})
+
+    @property
+    def is_open(self):
+        """Whether calls are currently refused, or only a trial call is let through."""
+        return self.opened_at is not None
+
+    def before_call(self):
+        """Raise a CircuitOpenException if the upstream must not be called."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+
+            if remaining > 0 or self._trial_in_progress:
+                raise CircuitOpenException(
+                    f"Circuit open after {self.failures} failures,"
+                    f" next try in {max(0, remaining):.0f} seconds"
+                )
+
+            self._trial_in_progress = True
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        """
+        End a call that neither succeeded nor failed, such as a rate limited or cancelled
+        call, so the next call can be a trial again.
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        """Count a failed call, and open the circuit once there are too many in a row."""
+        with self._lock:
+            self.failures += 1
+            self._trial_in_progress = False
+
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
@@ -1,12 +1,51 @@
 """Module to define what an API class should do and what it should look like."""
-from datetime import datetime
+import asyncio
+import contextvars
+import hashlib
+import json
+import threading
+import time
 
 from abc import ABC
-
-import requests
-
-from prometheus_client import Summary, Counter, Gauge, Histogram
-from collectington.exceptions.collection_exceptions import UnsupportedPrometheusInstance
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from prometheus_client import REGISTRY, Summary, Counter, Gauge, Histogram
+from collectington.cache import (
+    DEFAULT_CACHE_CONFIG,
+    FRESH,
+    SHARED_CACHE,
+    DatastoreCache,
+)
+from collectington.circuit_breaker import CircuitBreaker
+from collectington.decoding import (
+    DEFAULT_DECODER,
+    compile_projection,
+    get_decoder,
+    project,
+)
+from collectington.exceptions.collection_exceptions import (
+    HttpStatusException,
+    RateLimitedException,
+    UnsupportedPrometheusInstance,
+)
+from collectington.governor import get_request_governor
+from collectington.incremental import IncrementalDatastore
+from collectington.instrumentation import get_collector_metrics
+from collectington.logger import setup_logging
+from collectington.metric_table import MetricTable
+from collectington.pagination import create_pagination
+from collectington.revalidation import DatastoreRevalidation
+from collectington.transport import HttpTransport
+
+LOGGER = setup_logging()
+
+# the value of a metric that failed or timed out, which is not published
+MISSING = object()
+
+# datastores read by the metric evaluated in the current thread or asyncio task, as
+# (name of datastore, datastore) tuples, see CollectingtonApi.get_metric
+_METRIC_READS = contextvars.ContextVar("collectington_metric_reads", default=None)
 
 
 def enable_delta_metric(func):
@@ -16,38 +55,51 @@ def enable_delta_metric(func):
     every time we get API data.
 
     This will keep track of previous metric and compare against new data to get delta value.
-    Previous metric is defined as class attribute for each metric.
+    Previous metric is kept per service instance, so several instances of the same service
+    class do not share their previous metric.
 
     This decorator simply returns the difference between new metric data and previous
-    metric data.
+    metric data. The metric method itself is only called once per invocation.
 
     :return: delta of new metric data & previous data
     """
 
+    @wraps(func)
     def wrapper(self):
-        # Assigning this to a new variable does not work as this variable will
-        # reset value to 0. self is required as this will be called from a class
+        return _get_delta_metric(self, func.__name__, func(self))
 
-        previous_metric_name = f"previous_{func.__name__}"
+    @wraps(func)
+    async def async_wrapper(self):
+        return _get_delta_metric(self, func.__name__, await func(self))
 
-        previous_metric_value = self.__class__._delta_metric_registry[
-            previous_metric_name
-        ]
+    if asyncio.iscoroutinefunction(func):
+        async_wrapper._delta_metric = True
+        return async_wrapper
 
-        if previous_metric_value == func(self):
-            return 0
+    wrapper._delta_metric = True
 
-        delta_metric = func(self) - previous_metric_value
+    return wrapper
 
-        delta_metric_registry_copy = self.__class__._delta_metric_registry.copy()
 
-        delta_metric_registry_copy[previous_metric_name] = func(self)
+def _get_delta_metric(service, metric_name, metric_value):
+    """
+    Return the difference between a metric value and the previous value of the metric,
+    and keep the metric value as the new previous value.
 
-        setattr(self.__class__, "_delta_metric_registry", delta_metric_registry_copy)
+    When the new value is lower than the previous one, the upstream total has been reset,
+    so the whole new value is counted, the same way Prometheus handles counter resets.
+    """
+    if metric_value is None:
+        # keep the previous value, an API error should not reset the delta
+        return None
 
-        return delta_metric
+    previous_metric_value = service._delta_metric_state.get(metric_name, 0)
+    service._delta_metric_state[metric_name] = metric_value
 
-    return wrapper
+    if metric_value < previous_metric_value:
+        return metric_value
+
+    return metric_value - previous_metric_value
 
 
 def register_metric_class(cls):
@@ -71,15 +123,11 @@ def register_metric_class(cls):
 
     """
     cls._metric_registry = {}
-    cls._delta_metric_registry = {}
 
     for methodname in dir(cls):
         method = getattr(cls, methodname)
         if hasattr(method, "_property"):
             cls._metric_registry.update({method._property[0]: methodname})
-            cls._delta_metric_registry.update(
-                {f"previous_{methodname}": 0}
-            )  # this is for delta metric
     return cls
 
 
@@ -99,6 +147,117 @@ def register_metric(*args):
     return wrapper
 
 
+# the Prometheus method used to send a value, by type of Prometheus instance
+UPDATE_FUNCTIONS = [
+    (Counter, Counter.inc),
+    (Summary, Summary.observe),
+    (Histogram, Histogram.observe),
+    (Gauge, Gauge.set),
+]
+
+
+def cpu_bound(*names_of_datastores):
+    """
+    This is a class method decorator for metric methods that spend their time computing
+    in Python rather than waiting for the API, e.g. parsing every timestamp of a response.
+
+    When the `execution` block of the service sets `process_workers`, these methods are
+    run in a pool of processes so they are not limited to a single core by the GIL. The
+    datastores the method reads must be named: they are sent to the pool once per cycle,
+    through shared memory, for every CPU-bound metric of the service.
+
+        @register_metric("time_taken_to_resolve")
+        @cpu_bound("splunk_datastore")
+        def get_time_taken_to_resolve(self):
+            ...
+
+    In a worker process, the method runs on a copy of the service that only has its
+    config and the named datastores, so it must not depend on any other state of the
+    service. Without `process_workers` the method is run like any other metric method.
+    """
+
+    def decorator(func):
+        func._cpu_bound = names_of_datastores
+
+        return func
+
+    return decorator
+
+
+def datastore_view(name_of_datastore):
+    """
+    This is a class method decorator for expensive structures derived from a datastore,
+    which several metric methods need. The method receives the datastore and its result
+    is memoized until the datastore is refreshed, so the structure is only built once
+    per API call however many metrics use it:
+
+        @datastore_view("splunk_datastore")
+        def transitions(self, response):
+            return self.create_transitions_dict(response)
+
+        @register_metric("time_taken_to_resolve")
+        def get_time_taken_to_resolve(self):
+            time_triggered_dict, _, time_resolved_dict = self.transitions()
+            ...
+
+    Views of an AsyncCollectingtonApi must be awaited.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self):
+            if asyncio.iscoroutinefunction(self.get_data_from_store):
+                return _get_datastore_view_async(self, func, name_of_datastore)
+
+            return _get_datastore_view(
+                self, func, self.get_data_from_store(name_of_datastore)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def _get_datastore_view(service, func, datastore):
+    """
+    Return the memoized view of a datastore, computing it again only if the datastore
+    is not the one the view was computed from.
+    """
+    lock = service._datastore_view_locks.setdefault(func.__name__, threading.Lock())
+
+    with lock:
+        view = service._datastore_views.get(func.__name__)
+
+        if view is None or view[0] is not datastore:
+            view = service._datastore_views[func.__name__] = (
+                datastore,
+                func(service, datastore),
+            )
+
+    return view[1]
+
+
+async def _get_datastore_view_async(service, func, name_of_datastore):
+    """Return the memoized view of a datastore of an async service."""
+    return _get_datastore_view(
+        service, func, await service.get_data_from_store(name_of_datastore)
+    )
+
+
+class _LabeledSeries:
+    """
+    The series a labeled metric instance exports: the child instance of every label
+    combination, and the publish cycle each of them was last published at.
+    """
+
+    __slots__ = ("children", "last_published", "cycle")
+
+    def __init__(self):
+        self.children = {}
+        self.last_published = {}
+        self.cycle = 0
+
+
 class CollectingtonApi(ABC):
     """
     This class is an abstract class that includes implementations for common methods
@@ -113,7 +272,8 @@ class CollectingtonApi(ABC):
     """
 
     def __init__(self):
-        self.data_store = {}
+        # created on first use, see get_data_store
+        self.data_store = None
         # Prometheus reads data 1 per minute(60 sec)
         self.data_store_expiration_sec = 60
 
@@ -123,6 +283,29 @@ class CollectingtonApi(ABC):
         self.name_of_datastore = ""
         self.api_url = ""
         self.service_name = ""
+        self.transport = None
+        # set by the runner when services are exposed on different ports
+        self.registry = REGISTRY
+        # set by the runner when the metrics are collected on scrape, in which case the
+        # Prometheus instances are exposed by a ServiceCollector instead of the registry
+        self.scrape_driven = False
+        # previous value of each delta metric, see enable_delta_metric
+        self._delta_metric_state = {}
+        # see generate_prometheus_metric_instances
+        self._publish_plan = None
+        # series of each labeled metric instance, kept when a plan is compiled again
+        self._labeled_series = {}
+        # datastore each view was computed from and its value, see datastore_view
+        self._datastore_views = {}
+        self._datastore_view_locks = {}
+        # circuit breaker of each datastore, see fetch_datastore
+        self._circuit_breakers = {}
+        # records read so far of each incremental datastore, see load_datastore
+        self._incremental_datastores = {}
+        # validators of the last response of each datastore, see revalidate_datastore
+        self._revalidations = {}
+        # datastores read by every metric and its value, see get_metric
+        self._metric_memos = {}
 
         self.prometheus_metrics_mapping = {
             "counter": Counter,
@@ -131,60 +314,666 @@ class CollectingtonApi(ABC):
             "summary": Summary,
         }
 
+    def get_transport(self):
+        """
+        Return the HTTP transport of the service.
+
+        The transport is created on first use from the optional `transport` block of the
+        service config, since the config is only available after the subclass init.
+        """
+        if self.transport is None:
+            service_config = self.config["services"][self.service_name]
+            self.transport = HttpTransport.from_config(
+                service_config.get("transport"),
+                rate_limited="rate_limit" in service_config,
+            )
+
+        return self.transport
+
+    def get_request_governor(self, url, headers):
+        """
+        Return the governor that keeps the requests to a URL within the rate limit of the
+        API, or None if the service config has no `rate_limit` block.
+        """
+        rate_limit_config = self.config["services"][self.service_name].get("rate_limit")
+
+        if rate_limit_config is None:
+            return None
+
+        return get_request_governor(url, headers, rate_limit_config)
+
+    def _reserve_request(self, governor):
+        """Return the number of seconds to wait before a request can be sent."""
+        try:
+            return governor.reserve()
+        except RateLimitedException:
+            self.get_collector_metrics().throttled_requests.labels(
+                self.service_name, "local"
+            ).inc()
+            raise
+
+    def _check_throttled(self, governor, status_code, headers):
+        """Raise a RateLimitedException if a response was throttled by the API."""
+        retry_after = governor.record_response(status_code, headers)
+
+        if retry_after is not None:
+            self.get_collector_metrics().throttled_requests.labels(
+                self.service_name, "upstream"
+            ).inc()
+
+            raise RateLimitedException(
+                f"{self.service_name} was throttled by the API for {retry_after:.1f}"
+                " seconds",
+                retry_after=retry_after,
+            )
+
+    def _check_status(self, status_code, not_modified=False):
+        """
+        Raise an HttpStatusException if a response is not a success, so an error body is
+        never read as a datastore. A 304 is only expected when revalidating a datastore.
+        """
+        if 200 <= status_code < 300 or (not_modified and status_code == 304):
+            return
+
+        raise HttpStatusException(
+            f"{self.service_name} API answered with status {status_code}",
+            status_code=status_code,
+        )
+
+    def request(self, url, params, headers, stream=False, not_modified=False):
+        """
+        Send a GET request to the API and return the response.
+
+        A streamed response is returned before its body is downloaded, so its size is
+        only known from its Content-Length header.
+
+        With a `rate_limit` block in the service config, the request waits for the rate
+        limit of the API, and a RateLimitedException is raised instead of sending the
+        request when it would wait too long, or when the API throttled the response.
+
+        An HttpStatusException is raised for any response that is not a success, or a
+        `304 Not Modified` when `not_modified` is set.
+        """
+        governor = self.get_request_governor(url, headers)
+
+        # a metric that calls the API itself is not memoized, see get_metric
+        reads = _METRIC_READS.get()
+        if reads is not None:
+            reads.append((None, None))
+
+        if governor is not None:
+            time.sleep(self._reserve_request(governor))
+
+        if stream:
+            response = self.get_transport().get(
+                url, params=params, headers=headers, stream=True
+            )
+            response_bytes = int(response.headers.get("Content-Length", 0))
+        else:
+            response = self.get_transport().get(url, params=params, headers=headers)
+            response_bytes = len(response.content)
+
+        collector_metrics = self.get_collector_metrics()
+        collector_metrics.http_responses.labels(
+            self.service_name, response.status_code
+        ).inc()
+        collector_metrics.http_response_bytes.labels(self.service_name).inc(
+            response_bytes
+        )
+
+        try:
+            if governor is not None:
+                self._check_throttled(governor, response.status_code, response.headers)
+
+            self._check_status(response.status_code, not_modified)
+        except (RateLimitedException, HttpStatusException):
+            response.close()
+            raise
+
+        return response
+
     def read_data(self, url, params, headers):
         """Request data from API.
-        Update current read time.
         Return API response.
         """
-        response = requests.request("GET", url, params=params, headers=headers)
-        response = response.json()
+        return self.decode(self.request(url, params, headers).content)
 
-        # this is required for invalidating cache after expiry
-        self.data_store["data_read_at"] = datetime.now()
+    def decode(self, body):
+        """Decode a JSON response body with the `json_decoder` of the service config."""
+        return get_decoder(
+            self.config["services"][self.service_name].get(
+                "json_decoder", DEFAULT_DECODER
+            )
+        )(body)
 
-        return response
+    def get_pagination(self, name_of_datastore):
+        """
+        Return the pagination strategy of a datastore, or None if the datastore is
+        read with a single request.
+        """
+        pagination_config = self.get_datastore_config(name_of_datastore).get(
+            "pagination"
+        )
+
+        if pagination_config is None:
+            return None
 
-    def is_data_store_expired(self):
-        """Check to see if data store has expired.
-        Returns boolean.
+        return create_pagination(pagination_config, self.decode)
+
+    def iter_datastore_records(self, name_of_datastore):
         """
-        data_cached_time = self.data_store["data_read_at"]
+        Yield the records of a datastore one by one, page after page, so metric methods
+        can aggregate them without holding the whole response in memory.
 
-        time_delta = datetime.now() - data_cached_time
+        Records are read from `records_path` of the `pagination` block of the datastore.
+        If the datastore sets `stream` and ijson is installed, records are decoded while
+        each page is downloaded. Records are not cached, every call reads the API again.
+        """
+        pagination = self.get_pagination(name_of_datastore) or create_pagination(
+            {}, self.decode
+        )
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+
+        yield from pagination.iter_records(
+            lambda url, params, stream: self.request(url, params, headers, stream),
+            api_url,
+            self.get_datastore_params(name_of_datastore),
+            self.get_datastore_config(name_of_datastore).get("stream", False),
+        )
+
+    def get_collector_metrics(self):
+        """Return the metrics collectington exposes about itself in the service registry."""
+        return get_collector_metrics(self.registry)
+
+    def get_cache_config(self):
+        """Return the `cache` block of the service config merged with the defaults."""
+        return {
+            **DEFAULT_CACHE_CONFIG,
+            **self.config["services"][self.service_name].get("cache", {}),
+        }
+
+    def get_datastore_config(self, name_of_datastore):
+        """Return the config of a datastore from the `datastores` block of the service."""
+        return (
+            self.config["services"][self.service_name]
+            .get("datastores", {})
+            .get(name_of_datastore, {})
+        )
+
+    def get_datastore_request(self, name_of_datastore):
+        """
+        Return the URL, params and headers a datastore is requested with. A datastore of
+        the `datastores` block can have its own `api_url`, and its own `params` which
+        replace the params of the service. Its `headers` are added to the headers of the
+        service, so credentials set by the service are sent to every datastore.
+        """
+        datastore_config = self.get_datastore_config(name_of_datastore)
+        headers = self.headers
+
+        if "headers" in datastore_config:
+            headers = {**self.headers, **datastore_config["headers"]}
+
+        return (
+            datastore_config.get("api_url", self.api_url),
+            datastore_config.get("params", self.params),
+            headers,
+        )
+
+    def get_data_store(self):
+        """
+        Return the cache that holds the datastores of the service. Services configured
+        with a shared cache use the cache shared by every service of the process.
+        """
+        if self.data_store is None:
+            cache_config = self.get_cache_config()
+
+            if cache_config["shared"]:
+                self.data_store = SHARED_CACHE
+            else:
+                self.data_store = DatastoreCache(cache_config["max_entries"])
+
+        return self.data_store
+
+    def get_datastore_ttl(self, name_of_datastore):
+        """
+        Return the time to live of a datastore and for how long it can be served stale
+        while it is refreshed.
+        """
+        cache_config = self.get_cache_config()
+        datastore_config = self.get_datastore_config(name_of_datastore)
+
+        ttl = datastore_config.get("ttl", cache_config["ttl"])
+        if ttl is None:
+            ttl = self.data_store_expiration_sec
+
+        stale_ttl = datastore_config.get(
+            "stale_while_revalidate", cache_config["stale_while_revalidate"]
+        )
+
+        return ttl, stale_ttl
+
+    def get_datastore_cache_key(self, name_of_datastore):
+        """
+        Return the key of a datastore in the cache. In a shared cache, datastores are
+        keyed by request so services calling the same URL share the response. Headers
+        are only part of the key as a hash, since they usually hold credentials.
 
-        return time_delta.total_seconds() >= self.data_store_expiration_sec
+        The `projection` and `pagination` of the datastore change what is cached, so
+        they are part of the key too. An incremental datastore holds the records read by
+        its own service, and is keyed by service instead.
+        """
+        if self.get_data_store() is not SHARED_CACHE:
+            return name_of_datastore
+
+        datastore_config = self.get_datastore_config(name_of_datastore)
+
+        if "incremental" in datastore_config:
+            return json.dumps([self.service_name, name_of_datastore])
+
+        api_url, params, headers = self.get_datastore_request(name_of_datastore)
+        headers_hash = hashlib.sha256(
+            json.dumps(headers, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        return json.dumps(
+            [
+                api_url,
+                params,
+                headers_hash,
+                datastore_config.get("projection"),
+                datastore_config.get("pagination"),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    def invalidate_datastore(self, name_of_datastore):
+        """Remove a datastore from the cache, so it is requested again on next use."""
+        self.get_data_store().invalidate(
+            self.get_datastore_cache_key(name_of_datastore)
+        )
 
     def get_data_from_store(self, name_of_datastore):
         """
         Instead of having to call an API for every metric, different meteics can
         share the same response data(cache) before expiry.
+
+        Every datastore expires on its own, and concurrent metrics missing the same
+        datastore share a single API call.
+        """
+        ttl, stale_ttl = self.get_datastore_ttl(name_of_datastore)
+        cache_requests = self.get_collector_metrics().datastore_cache_requests
+        # the API calls of the datastore are not reads of the metric
+        reads = _METRIC_READS.get()
+        token = _METRIC_READS.set(None)
+
+        try:
+            value = self.get_data_store().get(
+                self.get_datastore_cache_key(name_of_datastore),
+                lambda: self.fetch_datastore(name_of_datastore),
+                ttl,
+                stale_ttl,
+                lambda result: cache_requests.labels(
+                    self.service_name, name_of_datastore, result
+                ).inc(),
+                name=f"{self.service_name}/{name_of_datastore}",
+            )
+        except RateLimitedException as err:
+            value = self.get_last_datastore(name_of_datastore, err)
+        finally:
+            _METRIC_READS.reset(token)
+
+        if reads is not None:
+            reads.append((name_of_datastore, value))
+
+        return value
+
+    def get_last_datastore(self, name_of_datastore, err):
+        """
+        Return the last datastore that was read, however old it is, while the API is
+        rate limited. Raise the RateLimitedException if the datastore was never read.
+        """
+        value = self.get_data_store().peek(
+            self.get_datastore_cache_key(name_of_datastore)
+        )
+
+        if value is None:
+            raise err
+
+        LOGGER.warning(
+            "%s is rate limited for %.1f seconds, serving the last %s",
+            self.service_name,
+            err.retry_after,
+            name_of_datastore,
+        )
+
+        return value
+
+    def record_error(self, stage, err):
+        """Count an error of a stage (fetch, metric, publish, cycle or checkpoint)."""
+        self.get_collector_metrics().errors.labels(
+            self.service_name, stage, type(err).__name__
+        ).inc()
+
+    def get_circuit_breaker(self, name_of_datastore):
+        """Return the circuit breaker of a datastore, created from the service config."""
+        circuit_breaker = self._circuit_breakers.get(name_of_datastore)
+
+        if circuit_breaker is None:
+            circuit_breaker = self._circuit_breakers.setdefault(
+                name_of_datastore,
+                CircuitBreaker.from_config(
+                    self.config["services"][self.service_name].get(
+                        "circuit_breaker", {}
+                    )
+                ),
+            )
+
+        return circuit_breaker
+
+    def _before_fetch(self, name_of_datastore):
+        """Return the circuit breaker of a datastore, if its API can be called."""
+        circuit_breaker = self.get_circuit_breaker(name_of_datastore)
+        circuit_breaker.before_call()
+
+        return circuit_breaker
+
+    def _after_fetch(self, name_of_datastore, circuit_breaker, err=None):
+        """Record the result of a datastore fetch in its circuit breaker."""
+        if err is None:
+            circuit_breaker.record_success()
+        elif isinstance(err, RateLimitedException) or not isinstance(err, Exception):
+            # throttled by the API, or cancelled: the upstream was not shown broken
+            circuit_breaker.release_trial()
+        else:
+            circuit_breaker.record_failure()
+            self.record_error("fetch", err)
+
+        self.get_collector_metrics().datastore_circuit_open.labels(
+            self.service_name, name_of_datastore
+        ).set(circuit_breaker.is_open)
+
+    def fetch_datastore(self, name_of_datastore):
+        """
+        Load a datastore and record how long it took.
+
+        A datastore whose API keeps failing is not called until its circuit breaker
+        resets, a CircuitOpenException is raised instead.
+        """
+        circuit_breaker = self._before_fetch(name_of_datastore)
+
+        try:
+            with self.get_collector_metrics().datastore_fetch_seconds.labels(
+                self.service_name, name_of_datastore
+            ).time():
+                value = self.load_datastore(name_of_datastore)
+        except BaseException as err:
+            self._after_fetch(name_of_datastore, circuit_breaker, err)
+            raise
+
+        self._after_fetch(name_of_datastore, circuit_breaker)
+
+        return value
+
+    def get_incremental_datastore(self, name_of_datastore):
+        """
+        Return the records read so far of a datastore that is read incrementally, or
+        None if the datastore has no `incremental` block.
+        """
+        incremental_config = self.get_datastore_config(name_of_datastore).get(
+            "incremental"
+        )
+
+        if incremental_config is None:
+            return None
+
+        incremental_datastore = self._incremental_datastores.get(name_of_datastore)
+
+        if incremental_datastore is None:
+            incremental_datastore = self._incremental_datastores.setdefault(
+                name_of_datastore, IncrementalDatastore.from_config(incremental_config)
+            )
+
+        return incremental_datastore
+
+    def get_datastore_params(self, name_of_datastore):
+        """
+        Return the request params of a datastore. An incremental datastore only asks for
+        the records after its watermark.
+        """
+        params = self.get_datastore_request(name_of_datastore)[1]
+        incremental_datastore = self.get_incremental_datastore(name_of_datastore)
+
+        if incremental_datastore is None:
+            return params
+
+        return incremental_datastore.get_params(params)
+
+    def merge_datastore(self, name_of_datastore, value):
+        """
+        Return the data of a datastore from the data read by the API. Only the fields of
+        the `projection` of the datastore are kept, and the records of an incremental
+        datastore are added to the records read so far.
+        """
+        projection = self.get_datastore_config(name_of_datastore).get("projection")
+
+        if projection is not None:
+            value = project(value, compile_projection(projection))
+
+        incremental_datastore = self.get_incremental_datastore(name_of_datastore)
+
+        if incremental_datastore is None:
+            return value
+
+        value, new_records = incremental_datastore.merge(value)
+        self.on_new_records(name_of_datastore, new_records)
+
+        return value
+
+    def on_new_records(self, name_of_datastore, new_records):
+        """
+        Called with the records of an incremental datastore that were not read before,
+        once per API call. Subclasses can override it to keep running aggregates
+        instead of going over every record on every cycle.
+        """
+
+    def get_datastore_revalidation(self, name_of_datastore):
+        """
+        Return the validators of the last response of a datastore, or None if the
+        datastore is not revalidated. Paginated datastores are never revalidated.
+        """
+        datastore_config = self.get_datastore_config(name_of_datastore)
+        revalidate = datastore_config.get(
+            "revalidate", self.get_cache_config()["revalidate"]
+        )
+
+        if not revalidate or "pagination" in datastore_config:
+            return None
+
+        revalidation = self._revalidations.get(name_of_datastore)
+
+        if revalidation is None:
+            revalidation = self._revalidations.setdefault(
+                name_of_datastore, DatastoreRevalidation()
+            )
+
+        return revalidation
+
+    def revalidate_datastore(self, name_of_datastore, revalidation, params):
+        """
+        Call the API with the validators of the last response of a datastore. If the
+        datastore did not change, the last datastore is returned without decoding the
+        response, so the views and metrics computed from it are reused as well.
+        """
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+        response = self.request(
+            api_url, params, revalidation.get_headers(headers), not_modified=True
+        )
+        reason, body_hash = revalidation.check(
+            response.status_code, response.headers, response.content
+        )
+
+        if reason is not None:
+            self.get_collector_metrics().datastore_unchanged.labels(
+                self.service_name, name_of_datastore, reason
+            ).inc()
+            return revalidation.value
+
+        value = self.merge_datastore(name_of_datastore, self.decode(response.content))
+        revalidation.update(response.headers, body_hash, value)
+
+        return value
+
+    def reset_datastore(self, name_of_datastore):
+        """
+        Forget everything read from a datastore, so it is read again from scratch on
+        next use (e.g. when its settings changed).
+        """
+        self.invalidate_datastore(name_of_datastore)
+        self._incremental_datastores.pop(name_of_datastore, None)
+        self._revalidations.pop(name_of_datastore, None)
+
+    def load_datastore(self, name_of_datastore):
+        """
+        Call the API to get the data of a datastore. The records of every page of a
+        paginated datastore are gathered into the first page.
+        """
+        pagination = self.get_pagination(name_of_datastore)
+        api_url, _, headers = self.get_datastore_request(name_of_datastore)
+        params = self.get_datastore_params(name_of_datastore)
+
+        if pagination is None:
+            revalidation = self.get_datastore_revalidation(name_of_datastore)
+
+            if revalidation is not None:
+                return self.revalidate_datastore(
+                    name_of_datastore, revalidation, params
+                )
+
+            value = self.read_data(api_url, params, headers)
+        else:
+            value = pagination.collect(
+                lambda url, params, stream: self.request(url, params, headers, stream),
+                api_url,
+                params,
+            )
+
+        return self.merge_datastore(name_of_datastore, value)
+
+    def get_prefetched_datastores(self):
+        """
+        Return the datastores of the `datastores` block that are read at the start of
+        every cycle, which are every datastore that is neither streamed nor refreshed on
+        a schedule of its own.
         """
-        if not self.data_store.get(name_of_datastore) or self.is_data_store_expired():
-            response = self.read_data(self.api_url, self.params, self.headers)
+        return [
+            name_of_datastore
+            for name_of_datastore, datastore_config in self.config["services"][
+                self.service_name
+            ]
+            .get("datastores", {})
+            .items()
+            if not datastore_config.get("stream")
+            and "api_call_intervals" not in datastore_config
+        ]
 
-            self.data_store[name_of_datastore] = response
+    def get_expired_datastores(self):
+        """Return the prefetched datastores that are missing or expired in the cache."""
+        data_store = self.get_data_store()
+
+        return [
+            name_of_datastore
+            for name_of_datastore in self.get_prefetched_datastores()
+            if data_store.lookup(
+                self.get_datastore_cache_key(name_of_datastore),
+                *self.get_datastore_ttl(name_of_datastore),
+            )[1]
+            != FRESH
+        ]
+
+    def prefetch_datastores(self):
+        """
+        Read every expired datastore at once at the start of a cycle, instead of one
+        after the other as metrics need them. A datastore that fails to be read is
+        reported by the metrics that need it.
+        """
+        names_of_datastores = self.get_expired_datastores()
+
+        # a single datastore is read by the first metric that needs it
+        if len(names_of_datastores) < 2:
+            return
+
+        with ThreadPoolExecutor(max_workers=len(names_of_datastores)) as executor:
+            futures = {
+                executor.submit(
+                    self.get_data_from_store, name_of_datastore
+                ): name_of_datastore
+                for name_of_datastore in names_of_datastores
+            }
+
+        for future, name_of_datastore in futures.items():
+            if future.exception() is not None:
+                LOGGER.warning(
+                    "Failed to prefetch %s: %s", name_of_datastore, future.exception()
+                )
+
+    def refresh_datastore(self, name_of_datastore):
+        """
+        Call the API and cache the data of a datastore, whether it has expired or not.
+        This is used for datastores that are refreshed on a schedule of their own.
+        A refresh that is rate limited is skipped.
+        """
+        loaded_at = time.monotonic()
 
-        return self.data_store[name_of_datastore]
+        try:
+            value = self.fetch_datastore(name_of_datastore)
+        except RateLimitedException as err:
+            LOGGER.warning("Skipping refresh of %s: %s", name_of_datastore, err)
+            return
+
+        self.get_data_store().store(
+            self.get_datastore_cache_key(name_of_datastore), value, loaded_at
+        )
+
+    def _get_metric_labels(self, api_metric):
+        """Return the labels of a metric, or None if the metric has no labels."""
+        return (
+            self.config["services"][self.service_name]
+            .get("prometheus_metric_labels", {})
+            .get(api_metric)
+        )
+
+    def _get_metric_retention(self, api_metric):
+        """Return the retention policy of a labeled metric, or an empty dict."""
+        return (
+            self.config["services"][self.service_name]
+            .get("prometheus_metric_retention", {})
+            .get(api_metric, {})
+        )
 
     def _init_p_method(self, p_method, api_metric):
         """Internal method to metric methods with labels only if they're provided."""
+        labels = self._get_metric_labels(api_metric)
+        registry = None if self.scrape_driven else self.registry
 
-        if (
-            self.config["services"][self.service_name].get("prometheus_metric_labels")
-            is not None
-            and api_metric
-            in self.config["services"][self.service_name]["prometheus_metric_labels"]
-        ):
-            labels = self.config["services"][self.service_name][
-                "prometheus_metric_labels"
-            ][api_metric]
-            return p_method(api_metric, api_metric, labels)
+        if labels is not None:
+            return p_method(api_metric, api_metric, labels, registry=registry)
 
-        return p_method(api_metric, api_metric)
+        return p_method(api_metric, api_metric, registry=registry)
 
-    def generate_prometheus_metric_instances(self):
-        """Create a list of metrics for service."""
+    def generate_prometheus_metric_instances(self, reused_instances=None):
+        """
+        Create a list of metrics for service.
+
+        The plan used by call_prometheus_metrics to publish the metrics is compiled at the
+        same time, so nothing has to be looked up again on every cycle.
+
+        Instances found in `reused_instances`, a dict of metric name to instance, are kept
+        with their series instead of being created again (e.g. when the config is reloaded).
+        """
+        reused_instances = reused_instances or {}
         list_of_metric_instances = []
+        metric_names = []
 
         for p_metric, api_metrics in self.config["services"][self.service_name][
             "prometheus_metrics_mapping"
@@ -192,58 +981,285 @@ class CollectingtonApi(ABC):
             p_method = self.prometheus_metrics_mapping[p_metric]
 
             p_instances = [
-                self._init_p_method(p_method, api_metric) for api_metric in api_metrics
+                reused_instances[api_metric]
+                if api_metric in reused_instances
+                else self._init_p_method(p_method, api_metric)
+                for api_metric in api_metrics
             ]
 
             list_of_metric_instances += p_instances
+            metric_names += api_metrics
+
+        self._publish_plan = (
+            list_of_metric_instances,
+            self._compile_publish_plan(metric_names, list_of_metric_instances),
+        )
 
         return list_of_metric_instances
 
+    def _compile_publish_plan(self, metric_names, list_of_metric_instances):
+        """
+        Return a list of (metric name, publish function) tuples. A publish function takes
+        the value returned by the metric method and updates its Prometheus instance, with
+        the labels of the metric and the update method of the instance already resolved.
+
+        The series of the instances that are kept, e.g. on reload, keep being tracked so
+        they still expire.
+        """
+        self._labeled_series = {
+            p_instance: self._labeled_series.get(p_instance) or _LabeledSeries()
+            for p_instance in list_of_metric_instances
+        }
+
+        return [
+            (metric, self._compile_publish_function(metric, p_instance))
+            for metric, p_instance in zip(metric_names, list_of_metric_instances)
+        ]
+
+    def _compile_publish_function(self, metric, p_instance):
+        """Return the function that publishes the value of a metric."""
+        update = self._get_update_function(p_instance)
+        label_list = self._get_metric_labels(metric)
+
+        if label_list is None:
+            return partial(update, p_instance)
+
+        split_labeled_metric_dict = self._split_labeled_metric_dict
+        max_idle_cycles = self._get_metric_retention(metric).get("max_idle_cycles")
+        series = self._labeled_series[p_instance]
+        # child instance of every label combination, kept across cycles
+        children = series.children
+        # cycle at which every label combination was last published
+        last_published = series.last_published
+
+        def publish_labeled_metric(labeled_metric_values):
+            series.cycle += 1
+            cycle = series.cycle
+
+            if isinstance(labeled_metric_values, MetricTable):
+                rows = labeled_metric_values.rows(label_list)
+            else:
+                rows = (
+                    split_labeled_metric_dict(labels_and_metric_object, label_list)
+                    for labels_and_metric_object in labeled_metric_values
+                )
+
+            published = 0
+
+            for labels, val in rows:
+                publish_child = children.get(labels)
+
+                if publish_child is None:
+                    publish_child = children[labels] = partial(
+                        update, p_instance.labels(*labels)
+                    )
+
+                publish_child(val)
+
+                if max_idle_cycles is not None:
+                    last_published[labels] = cycle
+                    published += 1
+
+            # series are only looked at when some of them were not published
+            if max_idle_cycles is not None and published < len(last_published):
+                self._remove_idle_series(
+                    p_instance, children, last_published, cycle - max_idle_cycles
+                )
+
+        return publish_labeled_metric
+
+    @staticmethod
+    def _remove_idle_series(p_instance, children, last_published, expired_cycle):
+        """
+        Remove the series of a metric last published at `expired_cycle` or before. A
+        restored series is tracked by its labels as strings, so it is only forgotten if
+        the same series is still published with labels of another type.
+        """
+        idle_labels = [
+            labels
+            for labels, last_cycle in last_published.items()
+            if last_cycle <= expired_cycle
+        ]
+        if not idle_labels:
+            return
+
+        live_series = {
+            tuple(map(str, labels))
+            for labels, last_cycle in last_published.items()
+            if last_cycle > expired_cycle
+        }
+
+        for labels in idle_labels:
+            if tuple(map(str, labels)) not in live_series:
+                p_instance.remove(*labels)
+            children.pop(labels, None)
+            del last_published[labels]
+
+    def _get_update_function(self, p_instance):
+        """
+        Return the function that updates a Prometheus instance with a value. If a subclass
+        overrides _update_metric, it is used as is.
+        """
+        if type(self)._update_metric is not CollectingtonApi._update_metric:
+            return self._update_metric
+
+        for p_class, update in UPDATE_FUNCTIONS:
+            if isinstance(p_instance, p_class):
+                return update
+
+        raise UnsupportedPrometheusInstance
+
+    def publish_metric_values(self, metric_values, list_of_metric_instances):
+        """
+        Send the values of every evaluated metric to Prometheus at once.
+        Metrics that did not return a value are sent as 0, metrics that failed are not
+        sent. Return whether every metric was published.
+        """
+        service_metric_dict = {}
+
+        for metric, metric_value in metric_values.items():
+            if metric_value is MISSING:
+                continue
+
+            if metric_value is None:
+                metric_value = 0
+
+            service_metric_dict[metric] = metric_value
+
+        return self.call_prometheus_metrics(
+            service_metric_dict, list_of_metric_instances
+        )
+
     def call_prometheus_metrics(self, service_metric_dict, list_of_metric_instances):
-        """Handles sending the metric data to prometheus.
+        """Handles sending the metric data to prometheus, by running the publish plan
+        compiled by generate_prometheus_metric_instances.
 
         For metrics that have labeled data, we loop through all the labels and
-        send each one sequentially.
+        send each one sequentially. Labeled data is either a list of dicts or a
+        MetricTable, and the child instance of every label combination is reused
+        across cycles.
 
         For metrics with no label data, we make a single upload for the value.
-        """
-        for p_instance in list_of_metric_instances:
-            metric = str(p_instance).split(":")[1]
-            if (
-                self.config["services"][self.service_name].get(
-                    "prometheus_metric_labels"
-                )
-                is not None
-                and metric
-                in self.config["services"][self.service_name][
-                    "prometheus_metric_labels"
-                ]
-            ):
-                for labels_and_metric_object in service_metric_dict[metric]:
-                    label_list = self.config["services"][self.service_name][
-                        "prometheus_metric_labels"
-                    ][metric]
-                    labels, val = self._split_labeled_metric_dict(
-                        labels_and_metric_object, label_list
-                    )
-                    self._update_metric(p_instance.labels(*labels), val)
 
+        Metrics missing from service_metric_dict (i.e. timed out or failed), or that fail
+        to be published, are not updated: they keep their last value and are marked stale.
+        Return whether every metric was published.
+        """
+        if (
+            self._publish_plan is None
+            or self._publish_plan[0] is not list_of_metric_instances
+        ):
+            # the instances were not created by generate_prometheus_metric_instances
+            metric_names = [
+                str(p_instance).split(":")[1] for p_instance in list_of_metric_instances
+            ]
+            self._publish_plan = (
+                list_of_metric_instances,
+                self._compile_publish_plan(metric_names, list_of_metric_instances),
+            )
+
+        collector_metrics = self.get_collector_metrics()
+        all_published = True
+
+        for metric, publish in self._publish_plan[1]:
+            published = False
+
+            if metric in service_metric_dict:
+                try:
+                    publish(service_metric_dict[metric])
+                    published = True
+                except Exception as err:  # pylint: disable=broad-except
+                    LOGGER.error("Failed to publish %s: %s", metric, err)
+                    self.record_error("publish", err)
+
+            collector_metrics.metric_stale.labels(self.service_name, metric).set(
+                not published
+            )
+            if published:
+                collector_metrics.metric_last_success.labels(
+                    self.service_name, metric
+                ).set_to_current_time()
             else:
-                self._update_metric(p_instance, service_metric_dict[metric])
+                all_published = False
+
+        return all_published
+
+    def _iter_counters(self):
+        """Yield the name, labels and Prometheus instance of every counter of the service."""
+        if self._publish_plan is None:
+            return
+
+        list_of_metric_instances, plan = self._publish_plan
+
+        for (metric, _), p_instance in zip(plan, list_of_metric_instances):
+            if isinstance(p_instance, Counter):
+                yield metric, self._get_metric_labels(metric), p_instance
+
+    def get_state(self):
+        """
+        Return the state of the service that has to survive a restart: the previous value
+        of each delta metric and the value of each counter, as a JSON-serializable dict.
+        """
+        counters = {}
+
+        for metric, label_list, p_instance in self._iter_counters():
+            counters[metric] = {
+                "labels": label_list,
+                "values": [
+                    [
+                        *(sample.labels[label] for label in label_list or []),
+                        sample.value,
+                    ]
+                    for collected_metric in p_instance.collect()
+                    for sample in collected_metric.samples
+                    if sample.name.endswith("_total")
+                ],
+            }
+
+        return {
+            "delta_metrics": dict(self._delta_metric_state),
+            "counters": counters,
+        }
+
+    def restore_state(self, state):
+        """
+        Restore the state returned by get_state, before the first cycle of the service.
+
+        Counters continue from their saved value and delta metrics from their saved
+        baseline, so a restart does not publish the whole total of a delta metric at once.
+        Counters whose labels changed since the state was saved start over. Restored
+        series expire like published ones if they are not published again.
+        """
+        self._delta_metric_state.update(state.get("delta_metrics", {}))
+        counters = state.get("counters", {})
+
+        for metric, label_list, p_instance in self._iter_counters():
+            saved_counter = counters.get(metric)
+
+            if saved_counter is None or saved_counter["labels"] != label_list:
+                continue
+
+            series = self._labeled_series.get(p_instance)
+
+            for *labels, value in saved_counter["values"]:
+                if label_list is None:
+                    p_instance.inc(value)
+                    continue
+
+                p_instance.labels(*labels).inc(value)
+                if series is not None:
+                    series.last_published.setdefault(tuple(labels), series.cycle)
 
     @staticmethod
     def _split_labeled_metric_dict(labeled_metric_dict, label_list):
-        """Split single dict into list of labels and the metric value."""
-        labeled_metric = labeled_metric_dict.copy()
-
-        labels = []
-        for key in label_list:
-            labels.append(labeled_metric[key])
-            labeled_metric.pop(key, None)
+        """Split single dict into a tuple of labels and the metric value."""
+        labels = tuple(labeled_metric_dict[key] for key in label_list)
 
-        val = list(labeled_metric.values())[0]
+        for key, val in labeled_metric_dict.items():
+            if key not in label_list:
+                return labels, val
 
-        return labels, val
+        raise KeyError(f"No metric value in {labeled_metric_dict}")
 
     @staticmethod
     def _update_metric(p_instance, val):
@@ -267,16 +1283,96 @@ class CollectingtonApi(ABC):
         else:
             raise UnsupportedPrometheusInstance
 
-    def get_metric(self, metric):
+    def get_metric(self, metric, defer_delta=False):
         """
         This method takes an argument which is a metric name defined in config and will
         key in the value to metric_registry dictionary to get the correct metric function.
+
+        With `defer_delta`, a delta metric returns the value of the metric method as is,
+        and get_metric_delta must be called once the value is actually published, so a
+        value that is never published does not move the previous value of the metric.
         """
 
+        evaluation_seconds = self.get_collector_metrics().metric_evaluation_seconds
+
         try:
-            metric = self.__class__._metric_registry[metric]
-            metric_func = getattr(self.__class__, metric)
-            return metric_func(self)
-        except (IndexError, KeyError):
-            # Certain errors occur due to issues with API calls.
-            return None
+            metric_func = getattr(
+                self.__class__, self.__class__._metric_registry[metric]
+            )
+            delta_metric = getattr(metric_func, "_delta_metric", False)
+            if delta_metric:
+                metric_func = metric_func.__wrapped__
+
+            value = self._get_memoized_metric(metric)
+
+            if value is MISSING:
+                # a metric can be evaluated by another metric
+                outer_reads = _METRIC_READS.get()
+                reads = []
+                token = _METRIC_READS.set(reads)
+
+                try:
+                    with evaluation_seconds.labels(self.service_name, metric).time():
+                        value = metric_func(self)
+                finally:
+                    _METRIC_READS.reset(token)
+                    if outer_reads is not None:
+                        outer_reads.extend(reads)
+
+                self._memoize_metric(metric, reads, value)
+        except (IndexError, KeyError) as err:
+            # Certain errors occur due to issues with API calls, the metric keeps its
+            # last value and is marked stale rather than being published as 0.
+            LOGGER.error("Failed to evaluate %s: %r", metric, err)
+            self.record_error("metric", err)
+            return MISSING
+
+        if delta_metric and not defer_delta:
+            return _get_delta_metric(self, metric_func.__name__, value)
+
+        return value
+
+    def get_metric_delta(self, metric, value):
+        """
+        Return the delta of a value returned by get_metric with `defer_delta`, and keep
+        it as the previous value of the metric. Other metrics are returned as is.
+        """
+        metric_func = getattr(self.__class__, self.__class__._metric_registry[metric])
+
+        if value is MISSING or not getattr(metric_func, "_delta_metric", False):
+            return value
+
+        return _get_delta_metric(self, metric_func.__wrapped__.__name__, value)
+
+    def _get_memoized_metric(self, metric):
+        """
+        Return the last value of a metric if none of the datastores it read changed
+        since, or MISSING. The delta of a delta metric whose datastores did not change
+        is therefore 0.
+        """
+        memo = self._metric_memos.get(metric)
+
+        if memo is None:
+            return MISSING
+
+        reads, value = memo
+
+        for name_of_datastore, datastore in reads:
+            if self.get_data_from_store(name_of_datastore) is not datastore:
+                return MISSING
+
+        return value
+
+    def _memoize_metric(self, metric, reads, value):
+        """
+        Keep the value of a metric with the datastores it read, if it only read
+        revalidated datastores and did not call the API itself.
+        """
+        if reads and all(
+            name_of_datastore is not None
+            and self.get_datastore_revalidation(name_of_datastore) is not None
+            for name_of_datastore, _ in reads
+        ):
+            self._metric_memos[metric] = (reads, value)
+        else:
+            self._metric_memos.pop(metric, None)
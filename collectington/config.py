@@ -51,6 +51,57 @@ def get_list_of_available_metrics(config, service_name):
     return list_of_available_metrics
 
 
+def get_metric_definitions(config, service_name):
+    """
+    Get the Prometheus type and the labels of every metric of a service. A metric whose
+    definition changes needs a new Prometheus instance.
+    """
+    service = config["services"][service_name]
+    metric_labels = service.get("prometheus_metric_labels", {})
+
+    return {
+        metric: (p_metric, metric_labels.get(metric))
+        for p_metric, metrics in service["prometheus_metrics_mapping"].items()
+        for metric in metrics
+    }
+
+
+def get_port(config, service_name):
+    """
+    Get the port a service is exposed on. A service port takes precedence over the
+    shared port defined at the top level of the config.
+    """
+    return config["services"][service_name].get("port", config.get("port"))
+
+
+def get_api_call_intervals(config, service_name):
+    """
+    Get the interval between API calls of a service. A service interval takes
+    precedence over the interval defined at the top level of the config.
+    """
+    return config["services"][service_name].get(
+        "api_call_intervals", config["api_call_intervals"]
+    )
+
+
+def get_api_call_jitter(config, service_name):
+    """
+    Get the maximum number of seconds the schedule of a service is shifted by, so that
+    services with the same interval do not call their APIs at the same time.
+    """
+    return config["services"][service_name].get(
+        "api_call_jitter", config.get("api_call_jitter", 0)
+    )
+
+
+def get_collection_mode(config, service_name):
+    """
+    Get whether a service is polled on its own schedule (`poll`), or collected when
+    Prometheus scrapes its port (`scrape`).
+    """
+    return config["services"][service_name].get("collection", "poll")
+
+
 def get_service(config, service_name):
     """Get service class instance using config"""
     service = config["services"][service_name]["service_class"]
@@ -75,15 +126,52 @@ def get_service(config, service_name):
 
 def validate(config):
     """Test that provided json is a valid config."""
-    if list(config.keys()) != [
-        "api_call_intervals",
-        "log_level",
-        "services",
-    ]:
+    required_keys = ["api_call_intervals", "log_level", "services"]
+    optional_keys = [
+        "port",
+        "api_call_jitter",
+        "engine",
+        "async_http",
+        "watch_config",
+        "state_store",
+    ]
+
+    if not all(key in config for key in required_keys) or not all(
+        key in required_keys + optional_keys for key in config
+    ):
         raise ValueError(
-            "Invalid config: config should contain port, api_call_intervals, log_level, services"
+            "Invalid config: config should contain api_call_intervals, log_level, services"
+            " and optionally a shared port"
         )
 
+    if "port" in config and not isinstance(config["port"], int):
+        raise ValueError("Invalid config: port should be an integer")
+
+    if "api_call_jitter" in config and not is_non_negative_number(
+        config["api_call_jitter"]
+    ):
+        raise ValueError("Invalid config: api_call_jitter should be a number")
+
+    if "watch_config" in config and not isinstance(config["watch_config"], bool):
+        raise ValueError("Invalid config: watch_config should be a boolean")
+
+    valid_engines = ["threaded", "async"]
+    if config.get("engine", "threaded") not in valid_engines:
+        raise ValueError(
+            f"Invalid config: engine must be one of {', '.join(valid_engines)}"
+        )
+
+    if config.get("engine") == "async" and config.get("watch_config"):
+        raise ValueError(
+            "Invalid config: watch_config is not supported by the async engine"
+        )
+
+    if "async_http" in config:
+        validate_async_http(config["async_http"])
+
+    if "state_store" in config:
+        validate_state_store(config["state_store"])
+
     if not isinstance(config["api_call_intervals"], int):
         raise ValueError("Invalid config: api_call_intervals should be an integer")
 
@@ -99,16 +187,44 @@ def validate(config):
     if len(config["services"]) == 0:
         raise ValueError("Invalid config: must contain at least one service")
 
-    validate_services(config["services"])
+    validate_services(config["services"], "port" in config)
+
+
+def validate_async_http(async_http):
+    """Test that the connection limits of the async engine are valid."""
+    validate_block(
+        "async_http",
+        async_http,
+        {
+            "connection_limit": POSITIVE_INTEGER,
+            "connection_limit_per_host": POSITIVE_INTEGER,
+        },
+    )
 
 
-def validate_services(services):
+def validate_state_store(state_store):
+    """Test that the state store settings are valid."""
+    validate_block(
+        "state_store",
+        state_store,
+        {
+            "path": STRING,
+            "backend": one_of("file", "sqlite"),
+            "checkpoint_interval": POSITIVE_NUMBER,
+        },
+    )
+
+    if "path" not in state_store:
+        raise ValueError("Invalid config: state_store should contain a path")
+
+
+def validate_services(services, has_shared_port=False):
     """Test that each service in the config is a valid service configuration."""
     for service_name in services:
-        validate_service(service_name, services[service_name])
+        validate_service(service_name, services[service_name], has_shared_port)
 
 
-def validate_service(service_name, service):
+def validate_service(service_name, service, has_shared_port=False):
     """Test that a service contains a valid configuration."""
     expected_keys = [
         "service_class",
@@ -128,11 +244,66 @@ def validate_service(service_name, service):
         if not isinstance(service[field], str):
             raise ValueError(f"Invalid config: {field} fields should be a string")
 
-    if not isinstance(service["port"], int):
+    if "port" not in service and not has_shared_port:
+        raise ValueError(
+            f"Invalid config: {service_name} should contain a port"
+            " unless a shared port is defined"
+        )
+
+    if "port" in service and not isinstance(service["port"], int):
         raise ValueError("Invalid config: port should be an integer")
 
+    if "api_call_intervals" in service and not isinstance(
+        service["api_call_intervals"], int
+    ):
+        raise ValueError("Invalid config: api_call_intervals should be an integer")
+
+    if "api_call_jitter" in service and not is_non_negative_number(
+        service["api_call_jitter"]
+    ):
+        raise ValueError("Invalid config: api_call_jitter should be a number")
+
+    valid_json_decoders = ["auto", "json", "orjson"]
+    if service.get("json_decoder", "auto") not in valid_json_decoders:
+        raise ValueError(
+            f"Invalid config: {service_name} json_decoder must be one of"
+            f" {', '.join(valid_json_decoders)}"
+        )
+
+    valid_collection_modes = ["poll", "scrape"]
+    if service.get("collection", "poll") not in valid_collection_modes:
+        raise ValueError(
+            f"Invalid config: {service_name} collection must be one of"
+            f" {', '.join(valid_collection_modes)}"
+        )
+
     validate_metrics_mapping(service_name, service["prometheus_metrics_mapping"])
 
+    if "transport" in service:
+        validate_transport(service_name, service["transport"])
+
+    if "execution" in service:
+        validate_execution(service_name, service["execution"])
+
+    if "cache" in service:
+        validate_cache(service_name, service["cache"])
+
+    if "datastores" in service:
+        validate_datastores(service_name, service["datastores"])
+
+    if "circuit_breaker" in service:
+        validate_block(
+            f"{service_name} circuit_breaker",
+            service["circuit_breaker"],
+            {"failure_threshold": POSITIVE_INTEGER, "reset_timeout": POSITIVE_NUMBER},
+        )
+
+    if "rate_limit" in service:
+        validate_rate_limit(service_name, service["rate_limit"])
+
+    if "prometheus_metric_retention" in service:
+        validate_metric_retention(service_name, service["prometheus_metric_retention"])
+
 
 def validate_metrics_mapping(service_name, metrics_mapping):
     """Test that the metrics mapping of a service is valid."""
@@ -165,3 +336,220 @@ def validate_metrics_mapping(service_name, metrics_mapping):
             raise ValueError(
                 f"Invalid config: {service_name} metric '{metric}' is not a string"
             )
+
+
+def is_non_negative_number(value):
+    """Return whether a config value is a number that is zero or more."""
+    return (
+        isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+    )
+
+
+def is_positive_number(value):
+    """Return whether a config value is a number that is more than zero."""
+    return is_non_negative_number(value) and value > 0
+
+
+def is_positive_integer(value):
+    """Return whether a config value is an integer that is more than zero."""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+NON_NEGATIVE_NUMBER = (is_non_negative_number, "a number that is zero or more")
+POSITIVE_NUMBER = (is_positive_number, "a positive number")
+POSITIVE_INTEGER = (is_positive_integer, "a positive integer")
+BOOLEAN = (lambda value: isinstance(value, bool), "a boolean")
+STRING = (lambda value: isinstance(value, str), "a string")
+DICT = (lambda value: isinstance(value, dict), "a dict")
+
+
+def one_of(*valid_values):
+    """Return a field type that only accepts the given values."""
+    return (lambda value: value in valid_values, f"one of {', '.join(valid_values)}")
+
+
+def validate_block(block_name, block, fields):
+    """
+    Test that an optional block of the config is a dict that only contains supported
+    fields, each field being a tuple of a check function and a description.
+    """
+    if not isinstance(block, dict):
+        raise ValueError(f"Invalid config: {block_name} should be a dict")
+
+    for field, value in block.items():
+        if field not in fields:
+            raise ValueError(
+                f"Invalid config: {block_name} field '{field}' is not supported"
+            )
+
+        check, description = fields[field]
+
+        if not check(value):
+            raise ValueError(
+                f"Invalid config: {block_name} {field} should be {description}"
+            )
+
+
+def validate_transport(service_name, transport):
+    """Test that the transport settings of a service are valid."""
+    validate_block(
+        f"{service_name} transport",
+        transport,
+        {
+            "pool_size": POSITIVE_INTEGER,
+            "connect_timeout": POSITIVE_NUMBER,
+            "read_timeout": POSITIVE_NUMBER,
+            "retries": (
+                lambda value: isinstance(value, int)
+                and not isinstance(value, bool)
+                and value >= 0,
+                "an integer that is zero or more",
+            ),
+            "backoff_factor": NON_NEGATIVE_NUMBER,
+            "gzip": BOOLEAN,
+        },
+    )
+
+
+def validate_execution(service_name, execution):
+    """Test that the metric execution settings of a service are valid."""
+    validate_block(
+        f"{service_name} execution",
+        execution,
+        {
+            "mode": one_of("sequential", "concurrent"),
+            "max_workers": POSITIVE_INTEGER,
+            "metric_timeout": POSITIVE_NUMBER,
+            "process_workers": POSITIVE_INTEGER,
+        },
+    )
+
+
+def validate_cache(service_name, cache):
+    """Test that the cache settings of a service are valid."""
+    validate_block(
+        f"{service_name} cache",
+        cache,
+        {
+            "ttl": NON_NEGATIVE_NUMBER,
+            "stale_while_revalidate": NON_NEGATIVE_NUMBER,
+            "max_entries": POSITIVE_INTEGER,
+            "shared": BOOLEAN,
+            "revalidate": BOOLEAN,
+        },
+    )
+
+
+def validate_datastores(service_name, datastores):
+    """Test that the settings of each datastore of a service are valid."""
+    if not isinstance(datastores, dict):
+        raise ValueError(f"Invalid config: {service_name} datastores should be a dict")
+
+    for name_of_datastore, datastore in datastores.items():
+        validate_block(
+            f"{service_name} datastore {name_of_datastore}",
+            datastore,
+            {
+                "api_url": STRING,
+                "params": DICT,
+                "headers": DICT,
+                "ttl": NON_NEGATIVE_NUMBER,
+                "stale_while_revalidate": NON_NEGATIVE_NUMBER,
+                "api_call_intervals": POSITIVE_INTEGER,
+                "pagination": DICT,
+                "stream": BOOLEAN,
+                "incremental": DICT,
+                "revalidate": BOOLEAN,
+                "projection": (
+                    lambda value: isinstance(value, list)
+                    and all(isinstance(path, str) and path for path in value),
+                    "a list of dotted paths",
+                ),
+            },
+        )
+
+        if "pagination" in datastore:
+            validate_pagination(
+                f"{service_name} datastore {name_of_datastore}",
+                datastore["pagination"],
+            )
+
+        if "incremental" in datastore:
+            validate_incremental(
+                f"{service_name} datastore {name_of_datastore}",
+                datastore["incremental"],
+            )
+
+
+def validate_rate_limit(service_name, rate_limit):
+    """Test that the rate limit settings of a service are valid."""
+    validate_block(
+        f"{service_name} rate_limit",
+        rate_limit,
+        {
+            "requests_per_second": POSITIVE_NUMBER,
+            "burst": POSITIVE_INTEGER,
+            "max_wait": NON_NEGATIVE_NUMBER,
+            "max_backoff": POSITIVE_NUMBER,
+            "key_header": STRING,
+        },
+    )
+
+
+def validate_metric_retention(service_name, metric_retention):
+    """Test that the retention policy of each labeled metric of a service is valid."""
+    if not isinstance(metric_retention, dict):
+        raise ValueError(
+            f"Invalid config: {service_name} prometheus_metric_retention should be a dict"
+        )
+
+    for metric, retention in metric_retention.items():
+        validate_block(
+            f"{service_name} retention of {metric}",
+            retention,
+            {"max_idle_cycles": POSITIVE_INTEGER},
+        )
+
+
+def validate_pagination(datastore_name, pagination):
+    """Test that the pagination settings of a datastore are valid."""
+    validate_block(
+        f"{datastore_name} pagination",
+        pagination,
+        {
+            "strategy": one_of("offset", "cursor", "link"),
+            "records_path": STRING,
+            "page_size": POSITIVE_INTEGER,
+            "limit_param": STRING,
+            "offset_param": STRING,
+            "cursor_param": STRING,
+            "cursor_path": STRING,
+            "max_pages": POSITIVE_INTEGER,
+        },
+    )
+
+
+def validate_incremental(datastore_name, incremental):
+    """Test that the incremental read settings of a datastore are valid."""
+    validate_block(
+        f"{datastore_name} incremental",
+        incremental,
+        {
+            "watermark_param": STRING,
+            "watermark_field": STRING,
+            "records_path": STRING,
+            "key_field": STRING,
+            "initial_watermark": (
+                lambda value: isinstance(value, (str, int, float))
+                and not isinstance(value, bool),
+                "a string or a number",
+            ),
+            "max_records": POSITIVE_INTEGER,
+        },
+    )
+
+    for field in ["watermark_param", "watermark_field"]:
+        if field not in incremental:
+            raise ValueError(
+                f"Invalid config: {datastore_name} incremental needs {field}"
+            )
@@ -0,0 +1,63 @@
+"""Module that decodes API responses and keeps only the fields metrics need."""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+DEFAULT_DECODER = "auto"
+
+
+def get_decoder(name=DEFAULT_DECODER):
+    """
+    Return the function that decodes a JSON response body. `auto` uses orjson when it
+    is installed, which decodes bytes directly and is several times faster than json.
+    """
+    if name == "orjson" and orjson is None:
+        raise ImportError(
+            "orjson is required for the orjson decoder: pip install collectington[fast]"
+        )
+
+    if name == "json" or orjson is None:
+        return json.loads
+
+    return orjson.loads
+
+
+def compile_projection(paths):
+    """
+    Return the tree of the dotted paths of a projection, e.g. `incidents.transitions`
+    becomes `{"incidents": {"transitions": {}}}`. An empty tree keeps the whole value.
+    """
+    tree = {}
+
+    for path in paths:
+        node = tree
+
+        for key in path.split("."):
+            node = node.setdefault(key, {})
+
+    return tree
+
+
+def project(document, tree):
+    """
+    Return a copy of a JSON document with only the fields of a projection tree. A path
+    that goes through a list applies to every item of the list, and fields that are not
+    in the document are left out.
+    """
+    if not tree:
+        return document
+
+    if isinstance(document, list):
+        return [project(item, tree) for item in document]
+
+    if isinstance(document, dict):
+        return {
+            key: project(document[key], subtree)
+            for key, subtree in tree.items()
+            if key in document
+        }
+
+    return document
@@ -15,3 +15,23 @@ class UndefinedMetricException(Exception):
 
 class UnsupportedPrometheusInstance(Exception):
     """The prometheus instance being used in not supported."""
+
+
+class RateLimitedException(Exception):
+    """The API cannot be called before its rate limit allows it."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenException(Exception):
+    """The upstream kept failing and is not called until its circuit breaker resets."""
+
+
+class HttpStatusException(Exception):
+    """The API answered with a status code that is not a success."""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
@@ -0,0 +1,214 @@
+"""Module that keeps API calls within the rate limits of upstream APIs."""
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from collectington.exceptions.collection_exceptions import RateLimitedException
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+DEFAULT_RATE_LIMIT_CONFIG = {
+    "requests_per_second": None,
+    "burst": 1,
+    "max_wait": 5,
+    "max_backoff": 300,
+    "key_header": None,
+}
+
+# throttled responses that are not successful, whatever their headers say
+THROTTLED_STATUS_CODES = (429,)
+
+REMAINING_HEADERS = ("RateLimit-Remaining", "X-RateLimit-Remaining")
+RESET_HEADERS = ("RateLimit-Reset", "X-RateLimit-Reset")
+
+# reset headers above this value are a UNIX time rather than a number of seconds
+EPOCH_THRESHOLD = 10**9
+
+
+def parse_retry_after(value):
+    """
+    Return the number of seconds of a Retry-After header, which is either a number of
+    seconds or an HTTP date, or None if the header is missing or invalid.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value):
+    """Return the number of seconds until a rate limit reset header, or None."""
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+
+    if reset > EPOCH_THRESHOLD:
+        reset -= time.time()
+
+    return max(0, reset)
+
+
+def get_header(headers, names):
+    """Return the first header found among several names, or None."""
+    for name in names:
+        if name in headers:
+            return headers[name]
+
+    return None
+
+
+class RequestGovernor:
+    """
+    Decides when the requests to a host (and API key) can be sent.
+
+    - Requests are spread by a token bucket of `requests_per_second`, which allows
+      bursts of up to `burst` requests.
+    - A throttled response (429, or Retry-After on a 503) blocks every request until
+      the time given by Retry-After. Without Retry-After, the block doubles with every
+      throttled response in a row, up to `max_backoff` seconds.
+    - A response saying no request is remaining blocks requests until the limit resets.
+
+    A request is delayed by up to `max_wait` seconds; if it would wait longer, it is
+    refused with a RateLimitedException instead.
+    """
+
+    def __init__(
+        self,
+        requests_per_second=DEFAULT_RATE_LIMIT_CONFIG["requests_per_second"],
+        burst=DEFAULT_RATE_LIMIT_CONFIG["burst"],
+        max_wait=DEFAULT_RATE_LIMIT_CONFIG["max_wait"],
+        max_backoff=DEFAULT_RATE_LIMIT_CONFIG["max_backoff"],
+    ):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_backoff = max_backoff
+
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self.backoff = 0
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self):
+        """The limits of the governor, as a `rate_limit` block without `key_header`."""
+        return {
+            "requests_per_second": self.requests_per_second,
+            "burst": self.burst,
+            "max_wait": self.max_wait,
+            "max_backoff": self.max_backoff,
+        }
+
+    def update_limits(self, requests_per_second, burst, max_wait, max_backoff):
+        """Apply new limits, keeping the blocks and the backoff asked for by the API."""
+        with self._lock:
+            self.requests_per_second = requests_per_second
+            self.burst = burst
+            self.max_wait = max_wait
+            self.max_backoff = max_backoff
+            self.tokens = min(self.tokens, burst)
+
+    def reserve(self):
+        """
+        Reserve a request and return the number of seconds to wait before sending it.
+        Raise a RateLimitedException if the request would wait longer than `max_wait`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0, self.blocked_until - now)
+
+            if self.requests_per_second is not None:
+                self.tokens = min(
+                    self.burst,
+                    self.tokens + (now - self.updated_at) * self.requests_per_second,
+                )
+                self.updated_at = now
+                wait = max(wait, (1 - self.tokens) / self.requests_per_second)
+
+            if wait > self.max_wait:
+                raise RateLimitedException(
+                    f"Rate limited for {wait:.1f} seconds", retry_after=wait
+                )
+
+            if self.requests_per_second is not None:
+                # a delayed request takes a token in advance
+                self.tokens -= 1
+
+            return wait
+
+    def record_response(self, status_code, headers):
+        """
+        Update the limits from a response. Return the number of seconds requests are
+        blocked for if the response was throttled, or None.
+        """
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        throttled = status_code in THROTTLED_STATUS_CODES or (
+            status_code == 503 and retry_after is not None
+        )
+
+        with self._lock:
+            if throttled:
+                if retry_after is None:
+                    self.backoff = min(self.max_backoff, max(1, self.backoff * 2))
+                    retry_after = self.backoff
+
+                self._block(retry_after)
+
+                return retry_after
+
+            if status_code < 400:
+                self.backoff = 0
+
+            if get_header(headers, REMAINING_HEADERS) in ("0", 0):
+                reset = parse_reset(get_header(headers, RESET_HEADERS))
+
+                if reset is not None:
+                    self._block(reset)
+
+        return None
+
+    def _block(self, seconds):
+        """Block every request for a number of seconds."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_GOVERNORS = {}
+_LOCK = threading.Lock()
+
+
+def get_request_governor(url, headers, rate_limit_config):
+    """
+    Return the governor of the host of a URL, and of the API key found in the
+    `key_header` header if any. Services calling the same host with the same key share
+    a governor, with the limits of the `rate_limit` block it was last requested with
+    (e.g. after a reload), so these services should have the same limits.
+    """
+    options = {**DEFAULT_RATE_LIMIT_CONFIG, **rate_limit_config}
+    key_header = options.pop("key_header")
+    key = (
+        urlsplit(url).netloc,
+        (headers or {}).get(key_header) if key_header else None,
+    )
+
+    with _LOCK:
+        governor = _GOVERNORS.get(key)
+
+        if governor is None:
+            governor = _GOVERNORS[key] = RequestGovernor(**options)
+        elif governor.limits != options:
+            governor.update_limits(**options)
+
+        return governor
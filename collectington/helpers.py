@@ -0,0 +1,196 @@
+"""
+Helpers for metric methods: a memoized timestamp parser, and aggregators that are fed
+one value at a time so no intermediate list has to be built.
+
+    mean_time_to_resolve = RunningMean()
+    mean_time_to_resolve.update(
+        minutes_between(incident["startTime"], incident["resolvedTime"])
+        for incident in incidents
+    )
+"""
+import math
+
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+@lru_cache(maxsize=65536)
+def parse_timestamp(timestamp):
+    """
+    Parse an ISO-8601 timestamp, e.g. `2021-03-01T12:30:00Z`. Results are memoized, since
+    the same timestamps are parsed again on every cycle while their records are returned
+    by the API.
+    """
+    if timestamp.endswith("Z"):
+        timestamp = f"{timestamp[:-1]}+00:00"
+
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        # offsets without a colon (e.g. +0000) before Python 3.11
+        return datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+
+
+def minutes_between(start, end):
+    """Return the number of minutes between two ISO-8601 timestamps."""
+    return (parse_timestamp(end) - parse_timestamp(start)).total_seconds() / 60
+
+
+class RunningMean:
+    """The mean of the values added so far, or None before the first value."""
+
+    __slots__ = ("count", "total")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def add(self, value):
+        """Add a value."""
+        self.count += 1
+        self.total += value
+
+    def update(self, values):
+        """Add every value of an iterable, e.g. a generator expression."""
+        for value in values:
+            self.add(value)
+
+    @property
+    def mean(self):
+        """The mean of the values, or None if there are none."""
+        if not self.count:
+            return None
+
+        return self.total / self.count
+
+
+class MinMax:
+    """The lowest and highest values added so far, or None before the first value."""
+
+    __slots__ = ("min", "max")
+
+    def __init__(self):
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """Add a value."""
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def update(self, values):
+        """Add every value of an iterable, e.g. a generator expression."""
+        for value in values:
+            self.add(value)
+
+
+class TDigest:
+    """
+    Approximate quantiles of the values added so far, in bounded memory (a merging
+    t-digest). Values are gathered into at most about `compression` centroids, which
+    are smaller near the extremes so the tail quantiles stay accurate.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        # (mean, weight) of every centroid, sorted by mean
+        self.centroids = []
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._buffer = []
+
+    def add(self, value):
+        """Add a value."""
+        self._buffer.append(value)
+        self.count += 1
+
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def update(self, values):
+        """Add every value of an iterable, e.g. a generator expression."""
+        for value in values:
+            self.add(value)
+
+    def _scale(self, quantile):
+        """Return the k1 scale function of a quantile."""
+        return self.compression / (2 * math.pi) * math.asin(2 * quantile - 1)
+
+    def _inverse_scale(self, scale):
+        """Return the quantile of a value of the k1 scale function."""
+        return (math.sin(scale * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        """Merge the buffered values into the centroids."""
+        if not self._buffer:
+            return
+
+        points = sorted(self.centroids + [(value, 1) for value in self._buffer])
+        self._buffer = []
+
+        total = self.count
+        merged = []
+        weight_so_far = 0
+        weight_limit = total * self._inverse_scale(self._scale(0) + 1)
+        mean, weight = points[0]
+
+        for point_mean, point_weight in points[1:]:
+            if weight_so_far + weight + point_weight <= weight_limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                weight_so_far += weight
+                merged.append((mean, weight))
+                weight_limit = total * self._inverse_scale(
+                    self._scale(weight_so_far / total) + 1
+                )
+                mean, weight = point_mean, point_weight
+
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, quantile):
+        """Return the approximate value of a quantile between 0 and 1, or None."""
+        self._compress()
+
+        if not self.centroids:
+            return None
+
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+
+        target = quantile * self.count
+
+        # every centroid is centered on its cumulative weight, between the extremes
+        centers = [0]
+        means = [self.min]
+        cumulative_weight = 0
+
+        for mean, weight in self.centroids:
+            centers.append(cumulative_weight + weight / 2)
+            means.append(mean)
+            cumulative_weight += weight
+
+        centers.append(self.count)
+        means.append(self.max)
+
+        index = min(max(bisect_left(centers, target), 1), len(centers) - 1)
+        left, right = centers[index - 1], centers[index]
+
+        if right == left:
+            return means[index]
+
+        return means[index - 1] + (means[index] - means[index - 1]) * (
+            target - left
+        ) / (right - left)
@@ -0,0 +1,99 @@
+"""Module that reads only the new records of time-windowed APIs."""
+import threading
+
+from collectington.pagination import get_path, set_path
+
+DEFAULT_INCREMENTAL_CONFIG = {
+    "records_path": "",
+    "key_field": "id",
+    "initial_watermark": None,
+    "max_records": None,
+}
+
+
+class IncrementalDatastore:
+    """
+    The records of a datastore that is read incrementally.
+
+    Every request only asks for the records after the watermark: the highest value of
+    `watermark_field` seen so far, sent as the `watermark_param` request param. Records
+    are de-duplicated by `key_field` across overlapping windows, a record that is sent
+    again replaces the previous one. The records of every request are kept, so metric
+    methods see the whole history as if it was read at once, up to `max_records`
+    records after which the oldest records are dropped.
+    """
+
+    def __init__(
+        self,
+        watermark_param,
+        watermark_field,
+        records_path=DEFAULT_INCREMENTAL_CONFIG["records_path"],
+        key_field=DEFAULT_INCREMENTAL_CONFIG["key_field"],
+        initial_watermark=DEFAULT_INCREMENTAL_CONFIG["initial_watermark"],
+        max_records=DEFAULT_INCREMENTAL_CONFIG["max_records"],
+    ):
+        self.watermark_param = watermark_param
+        self.watermark_field = watermark_field
+        self.records_path = records_path
+        self.key_field = key_field
+        self.max_records = max_records
+
+        self.watermark = initial_watermark
+        # every record by key, from the least to the most recently read
+        self.records = {}
+        # number of distinct records read so far, including dropped records
+        self.records_seen = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, incremental_config):
+        """Create an incremental datastore from the `incremental` block of a datastore."""
+        return cls(**{**DEFAULT_INCREMENTAL_CONFIG, **incremental_config})
+
+    def get_params(self, params):
+        """Return the request params, asking only for the records after the watermark."""
+        if self.watermark is None:
+            return params
+
+        return {**params, self.watermark_param: self.watermark}
+
+    def merge(self, document):
+        """
+        Add the records of a response to the records read so far and advance the
+        watermark.
+
+        Return the document with every record at `records_path`, and the records whose
+        key was not seen before.
+        """
+        new_records = []
+
+        with self._lock:
+            for record in get_path(document, self.records_path):
+                key = get_path(record, self.key_field)
+
+                if self.records.pop(key, None) is None:
+                    new_records.append(record)
+                self.records[key] = record
+
+                try:
+                    watermark = get_path(record, self.watermark_field)
+                except (KeyError, TypeError):
+                    continue
+
+                if self.watermark is None or watermark > self.watermark:
+                    self.watermark = watermark
+
+            self.records_seen += len(new_records)
+
+            if self.max_records is not None:
+                for key in list(self.records)[: -self.max_records]:
+                    del self.records[key]
+
+            all_records = list(self.records.values())
+
+        if not self.records_path:
+            return all_records, new_records
+
+        set_path(document, self.records_path, all_records)
+
+        return document, new_records
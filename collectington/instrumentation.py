@@ -0,0 +1,130 @@
+"""Module that defines the metrics collectington exposes about itself."""
+import threading
+import weakref
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# fetch and cycle durations are in the order of a second, metric evaluations are faster
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+EVALUATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5, 30)
+
+
+class CollectorMetrics:
+    """
+    Metrics about the health and timing of collectington, exposed next to the metrics
+    of the services. Every service of a registry shares these metrics, labeled by service.
+
+    These make it possible to tell a collector that is stuck from an API that has nothing
+    new to report.
+    """
+
+    def __init__(self, registry):
+        self.datastore_fetch_seconds = Histogram(
+            "collectington_datastore_fetch_seconds",
+            "Time taken to read a datastore from its API",
+            ["service", "datastore"],
+            buckets=DURATION_BUCKETS,
+            registry=registry,
+        )
+        self.http_responses = Counter(
+            "collectington_http_responses",
+            "Number of API responses by HTTP status code",
+            ["service", "status"],
+            registry=registry,
+        )
+        self.http_response_bytes = Counter(
+            "collectington_http_response_bytes",
+            "Number of bytes received from APIs",
+            ["service"],
+            registry=registry,
+        )
+        self.throttled_requests = Counter(
+            "collectington_throttled_requests",
+            "Number of API requests refused by the rate limit of the API,"
+            " before (local) or after (upstream) being sent",
+            ["service", "reason"],
+            registry=registry,
+        )
+        self.datastore_cache_requests = Counter(
+            "collectington_datastore_cache_requests",
+            "Number of datastore reads by cache result (fresh, stale or miss)",
+            ["service", "datastore", "result"],
+            registry=registry,
+        )
+        self.datastore_unchanged = Counter(
+            "collectington_datastore_unchanged",
+            "Number of API responses whose datastore did not change, by reason"
+            " (not_modified or same_body)",
+            ["service", "datastore", "reason"],
+            registry=registry,
+        )
+        self.errors = Counter(
+            "collectington_errors",
+            "Number of errors by stage (fetch, metric, publish, cycle or checkpoint) and"
+            " error type",
+            ["service", "stage", "error"],
+            registry=registry,
+        )
+        self.datastore_circuit_open = Gauge(
+            "collectington_datastore_circuit_open",
+            "Whether the API of a datastore is no longer called after failing repeatedly",
+            ["service", "datastore"],
+            registry=registry,
+        )
+        self.metric_stale = Gauge(
+            "collectington_metric_stale",
+            "Whether the last cycle failed to update a metric, which keeps its last value",
+            ["service", "metric"],
+            registry=registry,
+        )
+        self.metric_last_success = Gauge(
+            "collectington_metric_last_success_timestamp_seconds",
+            "Time a metric was last updated",
+            ["service", "metric"],
+            registry=registry,
+        )
+        self.metric_evaluation_seconds = Histogram(
+            "collectington_metric_evaluation_seconds",
+            "Time taken to evaluate a metric method",
+            ["service", "metric"],
+            buckets=EVALUATION_BUCKETS,
+            registry=registry,
+        )
+        self.cycle_duration_seconds = Histogram(
+            "collectington_cycle_duration_seconds",
+            "Time taken to process every metric of a service",
+            ["service"],
+            buckets=DURATION_BUCKETS,
+            registry=registry,
+        )
+        self.cycle_overruns = Counter(
+            "collectington_cycle_overruns",
+            "Number of cycles that took longer than the interval of the service",
+            ["service"],
+            registry=registry,
+        )
+        self.last_successful_cycle = Gauge(
+            "collectington_last_successful_cycle_timestamp_seconds",
+            "Time of the last cycle of a service that published every metric",
+            ["service"],
+            registry=registry,
+        )
+
+
+# collector metrics of every registry, dropped with the registry so a registry created
+# later never gets the metrics of a registry that no longer exists
+_COLLECTOR_METRICS = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def get_collector_metrics(registry):
+    """Return the collector metrics of a registry, registering them on first use."""
+    with _LOCK:
+        collector_metrics = _COLLECTOR_METRICS.get(registry)
+
+        if collector_metrics is None:
+            collector_metrics = _COLLECTOR_METRICS[registry] = CollectorMetrics(
+                registry
+            )
+
+        return collector_metrics
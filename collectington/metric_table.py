@@ -0,0 +1,56 @@
+"""Module to define columnar values of labeled metrics."""
+
+
+def to_list(column):
+    """
+    Return a column as a list. NumPy arrays and array.array columns are converted in a
+    single call, which also turns their items into plain Python numbers.
+    """
+    if hasattr(column, "tolist"):
+        return column.tolist()
+
+    return column
+
+
+class MetricTable:
+    """
+    The values of a labeled metric, as columns instead of a list of dicts.
+
+    A metric method with labels can return a MetricTable instead of one dict per series,
+    so no dict has to be built, copied and split for every series on every cycle:
+
+        @register_metric("number_of_incidents_per_team")
+        def get_number_of_incidents_per_team(self):
+            return MetricTable(
+                labels={"team_name": team_names, "stack": stacks},
+                values=incident_counts,
+            )
+
+    Every column must have the same length, a ValueError is raised when the table is
+    published otherwise. Columns can be lists, tuples, array.array or NumPy arrays.
+    """
+
+    __slots__ = ("labels", "values")
+
+    def __init__(self, labels, values):
+        self.labels = labels
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def rows(self, label_list):
+        """
+        Yield a tuple of label values and the metric value for every series. Raise a
+        ValueError if a column does not have as many items as the values.
+        """
+        columns = [to_list(self.labels[label]) for label in label_list]
+        values = to_list(self.values)
+
+        for label, column in zip(label_list, columns):
+            if len(column) != len(values):
+                raise ValueError(
+                    f"Column {label} has {len(column)} items, expected {len(values)}"
+                )
+
+        return zip(zip(*columns), values)
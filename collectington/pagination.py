@@ -0,0 +1,287 @@
+"""Module that defines how paginated API responses are read page by page."""
+import json
+
+from requests.utils import parse_header_links
+
+from collectington.logger import setup_logging
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson is an optional dependency
+    ijson = None
+
+LOGGER = setup_logging()
+
+DEFAULT_PAGINATION_CONFIG = {
+    "strategy": None,
+    "records_path": "",
+    "page_size": 100,
+    "limit_param": "limit",
+    "offset_param": "offset",
+    "cursor_param": "cursor",
+    "cursor_path": "next_cursor",
+    "max_pages": None,
+}
+
+
+def get_path(document, path):
+    """Return the value at a dotted path (e.g. `data.incidents`) of a JSON document."""
+    for key in filter(None, path.split(".")):
+        document = document[key]
+
+    return document
+
+
+def set_path(document, path, value):
+    """Set the value at a dotted path of a JSON document."""
+    *parents, key = path.split(".")
+
+    get_path(document, ".".join(parents))[key] = value
+
+
+class PageRecords:
+    """The records of a page, counted as they are consumed."""
+
+    def __init__(self, records):
+        self.records = records
+        self.count = 0
+
+    def __iter__(self):
+        for record in self.records:
+            self.count += 1
+            yield record
+
+
+class PageResponse:
+    """
+    A response that was read whole, e.g. by aiohttp, with the attributes of a
+    requests.Response that pagination strategies use.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def links(self):
+        """The links of the Link header, keyed by their relation."""
+        return {
+            link.get("rel") or link.get("url"): link
+            for link in parse_header_links(self.headers.get("Link", ""))
+        }
+
+
+class Pagination:
+    """
+    Base class of pagination strategies, it reads a single page.
+
+    A strategy requests pages one after the other, using `fetch(url, params, stream)`
+    which must return a requests.Response-like object, and reads the records found at
+    `records_path` of every page. Only one page is held in memory at a time.
+
+    The `_async` variants are used by asyncio services: `fetch(url, params)` is then a
+    coroutine function that returns a PageResponse, and pages are always decoded whole.
+    """
+
+    # whether records can be decoded while the page is being downloaded
+    can_stream_page = True
+
+    def __init__(self, records_path="", max_pages=None, decode=json.loads, **options):
+        self.records_path = records_path
+        self.max_pages = max_pages
+        self.decode = decode
+        self.options = options
+
+    def prepare_first_request(self, params):
+        """Add the params of the first page to the request params."""
+
+    def next_request(self, url, params, response, document, records_in_page):
+        """Return the url and params of the next page, or None after the last page."""
+        return None
+
+    def iter_pages(self, fetch, url, params, stream=False):
+        """
+        Yield the decoded document and the records of every page. The records of a page
+        must be consumed before the next page is requested.
+
+        When `stream` is set and ijson is installed, records are decoded while the page
+        is being downloaded and no document is decoded.
+        """
+        params = dict(params or {})
+        self.prepare_first_request(params)
+        request = (url, params)
+        pages = 0
+
+        while request is not None:
+            url, params = request
+            response = fetch(url, params, stream)
+
+            if stream and ijson is not None and self.can_stream_page:
+                response.raw.decode_content = True
+                prefix = f"{self.records_path}.item" if self.records_path else "item"
+                document = None
+                records = PageRecords(ijson.items(response.raw, prefix, use_float=True))
+            else:
+                document = self.decode(response.content)
+                records = PageRecords(get_path(document, self.records_path))
+
+            try:
+                yield document, records
+            finally:
+                # a streamed page holds its connection until it is closed
+                if stream:
+                    response.close()
+
+            pages += 1
+            if self.max_pages is not None and pages >= self.max_pages:
+                LOGGER.warning("Stopped reading %s after %s pages", url, pages)
+                return
+
+            request = self.next_request(url, params, response, document, records.count)
+
+    async def iter_pages_async(self, fetch, url, params):
+        """Yield the decoded document and the records of every page."""
+        params = dict(params or {})
+        self.prepare_first_request(params)
+        request = (url, params)
+        pages = 0
+
+        while request is not None:
+            url, params = request
+            response = await fetch(url, params)
+            document = self.decode(response.content)
+            records = PageRecords(get_path(document, self.records_path))
+
+            yield document, records
+
+            pages += 1
+            if self.max_pages is not None and pages >= self.max_pages:
+                LOGGER.warning("Stopped reading %s after %s pages", url, pages)
+                return
+
+            request = self.next_request(url, params, response, document, records.count)
+
+    def iter_records(self, fetch, url, params, stream=False):
+        """Yield every record of every page, without holding more than a page in memory."""
+        for _, records in self.iter_pages(fetch, url, params, stream):
+            yield from records
+
+    async def iter_records_async(self, fetch, url, params):
+        """Yield every record of every page, without holding more than a page in memory."""
+        async for _, records in self.iter_pages_async(fetch, url, params):
+            for record in records:
+                yield record
+
+    def collect(self, fetch, url, params):
+        """
+        Read every page into a single document: the first page, with the records of
+        every page at `records_path`. This is used when a datastore is not streamed.
+        """
+        document = None
+        all_records = []
+
+        for page_document, records in self.iter_pages(fetch, url, params):
+            if document is None:
+                document = page_document
+            all_records.extend(records)
+
+        if not self.records_path:
+            return all_records
+
+        set_path(document, self.records_path, all_records)
+
+        return document
+
+    async def collect_async(self, fetch, url, params):
+        """Read every page into a single document, the same way as collect."""
+        document = None
+        all_records = []
+
+        async for page_document, records in self.iter_pages_async(fetch, url, params):
+            if document is None:
+                document = page_document
+            all_records.extend(records)
+
+        if not self.records_path:
+            return all_records
+
+        set_path(document, self.records_path, all_records)
+
+        return document
+
+
+class SinglePage(Pagination):
+    """The API returns every record in a single page."""
+
+
+class OffsetPagination(Pagination):
+    """Pages are requested with a limit and an offset, until a page is not full."""
+
+    def prepare_first_request(self, params):
+        params[self.options["limit_param"]] = self.options["page_size"]
+        params.setdefault(self.options["offset_param"], 0)
+
+    def next_request(self, url, params, response, document, records_in_page):
+        if records_in_page < self.options["page_size"]:
+            return None
+
+        next_params = dict(params)
+        next_params[self.options["offset_param"]] = (
+            int(params[self.options["offset_param"]]) + records_in_page
+        )
+
+        return url, next_params
+
+
+class CursorPagination(Pagination):
+    """Pages are requested with the cursor found in the previous page, until there is none."""
+
+    # the cursor is only known once the whole page is decoded
+    can_stream_page = False
+
+    def next_request(self, url, params, response, document, records_in_page):
+        try:
+            cursor = get_path(document, self.options["cursor_path"])
+        except (KeyError, TypeError):
+            cursor = None
+
+        if not cursor:
+            return None
+
+        next_params = dict(params)
+        next_params[self.options["cursor_param"]] = cursor
+
+        return url, next_params
+
+
+class LinkHeaderPagination(Pagination):
+    """Pages are requested with the `next` URL of the Link header (RFC 8288)."""
+
+    def next_request(self, url, params, response, document, records_in_page):
+        next_link = response.links.get("next")
+
+        if next_link is None:
+            return None
+
+        # the next URL already contains every param
+        return next_link["url"], {}
+
+
+PAGINATION_STRATEGIES = {
+    None: SinglePage,
+    "offset": OffsetPagination,
+    "cursor": CursorPagination,
+    "link": LinkHeaderPagination,
+}
+
+
+def create_pagination(pagination_config, decode=json.loads):
+    """
+    Create a pagination strategy from the `pagination` block of a datastore config, which
+    decodes pages with `decode`.
+    """
+    options = {**DEFAULT_PAGINATION_CONFIG, **pagination_config}
+    strategy = PAGINATION_STRATEGIES[options.pop("strategy")]
+
+    return strategy(decode=decode, **options)
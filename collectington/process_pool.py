@@ -0,0 +1,187 @@
+"""Module to evaluate CPU-bound metric methods in a pool of processes."""
+import multiprocessing
+import pickle
+import time
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from collectington.collectington_api import MISSING, _get_delta_metric
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+# attributes of the service that are copied to the worker processes
+SNAPSHOT_ATTRIBUTES = ["config", "service_name", "name_of_datastore", "api_url"]
+
+# the service of the current cycle in a worker process, by shared memory block name
+_worker_service = (None, None)
+
+
+def create_process_pool(service_config):
+    """
+    Create the pool of processes used to evaluate CPU-bound metrics, based on the
+    `process_workers` field of the optional `execution` block of a service config.
+
+    Return None if the service does not use a process pool.
+    """
+    process_workers = service_config.get("execution", {}).get("process_workers")
+
+    if process_workers is None:
+        return None
+
+    # worker processes are spawned since forking a process that runs threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=process_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def get_metric_function(service, metric):
+    """Return the metric method registered for a metric, or None."""
+    method_name = type(service)._metric_registry.get(metric)
+
+    if method_name is None:
+        return None
+
+    return getattr(type(service), method_name)
+
+
+def is_cpu_bound(service, metric):
+    """Return whether the method of a metric is marked with cpu_bound."""
+    return hasattr(get_metric_function(service, metric), "_cpu_bound")
+
+
+def _get_worker_service(service_class, block_name, size):
+    """
+    Return the copy of the service the metrics of a cycle run on in a worker process.
+    The snapshot of the cycle is only read from shared memory by the first metric.
+    """
+    global _worker_service  # pylint: disable=global-statement
+
+    if _worker_service[0] != block_name:
+        block = shared_memory.SharedMemory(block_name)
+
+        try:
+            with block.buf[:size] as data:
+                snapshot = pickle.loads(data)
+        finally:
+            block.close()
+
+        service = service_class.__new__(service_class)
+        service.__dict__.update(snapshot["attributes"])
+        service._datastore_views = {}
+        service._datastore_view_locks = {}
+        service.get_data_from_store = snapshot["datastores"].__getitem__
+
+        _worker_service = (block_name, service)
+
+    return _worker_service[1]
+
+
+def _evaluate_metric(service_class, method_name, block_name, size):
+    """
+    Evaluate a metric method in a worker process and return its value and how long it
+    took. The delta of a delta metric is computed by the service, not by the worker.
+    """
+    service = _get_worker_service(service_class, block_name, size)
+    metric_func = getattr(service_class, method_name)
+
+    if getattr(metric_func, "_delta_metric", False):
+        metric_func = metric_func.__wrapped__
+
+    start = time.perf_counter()
+    # errors are raised to the service, which reports the metric as missing
+    value = metric_func(service)
+
+    return value, time.perf_counter() - start
+
+
+class CpuBoundBatch:
+    """
+    The CPU-bound metrics of a cycle, submitted to a process pool together.
+
+    The datastores the metrics read are pickled once into a shared memory block, which
+    every worker reads once per cycle however many metrics it evaluates.
+    """
+
+    def __init__(self, service, metrics, process_pool):
+        self.service = service
+
+        names_of_datastores = sorted(
+            {
+                name_of_datastore
+                for metric in metrics
+                for name_of_datastore in get_metric_function(service, metric)._cpu_bound
+            }
+        )
+        snapshot = {
+            "attributes": {
+                attribute: getattr(service, attribute)
+                for attribute in SNAPSHOT_ATTRIBUTES
+            },
+            "datastores": {
+                name_of_datastore: service.get_data_from_store(name_of_datastore)
+                for name_of_datastore in names_of_datastores
+            },
+        }
+        data = pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+
+        self.block = shared_memory.SharedMemory(create=True, size=len(data))
+        self.block.buf[: len(data)] = data
+
+        self.futures = {
+            process_pool.submit(
+                _evaluate_metric,
+                type(service),
+                type(service)._metric_registry[metric],
+                self.block.name,
+                len(data),
+            ): metric
+            for metric in metrics
+        }
+
+    def results(self, metric_timeout=None):
+        """
+        Wait for the metrics and return their values. Metrics that do not finish within
+        `metric_timeout` seconds are left out of the result and reported as missing.
+        """
+        try:
+            done, not_done = wait(self.futures, timeout=metric_timeout)
+
+            for future in not_done:
+                future.cancel()
+
+            if not_done:
+                LOGGER.warning(
+                    "Metrics timed out and are reported as missing: %s",
+                    ", ".join(sorted(self.futures[future] for future in not_done)),
+                )
+
+            return dict(self._get_value(future) for future in done)
+        finally:
+            self.block.close()
+            self.block.unlink()
+
+    def _get_value(self, future):
+        """Return the metric of a finished future and its value."""
+        metric = self.futures[future]
+
+        try:
+            value, duration = future.result()
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.error("Failed to evaluate %s: %s", metric, err)
+            self.service.record_error("metric", err)
+            return metric, MISSING
+
+        self.service.get_collector_metrics().metric_evaluation_seconds.labels(
+            self.service.service_name, metric
+        ).observe(duration)
+
+        metric_func = get_metric_function(self.service, metric)
+        if getattr(metric_func, "_delta_metric", False):
+            value = _get_delta_metric(
+                self.service, metric_func.__wrapped__.__name__, value
+            )
+
+        return metric, value
@@ -0,0 +1,80 @@
+"""Module that tells when the config file has to be read again."""
+import os
+import signal
+import threading
+
+from collectington.config import get_config
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+
+class ConfigReloader:
+    """
+    Watches the config file of the process. The config is read again after a SIGHUP,
+    or when the modification time of the file changes if `watch` is set.
+
+    The signal handler only records the request: the config is read and applied by
+    whoever polls the reloader, outside of the signal handler.
+    """
+
+    def __init__(self, path, watch=False):
+        self.path = path
+        self.watch = watch
+        self._mtime = self._get_mtime()
+        self._requested = threading.Event()
+
+    def install_signal_handler(self):
+        """Reload the config on SIGHUP, on platforms that have it."""
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_sighup)
+
+    @staticmethod
+    def install_unsupported_signal_handler():
+        """
+        Report a SIGHUP instead of reloading the config, for engines that cannot reload
+        it. Without a handler, a SIGHUP would terminate the process.
+        """
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(
+                signal.SIGHUP,
+                lambda signum, frame: LOGGER.warning(
+                    "Received SIGHUP, reloading the config is unsupported by the"
+                    " async engine"
+                ),
+            )
+
+    def _on_sighup(self, signum, frame):  # pylint: disable=unused-argument
+        LOGGER.info("Received SIGHUP, reloading config from %s", self.path)
+        self._requested.set()
+
+    def request_reload(self):
+        """Read the config again on next poll."""
+        self._requested.set()
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        """
+        Return the new config when it has to be reloaded, or None. A config that cannot
+        be read or is invalid is reported and ignored, the current config is kept.
+        """
+        mtime = self._get_mtime()
+        changed = self.watch and mtime is not None and mtime != self._mtime
+
+        if not changed and not self._requested.is_set():
+            return None
+
+        self._requested.clear()
+        self._mtime = mtime
+
+        try:
+            return get_config(self.path)
+        except Exception as err:  # pylint: disable=broad-except
+            # a config of the wrong shape can fail validation with any error
+            LOGGER.error("Failed to reload config, keeping the current config: %s", err)
+            return None
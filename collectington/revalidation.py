@@ -0,0 +1,76 @@
+"""Module that tells whether a datastore changed since it was last read."""
+import hashlib
+
+NOT_MODIFIED = "not_modified"
+SAME_BODY = "same_body"
+
+
+def get_body_hash(body):
+    """Return the hash of a response body."""
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class DatastoreRevalidation:
+    """
+    The validators of the last response of a datastore, and the datastore read from it.
+
+    Requests are sent with If-None-Match and If-Modified-Since when the API sent an ETag
+    or a Last-Modified header. Without validators, the body of every response is hashed
+    instead. A `304 Not Modified` response, or a body that is the same as the last one,
+    means the datastore did not change: the last datastore is reused as is, without
+    decoding the response again.
+    """
+
+    def __init__(self):
+        # (etag, last modified, body hash, datastore) of the last response, replaced
+        # at once so concurrent refreshes never mix the validators of two responses
+        self.last = (None, None, None, None)
+
+    @property
+    def value(self):
+        """The datastore read from the last response, or None."""
+        return self.last[3]
+
+    def get_headers(self, headers):
+        """Return the request headers, with the validators of the last response."""
+        etag, last_modified, _, value = self.last
+
+        if value is None or (etag is None and last_modified is None):
+            return headers
+
+        headers = dict(headers or {})
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        return headers
+
+    def check(self, status_code, headers, body):
+        """
+        Return why the datastore did not change (not_modified or same_body) and the
+        hash of the body, which is None when the API sent validators.
+        """
+        _, _, body_hash, value = self.last
+
+        if value is not None and status_code == 304:
+            return NOT_MODIFIED, None
+
+        if headers.get("ETag") is not None or headers.get("Last-Modified") is not None:
+            return None, None
+
+        new_body_hash = get_body_hash(body)
+
+        if value is not None and new_body_hash == body_hash:
+            return SAME_BODY, new_body_hash
+
+        return None, new_body_hash
+
+    def update(self, headers, body_hash, value):
+        """Keep the validators of a response and the datastore read from it."""
+        self.last = (
+            headers.get("ETag"),
+            headers.get("Last-Modified"),
+            body_hash,
+            value,
+        )
@@ -1,44 +1,474 @@
 """File to run the API for a service."""
+import asyncio
 import sys
+import threading
 import time
 import traceback
 
 from argparse import ArgumentParser
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
 
-from prometheus_client import start_http_server
+from prometheus_client import REGISTRY, CollectorRegistry, start_http_server
 
-from collectington.config import get_config, get_service, get_list_of_available_metrics
+from collectington.collectington_api import MISSING
+from collectington.config import (
+    get_api_call_intervals,
+    get_api_call_jitter,
+    get_collection_mode,
+    get_config,
+    get_list_of_available_metrics,
+    get_metric_definitions,
+    get_port,
+    get_service,
+)
 from collectington.logger import setup_logging
+from collectington.process_pool import (
+    CpuBoundBatch,
+    create_process_pool,
+    is_cpu_bound,
+)
 from collectington.ascii_art import print_ascii
+from collectington.async_runner import run_event_loop
+from collectington.reloader import ConfigReloader
+from collectington.scheduler import Job, Scheduler
+from collectington.state_store import DEFAULT_STATE_STORE_CONFIG, create_state_store
 
+LOGGER = setup_logging()
 
-def process_request(service, metrics_list, metric_instances_list):
+SEQUENTIAL_MODE = "sequential"
+CONCURRENT_MODE = "concurrent"
+
+POLL_COLLECTION = "poll"
+SCRAPE_COLLECTION = "scrape"
+
+THREADED_ENGINE = "threaded"
+ASYNC_ENGINE = "async"
+
+
+def process_request(
+    service,
+    metrics_list,
+    metric_instances_list,
+    executor=None,
+    metric_timeout=None,
+    process_pool=None,
+):
     """Receive request for an API service
     Return formatted output of metrics.
+
+    Metrics are evaluated one at a time unless an executor is provided, in which case
+    they are evaluated concurrently. With a process pool, CPU-bound metrics are sent to
+    the pool first and evaluated while the other metrics are. Either way the results
+    are only published once every metric has either finished or timed out.
+
+    Return whether every metric was evaluated and published.
     """
-    service_metric_dict = {}
+    cpu_bound_batch = None
+
+    if process_pool is not None:
+        cpu_bound_metrics = [
+            metric for metric in metrics_list if is_cpu_bound(service, metric)
+        ]
+
+        if cpu_bound_metrics:
+            metrics_list = [
+                metric for metric in metrics_list if metric not in cpu_bound_metrics
+            ]
+
+            try:
+                cpu_bound_batch = CpuBoundBatch(
+                    service, cpu_bound_metrics, process_pool
+                )
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.error("Failed to evaluate CPU-bound metrics: %s", err)
+                service.record_error("metric", err)
+
+    if executor is None:
+        metric_values = {
+            metric: evaluate_metric(service, metric) for metric in metrics_list
+        }
+    else:
+        metric_values = evaluate_metrics_concurrently(
+            service, metrics_list, executor, metric_timeout
+        )
+
+    if cpu_bound_batch is not None:
+        metric_values.update(cpu_bound_batch.results(metric_timeout))
+
+    return service.publish_metric_values(metric_values, metric_instances_list)
+
+
+def evaluate_metric(service, metric, defer_delta=False):
+    """
+    Evaluate a metric method. A metric that fails is counted and reported as missing,
+    so it does not prevent the other metrics of the cycle from being published.
+    """
+    try:
+        return service.get_metric(metric, defer_delta=defer_delta)
+    except Exception as err:  # pylint: disable=broad-except
+        LOGGER.error("Failed to evaluate %s: %s", metric, err)
+        service.record_error("metric", err)
+        return MISSING
+
+
+def evaluate_metrics_concurrently(service, metrics_list, executor, metric_timeout):
+    """
+    Evaluate metric methods on a thread pool.
+
+    Each metric is given `metric_timeout` seconds from the moment it starts running.
+    Metrics that time out, or that wait in the queue for longer than the timeout because
+    the pool is busy, are left out of the result and reported as missing. The delta of
+    a delta metric is only computed for the metrics in the result, so a metric that
+    finishes after its timeout is counted by the next cycle instead of being lost.
+    """
+    submitted_at = time.monotonic()
+    started_at = {}
+
+    def evaluate(metric):
+        started_at[metric] = time.monotonic()
+        return evaluate_metric(service, metric, defer_delta=True)
+
+    futures = {executor.submit(evaluate, metric): metric for metric in metrics_list}
+    pending = set(futures)
+    timed_out = set()
+    metric_values = {}
+
+    while pending:
+        done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            metric_values[futures[future]] = future.result()
+
+        if metric_timeout is None:
+            continue
+
+        now = time.monotonic()
+
+        for future in pending:
+            start = started_at.get(futures[future], submitted_at)
+            if now - start >= metric_timeout:
+                # a queued metric is cancelled, a running one is left to finish on its own
+                future.cancel()
+                timed_out.add(future)
+
+        pending -= timed_out
+
+    if timed_out:
+        LOGGER.warning(
+            "Metrics timed out and are reported as missing: %s",
+            ", ".join(sorted(futures[future] for future in timed_out)),
+        )
+
+    return {
+        metric: service.get_metric_delta(metric, value)
+        for metric, value in metric_values.items()
+    }
+
+
+def create_metric_executor(service_config):
+    """
+    Create the thread pool used to evaluate metrics, based on the optional `execution`
+    block of a service config.
+
+    Return the executor and the per-metric timeout, or no executor in sequential mode.
+    The timeout is returned whatever the mode, as it also bounds CPU-bound metrics and
+    the metrics of async services.
+    """
+    execution = service_config.get("execution", {})
+
+    if execution.get("mode", SEQUENTIAL_MODE) == SEQUENTIAL_MODE:
+        return None, execution.get("metric_timeout")
+
+    executor = ThreadPoolExecutor(
+        max_workers=execution.get("max_workers", 4),
+        thread_name_prefix="collectington-metric",
+    )
+
+    return executor, execution.get("metric_timeout")
+
+
+def get_schedule(config, service_name):
+    """
+    Get the interval and jitter of a service, and the interval of each datastore that
+    is refreshed on a schedule of its own.
+    """
+    datastore_intervals = {
+        name_of_datastore: datastore["api_call_intervals"]
+        for name_of_datastore, datastore in config["services"][service_name]
+        .get("datastores", {})
+        .items()
+        if "api_call_intervals" in datastore
+    }
+
+    return (
+        get_api_call_intervals(config, service_name),
+        get_api_call_jitter(config, service_name),
+        datastore_intervals,
+    )
+
+
+class ServiceRunner:
+    """
+    Everything that is required to poll a single service: the service instance, its
+    metrics, its Prometheus instances and its own polling interval.
+
+    Several service runners can share one process, each running on its own schedule.
+    A service collected on scrape has no schedule: a cycle runs every time Prometheus
+    scrapes its port, see ServiceCollector.
+    """
+
+    def __init__(self, config, service_name, registry=REGISTRY):
+        self.service_name = service_name
+        self.config = config
+        self.registry = registry
+        # jobs of the service in the scheduler
+        self.jobs = []
+        # a cycle and a config reload never run at the same time
+        self._lock = threading.Lock()
+
+        self.service = get_service(config, service_name)
+        self.service.registry = registry
+
+        # the collection mode of a service is only applied on restart
+        self.scrape_driven = (
+            get_collection_mode(config, service_name) == SCRAPE_COLLECTION
+        )
+        is_async = asyncio.iscoroutinefunction(self.service.fetch_datastore)
+        if is_async and config.get("engine", THREADED_ENGINE) != ASYNC_ENGINE:
+            raise ValueError(
+                f"Async service {service_name} can only run with the async engine"
+            )
+        if self.scrape_driven and is_async:
+            raise ValueError(
+                f"Async service {service_name} cannot be collected on scrape"
+            )
+        self.service.scrape_driven = self.scrape_driven
+
+        # a generic service class can be shared by several services of the config
+        if not self.service.service_name:
+            self.service.service_name = service_name
+        if self.service.config is None:
+            self.service.config = config
+
+        self.metrics_list = get_list_of_available_metrics(config, service_name)
+
+        LOGGER.info("Generating Prometheus Metric Instances for %s", service_name)
+        self.metric_instances_list = self.service.generate_prometheus_metric_instances()
+
+        self.executor, self.metric_timeout = create_metric_executor(
+            config["services"][service_name]
+        )
+        self.process_pool = create_process_pool(config["services"][service_name])
+        self.interval, self.jitter, self.datastore_intervals = get_schedule(
+            config, service_name
+        )
+
+        self.collector = None
+        if self.scrape_driven:
+            self.collector = ServiceCollector(self)
+            registry.register(self.collector)
+
+    def process(self):
+        """Process a single API request for the service."""
+        with self._lock:
+            start = time.monotonic()
+
+            self.service.prefetch_datastores()
+            successful = process_request(
+                self.service,
+                self.metrics_list,
+                self.metric_instances_list,
+                self.executor,
+                self.metric_timeout,
+                self.process_pool,
+            )
+
+            self.record_cycle(time.monotonic() - start, successful)
+
+    def record_cycle(self, duration, successful=True):
+        """
+        Record the duration of a cycle of the service, and its time if every metric of
+        the cycle was published.
+        """
+        collector_metrics = self.service.get_collector_metrics()
+
+        collector_metrics.cycle_duration_seconds.labels(self.service_name).observe(
+            duration
+        )
+        if duration > self.interval:
+            collector_metrics.cycle_overruns.labels(self.service_name).inc()
+        if successful:
+            collector_metrics.last_successful_cycle.labels(
+                self.service_name
+            ).set_to_current_time()
+
+    def reload(self, config):
+        """
+        Apply a new config to the service, once its current cycle is over.
+
+        Only the Prometheus instances of the metrics that were added, or whose type or
+        labels changed, are created again: every other instance keeps its series.
+        Datastores whose settings changed are requested again on next use.
+
+        Return whether the schedule of the service changed.
+        """
+        old_service_config = self.config["services"][self.service_name]
+        new_service_config = config["services"][self.service_name]
+
+        with self._lock:
+            self.service.config = config
+            if self.service.api_url == old_service_config["api_url"]:
+                self.service.api_url = new_service_config["api_url"]
+
+            self._reload_metric_instances(config)
+            self._reload_datastores(old_service_config, new_service_config)
+
+            if old_service_config.get("execution") != new_service_config.get(
+                "execution"
+            ):
+                self._shutdown_executors()
+                self.executor, self.metric_timeout = create_metric_executor(
+                    new_service_config
+                )
+                self.process_pool = create_process_pool(new_service_config)
+
+            schedule = get_schedule(config, self.service_name)
+            schedule_changed = schedule != (
+                self.interval,
+                self.jitter,
+                self.datastore_intervals,
+            )
+            self.interval, self.jitter, self.datastore_intervals = schedule
+            self.config = config
+
+        return schedule_changed
+
+    def _reload_metric_instances(self, config):
+        """Replace the Prometheus instances of the metrics that changed."""
+        old_definitions = get_metric_definitions(self.config, self.service_name)
+        new_definitions = get_metric_definitions(config, self.service_name)
+        reused_instances = {}
+
+        for metric, p_instance in zip(self.metrics_list, self.metric_instances_list):
+            if new_definitions.get(metric) == old_definitions[metric]:
+                reused_instances[metric] = p_instance
+            else:
+                LOGGER.info("Removing metric %s of %s", metric, self.service_name)
+                if not self.scrape_driven:
+                    self.registry.unregister(p_instance)
+
+        self.metrics_list = get_list_of_available_metrics(config, self.service_name)
+        self.metric_instances_list = self.service.generate_prometheus_metric_instances(
+            reused_instances
+        )
+
+    def _reload_datastores(self, old_service_config, new_service_config):
+        """
+        Forget the transport, cache and datastores whose settings changed. Changed
+        `rate_limit` settings are applied by the governors on the next request.
+        """
+        service = self.service
+
+        if old_service_config.get("transport") != new_service_config.get("transport"):
+            if service.transport is not None:
+                service.transport.close()
+            service.transport = None
+
+        if old_service_config.get("circuit_breaker") != new_service_config.get(
+            "circuit_breaker"
+        ):
+            service._circuit_breakers = {}
+
+        url_changed = old_service_config["api_url"] != new_service_config["api_url"]
+        old_datastores = old_service_config.get("datastores", {})
+        new_datastores = new_service_config.get("datastores", {})
+
+        for name_of_datastore in {
+            service.name_of_datastore,
+            *old_datastores,
+            *new_datastores,
+        } - {None}:
+            if url_changed or old_datastores.get(
+                name_of_datastore
+            ) != new_datastores.get(name_of_datastore):
+                service.reset_datastore(name_of_datastore)
 
-    for metric in metrics_list:
-        metric_value = service.get_metric(metric)
+        if old_service_config.get("cache") != new_service_config.get("cache"):
+            # every datastore is requested again with the new cache
+            service.data_store = None
 
-        if metric_value is None:
-            metric_value = 0
+    def get_state(self):
+        """Return the state of the service between two of its cycles."""
+        with self._lock:
+            return self.service.get_state()
 
-        service_metric_dict[metric] = metric_value
+    def stop(self):
+        """Stop exposing the metrics of the service, once its current cycle is over."""
+        with self._lock:
+            if self.collector is not None:
+                self.registry.unregister(self.collector)
+            else:
+                for p_instance in self.metric_instances_list:
+                    self.registry.unregister(p_instance)
 
-    service.call_prometheus_metrics(service_metric_dict, metric_instances_list)
+            self._shutdown_executors()
+
+    def _shutdown_executors(self):
+        """Shut the metric executors down without waiting for their running metrics."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False)
+
+
+class ServiceCollector:
+    """
+    A Prometheus collector that runs a cycle of a service when its port is scraped, and
+    returns the metric families of the service right away.
+
+    The service costs nothing while nobody scrapes it, and its metrics are as fresh as
+    the scrape. The API is only called when a datastore has expired, so the TTL of the
+    datastores bounds how often it is called however often the port is scraped.
+    Counters, histograms and summaries are updated once per scrape.
+    """
+
+    def __init__(self, service_runner):
+        self.service_runner = service_runner
+
+    def describe(self):
+        """Describe the metrics of the service without running a cycle."""
+        for p_instance in self.service_runner.metric_instances_list:
+            yield from p_instance.describe()
+
+    def collect(self):
+        """Run a cycle of the service and return its metric families."""
+        run(self.service_runner)
+
+        for p_instance in self.service_runner.metric_instances_list:
+            yield from p_instance.collect()
 
 
 def parse_args():
     """Parse functions passed to program."""
-    parser = ArgumentParser(description="Add a service for Prometheus to monitor.")
+    parser = ArgumentParser(description="Add services for Prometheus to monitor.")
 
-    parser.add_argument(
+    services = parser.add_mutually_exclusive_group(required=True)
+
+    services.add_argument(
         "-s",
         "--service",
         type=str,
-        required=True,
-        help="Provide the name of a service to be monitored",
+        help="Provide the name of a service to be monitored, "
+        "or a comma separated list of services",
+    )
+
+    services.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="Monitor every service defined in the configuration file",
     )
 
     parser.add_argument(
@@ -51,44 +481,276 @@ def parse_args():
 
     args = vars(parser.parse_args())
 
-    return (args["service"], args["config"])
+    service_names = None if args["all"] else args["service"].split(",")
+
+    return (service_names, args["config"])
 
 
-def run(service, metrics_list, metric_instances_list):
-    """Try to process an API request."""
+def run(service_runner, name_of_datastore=None):
+    """
+    Try to process an API request, or to refresh a single datastore. A cycle that fails
+    is counted and reported, and the service is tried again on its next tick.
+    """
     try:
-        process_request(service, metrics_list, metric_instances_list)
-        time.sleep(config["api_call_intervals"])
-    except Exception as err:
+        if name_of_datastore is None:
+            service_runner.process()
+        else:
+            service_runner.service.refresh_datastore(name_of_datastore)
+    except Exception as err:  # pylint: disable=broad-except
         traceback.print_exc()
-        logger.error("Error has occurred: %s", err)
-        sys.exit(1)
+        LOGGER.error("Error has occurred in %s: %s", service_runner.service_name, err)
+        service_runner.service.record_error("cycle", err)
 
 
-if __name__ == "__main__":
+def schedule_service_runner(scheduler, service_runner):
+    """
+    Add a job for a service, and for every datastore with its own interval. A service
+    collected on scrape has no jobs.
+    """
+    if service_runner.scrape_driven:
+        service_runner.jobs = []
+        return
 
-    service_name, config_path = parse_args()
+    service_runner.jobs = [
+        scheduler.add_job(
+            service_runner.service_name,
+            service_runner.interval,
+            partial(run, service_runner),
+            service_runner.jitter,
+        )
+    ]
 
-    print_ascii()
+    for name_of_datastore, interval in service_runner.datastore_intervals.items():
+        service_runner.jobs.append(
+            scheduler.add_job(
+                f"{service_runner.service_name}-{name_of_datastore}",
+                interval,
+                partial(run, service_runner, name_of_datastore),
+                service_runner.jitter,
+            )
+        )
 
-    logger = setup_logging()
 
-    logger.info("Reading config from %s", config_path)
+def unschedule_service_runner(scheduler, service_runner):
+    """Remove the jobs of a service from the scheduler."""
+    for job in service_runner.jobs:
+        scheduler.remove_job(job)
 
-    config = get_config(config_path)
+    service_runner.jobs = []
+
+
+def schedule_service_runners(scheduler, service_runners):
+    """Add the jobs of every service."""
+    for service_runner in service_runners:
+        schedule_service_runner(scheduler, service_runner)
+
+
+def create_service_runners(config, service_names):
+    """
+    Create a service runner for each service.
+
+    Services that share a port share a registry, so they are exposed together. Every
+    other port gets a registry of its own. The first port uses the default registry
+    which also includes the process and platform metrics.
+
+    Return the service runners and the registry of each port.
+    """
+    registries = {}
+    service_runners = []
+
+    for service_name in service_names:
+        if service_name not in config["services"]:
+            raise ValueError(f"Service {service_name} is not defined in the config")
+
+        port = get_port(config, service_name)
+
+        if port not in registries:
+            registries[port] = CollectorRegistry() if registries else REGISTRY
+
+        LOGGER.info("Setting up Service: %s", service_name)
+        service_runners.append(ServiceRunner(config, service_name, registries[port]))
+
+    return service_runners, registries
+
+
+def restore_state(state_store, service_runners):
+    """Restore the saved state of every service, before their first cycle."""
+    states = state_store.load()
+
+    for service_runner in service_runners:
+        if service_runner.service_name in states:
+            LOGGER.info("Restoring the state of %s", service_runner.service_name)
+            service_runner.service.restore_state(states[service_runner.service_name])
 
-    logger.info("Setting up Service: %s", service_name)
-    api_service = get_service(config, service_name)
 
-    list_of_metrics = get_list_of_available_metrics(config, service_name)
+def checkpoint_state(state_store, service_runners):
+    """
+    Save the state of every service. A failed checkpoint is counted and reported for
+    every service, and retried on the next one.
+    """
+    try:
+        state_store.save(
+            {
+                service_runner.service_name: service_runner.get_state()
+                for service_runner in service_runners
+            }
+        )
+    except Exception as err:  # pylint: disable=broad-except
+        # a state that cannot be serialized fails with any error, e.g. a TypeError
+        LOGGER.error("Failed to save the state of the services: %s", err)
+
+        for service_runner in service_runners:
+            service_runner.service.record_error("checkpoint", err)
+
+
+def reload_service_runners(
+    config, service_names, service_runners, registries, scheduler
+):
+    """
+    Apply a reloaded config to a running process, without restarting it.
+
+    Services that are still configured are reloaded in place, services that were
+    removed are stopped, and services that were added are started. When every
+    service is monitored, `service_names` is None. The HTTP servers keep running, and a
+    new port gets an HTTP server of its own.
+
+    Return the service runners of the new config.
+    """
+    if service_names is None:
+        service_names = list(config["services"])
+
+    running = {runner.service_name: runner for runner in service_runners}
+    reloaded = []
+
+    for service_name in service_names:
+        if service_name not in config["services"]:
+            LOGGER.error("Service %s is no longer defined in the config", service_name)
+            continue
+
+        service_runner = running.pop(service_name, None)
+        port = get_port(config, service_name)
+
+        try:
+            if service_runner is None:
+                LOGGER.info("Setting up Service: %s", service_name)
+                if port not in registries:
+                    LOGGER.info("Setting up HTTP Server - PORT: %s", port)
+                    registries[port] = CollectorRegistry()
+                    start_http_server(port, registry=registries[port])
+
+                service_runner = ServiceRunner(config, service_name, registries[port])
+                schedule_service_runner(scheduler, service_runner)
+            else:
+                if port != get_port(service_runner.config, service_name):
+                    LOGGER.warning(
+                        "The port of %s changed, it is applied on restart", service_name
+                    )
+                if get_collection_mode(config, service_name) != get_collection_mode(
+                    service_runner.config, service_name
+                ):
+                    LOGGER.warning(
+                        "The collection mode of %s changed, it is applied on restart",
+                        service_name,
+                    )
+
+                if service_runner.reload(config):
+                    unschedule_service_runner(scheduler, service_runner)
+                    schedule_service_runner(scheduler, service_runner)
+        except Exception as err:  # pylint: disable=broad-except
+            traceback.print_exc()
+            LOGGER.error("Failed to reload %s: %s", service_name, err)
+
+        if service_runner is not None:
+            reloaded.append(service_runner)
+
+    for service_runner in running.values():
+        LOGGER.info("Stopping Service: %s", service_runner.service_name)
+        unschedule_service_runner(scheduler, service_runner)
+        service_runner.stop()
+
+    return reloaded
+
 
-    logger.info("Generating Prometheus Metric Instances")
-    list_of_metric_instances = api_service.generate_prometheus_metric_instances()
+def main():
+    """Set up every requested service and poll them until an error occurs."""
+    service_names, config_path = parse_args()
 
-    logger.info(
-        "Setting up HTTP Server - PORT: %s", config["services"][service_name]["port"]
+    print_ascii()
+
+    LOGGER.info("Reading config from %s", config_path)
+
+    config = get_config(config_path)
+
+    # service_names stays None with -a, so services added on reload are picked up
+    service_runners, registries = create_service_runners(
+        config, service_names or list(config["services"])
     )
-    start_http_server(config["services"][service_name]["port"])
 
-    while True:
-        run(api_service, list_of_metrics, list_of_metric_instances)
+    for port, registry in registries.items():
+        LOGGER.info("Setting up HTTP Server - PORT: %s", port)
+        start_http_server(port, registry=registry)
+
+    state_store = None
+    if "state_store" in config:
+        state_store = create_state_store(config["state_store"])
+        checkpoint_interval = config["state_store"].get(
+            "checkpoint_interval", DEFAULT_STATE_STORE_CONFIG["checkpoint_interval"]
+        )
+        restore_state(state_store, service_runners)
+
+    if config.get("engine", THREADED_ENGINE) == ASYNC_ENGINE:
+        ConfigReloader.install_unsupported_signal_handler()
+
+        jobs = []
+        if state_store is not None:
+            jobs.append(
+                Job(
+                    "state-store",
+                    checkpoint_interval,
+                    partial(
+                        asyncio.to_thread,
+                        checkpoint_state,
+                        state_store,
+                        service_runners,
+                    ),
+                )
+            )
+        run_event_loop(service_runners, config.get("async_http"), jobs)
+
+    scheduler = Scheduler()
+    schedule_service_runners(scheduler, service_runners)
+
+    if state_store is not None:
+        # the list of service runners is updated in place when the config is reloaded
+        scheduler.add_job(
+            "state-store",
+            checkpoint_interval,
+            partial(checkpoint_state, state_store, service_runners),
+        )
+
+    scheduler.start()
+
+    reloader = ConfigReloader(config_path, config.get("watch_config", False))
+    reloader.install_signal_handler()
+
+    # cycles never raise, so a job only stops if its thread dies unexpectedly
+    while scheduler.is_alive():
+        time.sleep(1)
+
+        new_config = reloader.poll()
+
+        if new_config is not None:
+            LOGGER.info("Reloading config from %s", config_path)
+            reloader.watch = new_config.get("watch_config", False)
+            service_runners[:] = reload_service_runners(
+                new_config, service_names, service_runners, registries, scheduler
+            )
+
+    if state_store is not None:
+        checkpoint_state(state_store, service_runners)
+
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Module to run jobs on fixed wall-clock boundaries instead of sleeping between runs."""
+import math
+import random
+import threading
+import time
+
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+
+class Job:
+    """
+    A function that runs every `interval` seconds, on the wall-clock boundaries of its
+    interval (e.g. every full minute for an interval of 60 seconds).
+
+    Each job is shifted by a random offset of up to `jitter` seconds, so jobs with the
+    same interval do not all call their API at the same time. The offset is fixed for the
+    lifetime of the job, so the period stays exact and the schedule never drifts.
+
+    When a run takes longer than the interval, the missed ticks are skipped instead of
+    being run back to back.
+    """
+
+    def __init__(self, name, interval, func, jitter=0):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.offset = random.uniform(0, min(jitter, interval))
+        self.skipped_ticks = 0
+        self.stopped = threading.Event()
+
+    def next_tick(self, now):
+        """Return the first tick of the job strictly after `now`."""
+        ticks = math.floor((now - self.offset) / self.interval) + 1
+
+        return ticks * self.interval + self.offset
+
+    def count_skipped_ticks(self, scheduled_at, next_tick):
+        """Count and report the ticks that were missed by a run scheduled at `scheduled_at`."""
+        skipped = max(0, round((next_tick - scheduled_at) / self.interval) - 1)
+
+        if skipped:
+            self.skipped_ticks += skipped
+            LOGGER.warning(
+                "%s took longer than its interval, skipping %s tick(s)",
+                self.name,
+                skipped,
+            )
+
+        return skipped
+
+    def run_once(self, scheduled_at):
+        """Run the job and return the time of its next tick."""
+        self.func()
+
+        next_tick = self.next_tick(time.time())
+        self.count_skipped_ticks(scheduled_at, next_tick)
+
+        return next_tick
+
+
+class Scheduler:
+    """
+    Runs every job in a thread of its own, so a slow job never delays the others.
+    A job runs once as soon as the scheduler starts, then on every tick.
+
+    Jobs can be added and removed while the scheduler is running.
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self._threads = {}
+        self._started = False
+
+    def add_job(self, name, interval, func, jitter=0):
+        """Add a job to the scheduler, and start it if the scheduler is running."""
+        job = Job(name, interval, func, jitter)
+        self.jobs.append(job)
+
+        if self._started:
+            self._start_job(job)
+
+        return job
+
+    def remove_job(self, job):
+        """Stop a job after its current run and remove it from the scheduler."""
+        job.stopped.set()
+        self.jobs.remove(job)
+        self._threads.pop(job, None)
+
+    def run_job(self, job):
+        """Run a job on every tick until it is stopped."""
+        scheduled_at = time.time()
+
+        while not job.stopped.is_set():
+            scheduled_at = job.run_once(scheduled_at)
+            job.stopped.wait(max(0, scheduled_at - time.time()))
+
+    def _start_job(self, job):
+        """Start the thread of a job."""
+        thread = self._threads[job] = threading.Thread(
+            target=self.run_job,
+            args=(job,),
+            name=f"collectington-{job.name}",
+            daemon=True,
+        )
+        thread.start()
+
+    def start(self):
+        """Start a thread for every job."""
+        self._started = True
+
+        for job in self.jobs:
+            self._start_job(job)
+
+    def is_alive(self):
+        """Return whether every job is still running."""
+        return all(thread.is_alive() for thread in self._threads.values())
+
+    def stop(self):
+        """Stop every job after its current run."""
+        threads = list(self._threads.values())
+
+        for job in self.jobs:
+            job.stopped.set()
+
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,101 @@
+"""Module that keeps the state of services across restarts."""
+import json
+import os
+import sqlite3
+import tempfile
+
+from contextlib import closing
+
+from collectington.logger import setup_logging
+
+LOGGER = setup_logging()
+
+DEFAULT_STATE_STORE_CONFIG = {
+    "backend": "file",
+    "checkpoint_interval": 60,
+}
+
+
+class FileStateStore:
+    """
+    Keeps the state of every service in a JSON file.
+
+    The file is replaced atomically: the state is written to a temporary file in the
+    same directory which is then renamed, so a crash never leaves a partial file behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Return the saved state of every service, by service name."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as err:
+            LOGGER.warning("Ignoring unreadable state file %s: %s", self.path, err)
+            return {}
+
+    def save(self, states):
+        """Save the state of the given services, keeping the state of the others."""
+        states = {**self.load(), **states}
+
+        file_descriptor, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=".collectington-state-",
+        )
+
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(states, file)
+                file.flush()
+                os.fsync(file.fileno())
+
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+class SqliteStateStore:
+    """Keeps the state of every service in a row of a SQLite database."""
+
+    def __init__(self, path):
+        self.path = path
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS service_state"
+                " (service TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+
+    def load(self):
+        """Return the saved state of every service, by service name."""
+        with closing(sqlite3.connect(self.path)) as connection:
+            rows = connection.execute("SELECT service, state FROM service_state")
+
+            return {service: json.loads(state) for service, state in rows}
+
+    def save(self, states):
+        """Save the state of the given services in a single transaction."""
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO service_state (service, state) VALUES (?, ?)",
+                [(service, json.dumps(state)) for service, state in states.items()],
+            )
+
+
+STATE_STORE_BACKENDS = {
+    "file": FileStateStore,
+    "sqlite": SqliteStateStore,
+}
+
+
+def create_state_store(state_store_config):
+    """Create a state store from the `state_store` block of the config."""
+    options = {**DEFAULT_STATE_STORE_CONFIG, **state_store_config}
+
+    return STATE_STORE_BACKENDS[options["backend"]](options["path"])
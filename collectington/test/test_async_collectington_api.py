@@ -0,0 +1,177 @@
+"""Test that the asyncio API class is operating as expected."""
+import asyncio
+import unittest
+
+from collectington.async_collectington_api import AsyncCollectingtonApi, aiohttp
+from collectington.collectington_api import (
+    enable_delta_metric,
+    register_metric,
+    register_metric_class,
+)
+
+if aiohttp is not None:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+
+@register_metric_class
+class AsyncTestApi(AsyncCollectingtonApi):
+    """An async service that reads a total from a local test server."""
+
+    def __init__(self, api_url, service_config=None):
+        super().__init__()
+        self.config = {"services": {"async_test": service_config or {}}}
+        self.service_name = "async_test"
+        self.api_url = api_url
+        self.name_of_datastore = "async_test_datastore"
+
+    @register_metric("total")
+    @enable_delta_metric
+    async def get_total(self):
+        """Return the total of the API response."""
+        response = await self.get_data_from_store(self.name_of_datastore)
+        return response["total"]
+
+    @register_metric("double_total")
+    async def get_double_total(self):
+        """Return twice the total of the API response."""
+        response = await self.get_data_from_store(self.name_of_datastore)
+        return response["total"] * 2
+
+
+@register_metric_class
+class AsyncRevalidationTestApi(AsyncTestApi):
+    """An async service that counts the evaluations of its metrics."""
+
+    def __init__(self, api_url):
+        super().__init__(api_url, {"cache": {"ttl": 0, "revalidate": True}})
+        self.evaluations = 0
+
+    @register_metric("counted_total")
+    @enable_delta_metric
+    async def get_counted_total(self):
+        """Return the total of the API response."""
+        self.evaluations += 1
+        response = await self.get_data_from_store(self.name_of_datastore)
+        return response["total"]
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncCollectingtonApi(unittest.TestCase):
+    """Test that async metrics share a single API call."""
+
+    def test_metrics_share_datastore(self):
+        """Test that concurrent metrics only read the API once and deltas are applied."""
+        requests_received = []
+
+        async def handler(request):
+            requests_received.append(request)
+            return web.json_response({"total": 5})
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", handler)
+
+            async with TestServer(app) as server, aiohttp.ClientSession() as session:
+                service = AsyncTestApi(str(server.make_url("/")))
+                service.http_session = session
+
+                return await asyncio.gather(
+                    service.get_metric("total"), service.get_metric("double_total")
+                )
+
+        self.assertEqual(asyncio.run(scenario()), [5, 10])
+        self.assertEqual(len(requests_received), 1)
+
+    def test_metric_of_unchanged_datastore_is_reused(self):
+        """Test that a metric is only evaluated again when its datastore changed."""
+        payload = {"total": 3}
+
+        async def handler(request):
+            return web.json_response(payload)
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", handler)
+
+            async with TestServer(app) as server, aiohttp.ClientSession() as session:
+                service = AsyncRevalidationTestApi(str(server.make_url("/")))
+                service.http_session = session
+
+                values = [await service.get_metric("counted_total") for _ in range(2)]
+                payload["total"] = 4
+                values.append(await service.get_metric("counted_total"))
+
+                return values, service.evaluations
+
+        self.assertEqual(asyncio.run(scenario()), ([3, 0, 1], 2))
+
+    def run_paginated(self, datastore_config, read):
+        """Run `read(service)` against a server with 5 records, 2 per page."""
+        records = [{"id": number} for number in range(5)]
+
+        async def handler(request):
+            offset = int(request.query.get("offset", 0))
+            headers = {}
+
+            if offset + 2 < len(records):
+                next_url = request.url.with_query(offset=offset + 2)
+                headers["Link"] = f'<{next_url}>; rel="next"'
+
+            return web.json_response(
+                {"incidents": records[offset : offset + 2]}, headers=headers
+            )
+
+        async def scenario():
+            app = web.Application()
+            app.router.add_get("/", handler)
+
+            async with TestServer(app) as server, aiohttp.ClientSession() as session:
+                service = AsyncTestApi(
+                    str(server.make_url("/")),
+                    {"datastores": {"async_test_datastore": datastore_config}},
+                )
+                service.http_session = session
+
+                return await read(service)
+
+        return asyncio.run(scenario())
+
+    def test_paginated_datastore(self):
+        """Test that every page of a paginated datastore is gathered."""
+        datastore = self.run_paginated(
+            {"pagination": {"strategy": "link", "records_path": "incidents"}},
+            lambda service: service.get_data_from_store("async_test_datastore"),
+        )
+
+        self.assertEqual(
+            [record["id"] for record in datastore["incidents"]], [0, 1, 2, 3, 4]
+        )
+
+    def test_iter_datastore_records(self):
+        """Test that records are read page by page with async for."""
+
+        async def read(service):
+            return [
+                record["id"]
+                async for record in service.iter_datastore_records(
+                    "async_test_datastore"
+                )
+            ]
+
+        ids = self.run_paginated(
+            {
+                "pagination": {
+                    "strategy": "offset",
+                    "records_path": "incidents",
+                    "page_size": 2,
+                }
+            },
+            read,
+        )
+
+        self.assertEqual(ids, [0, 1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Test that the datastore cache is operating as expected."""
+import threading
+import time
+import unittest
+
+from collectington.cache import FRESH, MISS, STALE, DatastoreCache
+
+
+class TestDatastoreCache(unittest.TestCase):
+    """Test the expiry, de-duplication and eviction of cached datastores."""
+
+    def test_keys_expire_independently(self):
+        """Test that every key has its own time to live."""
+        cache = DatastoreCache()
+        cache.store("short", 1)
+        cache.store("long", 2)
+
+        time.sleep(0.05)
+
+        self.assertEqual(cache.lookup("short", 0.01), (None, MISS))
+        self.assertEqual(cache.lookup("long", 10), (2, FRESH))
+
+    def test_concurrent_misses_load_once(self):
+        """Test that concurrent callers missing the same key share a single load."""
+        cache = DatastoreCache()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return "payload"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get("key", loader, 60))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["payload"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_while_revalidate(self):
+        """Test that a stale value is served while it is refreshed in the background."""
+        cache = DatastoreCache()
+        cache.store("key", "old")
+        time.sleep(0.05)
+
+        self.assertEqual(cache.lookup("key", 0.01, 10), ("old", STALE))
+        self.assertEqual(cache.get("key", lambda: "new", 0.01, 10), "old")
+
+        time.sleep(0.05)
+        self.assertEqual(cache.lookup("key", 10), ("new", FRESH))
+
+    def test_age_counts_from_start_of_load(self):
+        """Test that a value read every `ttl` seconds is loaded again on every read."""
+        cache = DatastoreCache()
+        started = time.monotonic()
+
+        def loader():
+            time.sleep(0.2)
+            return "payload"
+
+        self.assertEqual(cache.get("key", loader, 1), "payload")
+        self.assertEqual(cache.lookup("key", 1), ("payload", FRESH))
+
+        time.sleep(max(0, started + 0.97 - time.monotonic()))
+        self.assertEqual(cache.lookup("key", 1), (None, MISS))
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache stays bounded by evicting the least recently used key."""
+        cache = DatastoreCache(max_entries=2)
+        cache.store("a", 1)
+        cache.store("b", 2)
+        cache.lookup("a", 60)
+        cache.store("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.lookup("b", 60), (None, MISS))
+        self.assertEqual(cache.lookup("a", 60), (1, FRESH))
+
+    def test_failed_load_raises(self):
+        """Ensure a failed load raises to the caller and is not cached."""
+        cache = DatastoreCache()
+
+        def loader():
+            raise KeyError("total")
+
+        with self.assertRaises(KeyError):
+            cache.get("key", loader, 60)
+
+        self.assertEqual(cache.get("key", lambda: 1, 60), 1)
+
+    def test_failed_load_is_logged_by_name(self):
+        """Ensure a failed load is logged with the name of the datastore, not its key."""
+        cache = DatastoreCache()
+
+        def loader():
+            raise KeyError("total")
+
+        with self.assertLogs("DATA-COLLECTION", "ERROR") as logs:
+            with self.assertRaises(KeyError):
+                cache.get('["url", {"X-Api-Key": "s3cr3t"}]', loader, 60, name="splunk")
+
+        self.assertIn("splunk", logs.output[0])
+        self.assertNotIn("s3cr3t", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Test that upstreams that keep failing are not called."""
+import time
+import unittest
+
+from collectington.circuit_breaker import CircuitBreaker
+from collectington.exceptions.collection_exceptions import CircuitOpenException
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the transitions of the circuit breaker."""
+
+    def test_circuit_opens_after_failure_threshold(self):
+        """Test that calls are refused once there are too many failures in a row."""
+        circuit_breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+        circuit_breaker.before_call()
+        circuit_breaker.record_failure()
+        circuit_breaker.before_call()
+        circuit_breaker.record_success()
+        circuit_breaker.record_failure()
+        self.assertFalse(circuit_breaker.is_open)
+
+        circuit_breaker.record_failure()
+        self.assertTrue(circuit_breaker.is_open)
+
+        with self.assertRaises(CircuitOpenException):
+            circuit_breaker.before_call()
+
+    def test_single_trial_after_reset_timeout(self):
+        """Test that one call is let through after the timeout and decides the state."""
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        circuit_breaker.record_failure()
+        time.sleep(0.1)
+
+        circuit_breaker.before_call()
+        with self.assertRaises(CircuitOpenException):
+            circuit_breaker.before_call()
+
+        circuit_breaker.record_failure()
+        with self.assertRaises(CircuitOpenException):
+            circuit_breaker.before_call()
+
+        time.sleep(0.1)
+        circuit_breaker.before_call()
+        circuit_breaker.record_success()
+        self.assertFalse(circuit_breaker.is_open)
+        circuit_breaker.before_call()
+
+    def test_released_trial_lets_next_call_through(self):
+        """Test that a trial that neither succeeded nor failed does not keep it open."""
+        circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        circuit_breaker.record_failure()
+        time.sleep(0.1)
+
+        circuit_breaker.before_call()
+        circuit_breaker.release_trial()
+        self.assertTrue(circuit_breaker.is_open)
+
+        circuit_breaker.before_call()
+        circuit_breaker.record_success()
+        self.assertFalse(circuit_breaker.is_open)
+
+
+if __name__ == "__main__":
+    unittest.main()
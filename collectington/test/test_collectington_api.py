@@ -0,0 +1,785 @@
+"""Test that the API class is operating as expected."""
+import json
+import time
+import unittest
+
+from prometheus_client import CollectorRegistry
+
+from collectington.collectington_api import (
+    CollectingtonApi,
+    datastore_view,
+    enable_delta_metric,
+    register_metric,
+    register_metric_class,
+)
+from collectington.instrumentation import get_collector_metrics
+from collectington.metric_table import MetricTable
+from collectington.runner import process_request
+
+
+@register_metric_class
+class DeltaTestApi(CollectingtonApi):
+    """A service that returns a list of totals, one per call."""
+
+    def __init__(self, totals):
+        super().__init__()
+        self.totals = list(totals)
+        self.calls = 0
+
+    @register_metric("total")
+    @enable_delta_metric
+    def get_total(self):
+        """Return the next total."""
+        self.calls += 1
+        return self.totals.pop(0)
+
+
+class TestEnableDeltaMetric(unittest.TestCase):
+    """Test that delta metrics are calculated as expected."""
+
+    def test_delta_is_evaluated_once(self):
+        """Test that the metric method is called once per invocation."""
+        service = DeltaTestApi([10, 15, 15])
+
+        self.assertEqual(
+            [service.get_metric("total") for _ in range(3)],
+            [10, 5, 0],
+        )
+        self.assertEqual(service.calls, 3)
+
+    def test_counter_reset(self):
+        """Test that a lower total is considered a reset and counted in full."""
+        service = DeltaTestApi([100, 120, 7, 9])
+
+        self.assertEqual(
+            [service.get_metric("total") for _ in range(4)],
+            [100, 20, 7, 2],
+        )
+
+    def test_missing_value_keeps_previous(self):
+        """Test that a missing value does not reset the previous metric."""
+        service = DeltaTestApi([10, None, 12])
+
+        self.assertEqual(
+            [service.get_metric("total") for _ in range(3)],
+            [10, None, 2],
+        )
+
+    def test_instances_do_not_share_state(self):
+        """Test that every service instance keeps its own previous metric."""
+        first = DeltaTestApi([10, 20])
+        second = DeltaTestApi([100, 200])
+
+        self.assertEqual(first.get_metric("total"), 10)
+        self.assertEqual(second.get_metric("total"), 100)
+        self.assertEqual(first.get_metric("total"), 10)
+        self.assertEqual(second.get_metric("total"), 100)
+
+
+class FakeResponse:
+    """A response of the fake transport."""
+
+    def __init__(self, payload, status_code=200, headers=None):
+        self.content = json.dumps(payload).encode()
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        """Decode the response body."""
+        return json.loads(self.content)
+
+    def close(self):
+        """Nothing to close."""
+
+
+class FakeTransport:
+    """A transport that returns the same payload for every request."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+        self.headers = {}
+        self.requests = []
+
+    def get(self, url, params=None, headers=None):
+        """Record the request and return the payload."""
+        self.requests.append((url, params, headers))
+        return FakeResponse(self.payload, self.status_code, self.headers)
+
+    def close(self):
+        """Nothing to close."""
+
+
+@register_metric_class
+class TotalTestApi(CollectingtonApi):
+    """A service that reads a total from a fake transport."""
+
+    def __init__(self, payload, service_config=None):
+        super().__init__()
+        self.config = {"services": {"total_test": service_config or {}}}
+        self.service_name = "total_test"
+        self.name_of_datastore = "total_datastore"
+        self.transport = FakeTransport(payload)
+        self.registry = CollectorRegistry()
+
+    @register_metric("total")
+    def get_total(self):
+        """Return the total of the API response."""
+        return self.get_data_from_store(self.name_of_datastore)["total"]
+
+
+class TestCollectorMetrics(unittest.TestCase):
+    """Test that collectington records metrics about itself."""
+
+    def test_fetch_and_cache_metrics(self):
+        """Test that HTTP responses, cache results and evaluations are recorded."""
+        service = TotalTestApi({"total": 3})
+
+        self.assertEqual(service.get_metric("total"), 3)
+        self.assertEqual(service.get_metric("total"), 3)
+
+        def sample(name, **labels):
+            return service.registry.get_sample_value(
+                name, {"service": "total_test", **labels}
+            )
+
+        self.assertEqual(sample("collectington_http_responses_total", status="200"), 1)
+        self.assertEqual(
+            sample("collectington_http_response_bytes_total"),
+            len(json.dumps({"total": 3})),
+        )
+        self.assertEqual(
+            sample(
+                "collectington_datastore_cache_requests_total",
+                datastore="total_datastore",
+                result="miss",
+            ),
+            1,
+        )
+        self.assertEqual(
+            sample(
+                "collectington_datastore_cache_requests_total",
+                datastore="total_datastore",
+                result="fresh",
+            ),
+            1,
+        )
+        self.assertEqual(
+            sample("collectington_metric_evaluation_seconds_count", metric="total"), 2
+        )
+
+    def test_registries_created_later_get_their_own_metrics(self):
+        """Test that a new registry never gets the metrics of a collected registry."""
+        for _ in range(50):
+            registry = CollectorRegistry()
+            get_collector_metrics(registry).cycle_overruns.labels("total_test").inc()
+
+            self.assertEqual(
+                registry.get_sample_value(
+                    "collectington_cycle_overruns_total", {"service": "total_test"}
+                ),
+                1,
+            )
+
+
+class TestSharedCache(unittest.TestCase):
+    """Test that services with a shared cache share responses for the same request."""
+
+    def test_headers_are_hashed_in_the_key(self):
+        """Test that the headers of a request are not part of its key as is."""
+        service = TotalTestApi({"total": 3}, {"cache": {"shared": True}})
+        service.headers = {"X-VO-Api-Key": "s3cr3t"}
+        other_service = TotalTestApi({"total": 3}, {"cache": {"shared": True}})
+        other_service.headers = {"X-VO-Api-Key": "0th3r"}
+
+        key = service.get_datastore_cache_key("total_datastore")
+
+        self.assertNotIn("s3cr3t", key)
+        self.assertNotEqual(
+            key, other_service.get_datastore_cache_key("total_datastore")
+        )
+
+    def test_projected_datastore_is_not_shared(self):
+        """Test that a service is never served the projection of another service."""
+        projected = TotalTestApi(
+            {"total": 3, "incidents": []},
+            {
+                "cache": {"shared": True},
+                "datastores": {"total_datastore": {"projection": ["incidents"]}},
+            },
+        )
+        service = TotalTestApi(
+            {"total": 3, "incidents": []}, {"cache": {"shared": True}}
+        )
+
+        self.assertEqual(
+            projected.get_data_from_store("total_datastore"), {"incidents": []}
+        )
+        self.assertEqual(service.get_metric("total"), 3)
+        self.assertEqual(len(service.transport.requests), 1)
+
+
+class TestRateLimit(unittest.TestCase):
+    """Test that a rate limited service serves its last datastore."""
+
+    def test_last_datastore_is_served_while_throttled(self):
+        """Test that the API is not called again until Retry-After has passed."""
+        service = TotalTestApi(
+            {"total": 3}, {"rate_limit": {"max_wait": 0}, "cache": {"ttl": 0}}
+        )
+        service.api_url = "http://throttled.test/incidents"
+
+        self.assertEqual(service.get_metric("total"), 3)
+
+        service.transport.payload = {"message": "Too Many Requests"}
+        service.transport.status_code = 429
+        service.transport.headers = {"Retry-After": "60"}
+
+        self.assertEqual(service.get_metric("total"), 3)
+        self.assertEqual(service.get_metric("total"), 3)
+        self.assertEqual(len(service.transport.requests), 2)
+        self.assertEqual(
+            service.registry.get_sample_value(
+                "collectington_throttled_requests_total",
+                {"service": "total_test", "reason": "local"},
+            ),
+            1,
+        )
+
+
+@register_metric_class
+class FailingTestApi(TotalTestApi):
+    """A service with a metric that fails when the total is odd."""
+
+    @register_metric("even_total")
+    def get_even_total(self):
+        """Return the total, which must be even."""
+        total = self.get_data_from_store(self.name_of_datastore)["total"]
+
+        if total % 2:
+            raise ValueError("Odd total")
+
+        return total
+
+
+class TestErrorIsolation(unittest.TestCase):
+    """Test that failures are contained to a metric or a datastore."""
+
+    def setUp(self):
+        self.service = FailingTestApi(
+            {"total": 2},
+            {
+                "prometheus_metrics_mapping": {"gauge": ["total", "even_total"]},
+                "cache": {"ttl": 0},
+                "circuit_breaker": {"failure_threshold": 2, "reset_timeout": 60},
+            },
+        )
+        self.instances = self.service.generate_prometheus_metric_instances()
+
+    def sample(self, name, **labels):
+        """Return a sample of the registry of the service."""
+        return self.service.registry.get_sample_value(
+            name, {"service": "total_test", **labels}
+        )
+
+    def test_failing_metric_keeps_last_value(self):
+        """Test that a failing metric is marked stale and the others are published."""
+        process_request(self.service, ["total", "even_total"], self.instances)
+        self.service.transport.payload = {"total": 3}
+        process_request(self.service, ["total", "even_total"], self.instances)
+
+        self.assertEqual(self.service.registry.get_sample_value("total"), 3)
+        self.assertEqual(self.service.registry.get_sample_value("even_total"), 2)
+        self.assertEqual(self.sample("collectington_metric_stale", metric="total"), 0)
+        self.assertEqual(
+            self.sample("collectington_metric_stale", metric="even_total"), 1
+        )
+        self.assertEqual(
+            self.sample(
+                "collectington_errors_total", stage="metric", error="ValueError"
+            ),
+            1,
+        )
+
+    def test_error_status_keeps_last_value(self):
+        """Test that an error body is not read as the datastore."""
+        process_request(self.service, ["total"], self.instances)
+        self.service.transport.payload = {"message": "Service Unavailable"}
+        self.service.transport.status_code = 503
+        process_request(self.service, ["total"], self.instances)
+
+        self.assertEqual(self.service.registry.get_sample_value("total"), 2)
+        self.assertEqual(self.sample("collectington_metric_stale", metric="total"), 1)
+        self.assertEqual(
+            self.sample(
+                "collectington_errors_total",
+                stage="fetch",
+                error="HttpStatusException",
+            ),
+            1,
+        )
+
+    def test_missing_field_keeps_last_value(self):
+        """Test that a metric reading a missing field is not published as 0."""
+        process_request(self.service, ["total"], self.instances)
+        self.service.transport.payload = {}
+        process_request(self.service, ["total"], self.instances)
+
+        self.assertEqual(self.service.registry.get_sample_value("total"), 2)
+        self.assertEqual(self.sample("collectington_metric_stale", metric="total"), 1)
+        self.assertEqual(
+            self.sample("collectington_errors_total", stage="metric", error="KeyError"),
+            1,
+        )
+
+    def test_circuit_opens_for_failing_datastore(self):
+        """Test that the API is not called once the datastore keeps failing."""
+        requests = []
+
+        def get(url, params=None, headers=None):
+            requests.append(url)
+            raise ConnectionError("Connection refused")
+
+        self.service.transport.get = get
+
+        for _ in range(3):
+            process_request(self.service, ["total"], self.instances)
+
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(
+            self.sample(
+                "collectington_datastore_circuit_open", datastore="total_datastore"
+            ),
+            1,
+        )
+        self.assertEqual(self.sample("collectington_metric_stale", metric="total"), 1)
+
+    def test_rate_limited_trial_does_not_keep_circuit_open(self):
+        """Test that the circuit closes again after a trial call was throttled."""
+        service = TotalTestApi(
+            {"total": 2},
+            {
+                "prometheus_metrics_mapping": {"gauge": ["total"]},
+                "rate_limit": {"max_wait": 0},
+                "cache": {"ttl": 0},
+                "circuit_breaker": {"failure_threshold": 1, "reset_timeout": 0.05},
+            },
+        )
+        service.api_url = "http://half-open.test/incidents"
+        instances = service.generate_prometheus_metric_instances()
+
+        service.transport.status_code = 500
+        process_request(service, ["total"], instances)
+        time.sleep(0.1)
+
+        service.transport.status_code = 429
+        service.transport.headers = {"Retry-After": "0"}
+        process_request(service, ["total"], instances)
+
+        service.transport.status_code = 200
+        service.transport.headers = {}
+        process_request(service, ["total"], instances)
+
+        self.assertEqual(len(service.transport.requests), 3)
+        self.assertEqual(service.registry.get_sample_value("total"), 2)
+        self.assertEqual(
+            service.registry.get_sample_value(
+                "collectington_datastore_circuit_open",
+                {"service": "total_test", "datastore": "total_datastore"},
+            ),
+            0,
+        )
+
+
+@register_metric_class
+class RevalidationTestApi(TotalTestApi):
+    """A service that counts the evaluations of its metrics."""
+
+    def __init__(self, payload):
+        super().__init__(payload, {"cache": {"ttl": 0, "revalidate": True}})
+        self.evaluations = 0
+
+    @register_metric("counted_total")
+    @enable_delta_metric
+    def get_counted_total(self):
+        """Return the total of the API response."""
+        self.evaluations += 1
+        return self.get_data_from_store(self.name_of_datastore)["total"]
+
+
+class TestRevalidation(unittest.TestCase):
+    """Test that a datastore that did not change is not decoded or computed again."""
+
+    def sample(self, service, reason):
+        """Return the number of unchanged responses for a reason."""
+        return service.registry.get_sample_value(
+            "collectington_datastore_unchanged_total",
+            {"service": "total_test", "datastore": "total_datastore", "reason": reason},
+        )
+
+    def test_not_modified(self):
+        """Test that the ETag is sent back and a 304 reuses the last datastore."""
+        service = RevalidationTestApi({"total": 3})
+        service.transport.headers = {"ETag": '"v1"'}
+
+        first = service.get_data_from_store("total_datastore")
+        service.transport.status_code = 304
+
+        self.assertIs(service.get_data_from_store("total_datastore"), first)
+        self.assertEqual(service.transport.requests[0][2], {})
+        self.assertEqual(service.transport.requests[1][2], {"If-None-Match": '"v1"'})
+        self.assertEqual(self.sample(service, "not_modified"), 1)
+
+    def test_same_body(self):
+        """Test that a body that did not change is only hashed."""
+        service = RevalidationTestApi({"total": 3})
+
+        first = service.get_data_from_store("total_datastore")
+        self.assertIs(service.get_data_from_store("total_datastore"), first)
+        self.assertEqual(self.sample(service, "same_body"), 1)
+
+        service.transport.payload = {"total": 4}
+        self.assertEqual(service.get_data_from_store("total_datastore"), {"total": 4})
+
+    def test_metric_is_reused(self):
+        """Test that a metric is only evaluated again when its datastore changed."""
+        service = RevalidationTestApi({"total": 3})
+
+        self.assertEqual(service.get_metric("counted_total"), 3)
+        self.assertEqual(service.get_metric("counted_total"), 0)
+        self.assertEqual(service.evaluations, 1)
+
+        service.transport.payload = {"total": 5}
+        self.assertEqual(service.get_metric("counted_total"), 2)
+        self.assertEqual(service.evaluations, 2)
+
+
+class SlowTransport(FakeTransport):
+    """A transport that takes a while to answer every request."""
+
+    def get(self, url, params=None, headers=None):
+        """Wait, then return the payload."""
+        time.sleep(0.2)
+        return super().get(url, params, headers)
+
+
+class TestNamedDatastores(unittest.TestCase):
+    """Test that every datastore is requested with its own settings."""
+
+    def setUp(self):
+        self.service = TotalTestApi(
+            {"total": 3},
+            {
+                "datastores": {
+                    "recent": {"params": {"startedAfter": "10:00"}},
+                    "all_time": {
+                        "api_url": "http://all-time.test",
+                        "params": {},
+                        "headers": {"Accept": "application/json"},
+                    },
+                }
+            },
+        )
+        self.service.api_url = "http://recent.test"
+        self.service.params = {"limit": 10}
+        self.service.headers = {"X-Api-Key": "key"}
+        self.service.transport = SlowTransport({"total": 3})
+
+    def test_datastores_are_prefetched_in_parallel(self):
+        """Test that both datastores are requested at once, with their own settings."""
+        start = time.monotonic()
+        self.service.prefetch_datastores()
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(
+            sorted(self.service.transport.requests),
+            [
+                (
+                    "http://all-time.test",
+                    {},
+                    {"X-Api-Key": "key", "Accept": "application/json"},
+                ),
+                ("http://recent.test", {"startedAfter": "10:00"}, {"X-Api-Key": "key"}),
+            ],
+        )
+
+        self.service.prefetch_datastores()
+        self.service.get_data_from_store("all_time")
+        self.assertEqual(len(self.service.transport.requests), 2)
+
+
+@register_metric_class
+class ViewTestApi(TotalTestApi):
+    """A service whose metrics share a view of the datastore."""
+
+    def __init__(self, payload):
+        super().__init__(payload)
+        self.view_calls = 0
+
+    @datastore_view("total_datastore")
+    def doubled(self, response):
+        """Return the total doubled."""
+        self.view_calls += 1
+        return response["total"] * 2
+
+    @register_metric("doubled_plus_one")
+    def get_doubled_plus_one(self):
+        """Return the view plus one."""
+        return self.doubled() + 1
+
+    @register_metric("doubled_minus_one")
+    def get_doubled_minus_one(self):
+        """Return the view minus one."""
+        return self.doubled() - 1
+
+
+class TestDatastoreView(unittest.TestCase):
+    """Test that datastore views are computed once per datastore refresh."""
+
+    def test_view_is_shared_until_refresh(self):
+        """Test that metrics share a view, which is computed again after a refresh."""
+        service = ViewTestApi({"total": 3})
+
+        self.assertEqual(service.get_metric("doubled_plus_one"), 7)
+        self.assertEqual(service.get_metric("doubled_minus_one"), 5)
+        self.assertEqual(service.view_calls, 1)
+
+        service.transport.payload = {"total": 4}
+        service.refresh_datastore("total_datastore")
+
+        self.assertEqual(service.get_metric("doubled_plus_one"), 9)
+        self.assertEqual(service.get_metric("doubled_minus_one"), 7)
+        self.assertEqual(service.view_calls, 2)
+
+
+PUBLISH_CONFIG = {
+    "prometheus_metrics_mapping": {
+        "counter": ["total_calls"],
+        "gauge": ["open_incidents"],
+    },
+    "prometheus_metric_labels": {"open_incidents": ["team"]},
+}
+
+
+class TestPublishPlan(unittest.TestCase):
+    """Test that metric values are published with the compiled plan."""
+
+    def test_publish_plan(self):
+        """Test that labeled and unlabeled metrics are sent with the right method."""
+        service = TotalTestApi({}, PUBLISH_CONFIG)
+        instances = service.generate_prometheus_metric_instances()
+
+        for _ in range(2):
+            service.call_prometheus_metrics(
+                {
+                    "total_calls": 5,
+                    "open_incidents": [
+                        {"team": "core", "value": 2},
+                        {"team": "web", "value": 3},
+                    ],
+                },
+                instances,
+            )
+
+        self.assertEqual(service.registry.get_sample_value("total_calls_total"), 10)
+        self.assertEqual(
+            service.registry.get_sample_value("open_incidents", {"team": "web"}), 3
+        )
+
+    def test_metric_table(self):
+        """Test that columnar values are published and their children are reused."""
+        service = TotalTestApi({}, PUBLISH_CONFIG)
+        instances = service.generate_prometheus_metric_instances()
+        gauge = instances[1]
+        table = MetricTable(labels={"team": ("core", "web")}, values=[2, 3])
+
+        service.call_prometheus_metrics({"open_incidents": table}, instances)
+        gauge.labels = lambda *labels: self.fail("child looked up again")
+        table.values = [4, 5]
+        service.call_prometheus_metrics({"open_incidents": table}, instances)
+
+        self.assertEqual(
+            service.registry.get_sample_value("open_incidents", {"team": "web"}), 5
+        )
+
+    def test_metric_table_columns_of_different_lengths(self):
+        """Test that a column that is too short raises instead of dropping series."""
+        table = MetricTable(labels={"team": ("core",)}, values=[2, 3])
+
+        with self.assertRaises(ValueError):
+            list(table.rows(["team"]))
+
+    def test_idle_series_are_removed(self):
+        """Test that a series that is not published for max_idle_cycles is removed."""
+        service = TotalTestApi(
+            {},
+            {
+                **PUBLISH_CONFIG,
+                "prometheus_metric_retention": {
+                    "open_incidents": {"max_idle_cycles": 2}
+                },
+            },
+        )
+        instances = service.generate_prometheus_metric_instances()
+        core = {"team": "core", "value": 1}
+        web = {"team": "web", "value": 2}
+
+        service.call_prometheus_metrics({"open_incidents": [core, web]}, instances)
+        service.call_prometheus_metrics({"open_incidents": [core]}, instances)
+
+        self.assertEqual(
+            service.registry.get_sample_value("open_incidents", {"team": "web"}), 2
+        )
+
+        service.call_prometheus_metrics({"open_incidents": [core]}, instances)
+
+        self.assertIsNone(
+            service.registry.get_sample_value("open_incidents", {"team": "web"})
+        )
+
+        service.call_prometheus_metrics({"open_incidents": [core, web]}, instances)
+
+        self.assertEqual(
+            service.registry.get_sample_value("open_incidents", {"team": "web"}), 2
+        )
+
+    def test_reused_series_are_removed(self):
+        """Test that series kept by a reload still expire."""
+        service = TotalTestApi(
+            {},
+            {
+                **PUBLISH_CONFIG,
+                "prometheus_metric_retention": {
+                    "open_incidents": {"max_idle_cycles": 1}
+                },
+            },
+        )
+        instances = service.generate_prometheus_metric_instances()
+        core = {"team": "core", "value": 1}
+        web = {"team": "web", "value": 2}
+
+        service.call_prometheus_metrics({"open_incidents": [core, web]}, instances)
+        instances = service.generate_prometheus_metric_instances(
+            {"total_calls": instances[0], "open_incidents": instances[1]}
+        )
+        service.call_prometheus_metrics({"open_incidents": [core]}, instances)
+
+        self.assertIsNone(
+            service.registry.get_sample_value("open_incidents", {"team": "web"})
+        )
+
+    def test_missing_metric_is_not_published(self):
+        """Test that a metric missing from the values is left untouched."""
+        service = TotalTestApi({}, PUBLISH_CONFIG)
+        instances = service.generate_prometheus_metric_instances()
+
+        service.call_prometheus_metrics({"total_calls": 1}, instances)
+
+        self.assertEqual(service.registry.get_sample_value("total_calls_total"), 1)
+
+    def test_overridden_update_metric(self):
+        """Test that an overridden _update_metric is used to publish values."""
+
+        class DecrementingApi(TotalTestApi):
+            """A service that decrements its gauges."""
+
+            @staticmethod
+            def _update_metric(p_instance, val):
+                p_instance.dec(val)
+
+        service = DecrementingApi({}, {"prometheus_metrics_mapping": {"gauge": ["g"]}})
+        instances = service.generate_prometheus_metric_instances()
+
+        service.call_prometheus_metrics({"g": 4}, instances)
+
+        self.assertEqual(service.registry.get_sample_value("g"), -4)
+
+
+STATE_CONFIG = {
+    "prometheus_metrics_mapping": {"counter": ["total_calls", "calls_per_team"]},
+    "prometheus_metric_labels": {"calls_per_team": ["team"]},
+}
+
+
+class TestState(unittest.TestCase):
+    """Test that the state of a service is restored after a restart."""
+
+    def test_counters_and_delta_baselines_are_restored(self):
+        """Test that counters continue from their saved value."""
+        service = TotalTestApi({}, STATE_CONFIG)
+        instances = service.generate_prometheus_metric_instances()
+        service._delta_metric_state["total_calls"] = 40
+        service.call_prometheus_metrics(
+            {"total_calls": 5, "calls_per_team": [{"team": "core", "value": 2}]},
+            instances,
+        )
+
+        state = json.loads(json.dumps(service.get_state()))
+        restarted_service = TotalTestApi({}, STATE_CONFIG)
+        restarted_service.generate_prometheus_metric_instances()
+        restarted_service.restore_state(state)
+
+        self.assertEqual(restarted_service._delta_metric_state, {"total_calls": 40})
+        self.assertEqual(
+            restarted_service.registry.get_sample_value("total_calls_total"), 5
+        )
+        self.assertEqual(
+            restarted_service.registry.get_sample_value(
+                "calls_per_team_total", {"team": "core"}
+            ),
+            2,
+        )
+
+    def test_counter_with_new_labels_starts_over(self):
+        """Test that a counter whose labels changed is not restored."""
+        state = {
+            "counters": {
+                "calls_per_team": {"labels": ["stack"], "values": [["prd", 3]]}
+            }
+        }
+        service = TotalTestApi({}, STATE_CONFIG)
+        service.generate_prometheus_metric_instances()
+        service.restore_state(state)
+
+        self.assertIsNone(
+            service.registry.get_sample_value("calls_per_team_total", {"team": "prd"})
+        )
+
+    def test_restored_series_expire(self):
+        """Test that a restored series that is no longer published is removed."""
+        state = {
+            "counters": {
+                "calls_per_team": {
+                    "labels": ["team"],
+                    "values": [["1", 2], ["2", 3]],
+                }
+            }
+        }
+        service = TotalTestApi(
+            {},
+            {
+                **STATE_CONFIG,
+                "prometheus_metric_retention": {
+                    "calls_per_team": {"max_idle_cycles": 1}
+                },
+            },
+        )
+        instances = service.generate_prometheus_metric_instances()
+        service.restore_state(state)
+
+        # labels that are not strings are the same series as the restored ones
+        service.call_prometheus_metrics(
+            {"calls_per_team": [{"team": 1, "value": 1}]}, instances
+        )
+
+        self.assertEqual(
+            service.registry.get_sample_value("calls_per_team_total", {"team": "1"}), 3
+        )
+        self.assertIsNone(
+            service.registry.get_sample_value("calls_per_team_total", {"team": "2"})
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@
 import unittest
 
 from json.decoder import JSONDecodeError
-from collectington.config import parse, validate
+from collectington.config import parse, validate, validate_transport
 
 
 class TestConfigParse(unittest.TestCase):
@@ -50,5 +50,26 @@ class TestConfigValidateConfig(unittest.TestCase):
             self.fail(f"Exception raised:\n{err}")
 
 
+class TestConfigValidateTransport(unittest.TestCase):
+    """Test that the transport block of a service is validated correctly."""
+
+    def test_valid_transport(self):
+        """Test that a valid transport block will not raise any exceptions."""
+        try:
+            validate_transport(
+                "splunk", {"pool_size": 5, "read_timeout": 2.5, "gzip": True}
+            )
+        except ValueError as err:
+            self.fail(f"Exception raised:\n{err}")
+
+    def test_invalid_transport_field(self):
+        """Ensure unknown fields and invalid values raise a ValueError."""
+        with self.assertRaises(ValueError):
+            validate_transport("splunk", {"pool": 5})
+
+        with self.assertRaises(ValueError):
+            validate_transport("splunk", {"read_timeout": "30"})
+
+
 if __name__ == "__main__":
     unittest.main()
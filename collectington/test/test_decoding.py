@@ -0,0 +1,67 @@
+"""Test that responses are decoded and projected as expected."""
+import json
+import unittest
+
+from collectington.decoding import compile_projection, get_decoder, orjson, project
+from collectington.test.test_collectington_api import TotalTestApi
+
+INCIDENTS = {
+    "total": 2,
+    "offset": 0,
+    "incidents": [
+        {"incidentNumber": 1, "pagedTeams": ["a"], "transitions": [], "service": "x"},
+        {"incidentNumber": 2, "pagedTeams": ["b"], "service": "y"},
+    ],
+}
+
+
+class TestDecoder(unittest.TestCase):
+    """Test the choice of the JSON decoder."""
+
+    def test_json_decoder(self):
+        """Test that the json decoder can always be chosen."""
+        self.assertIs(get_decoder("json"), json.loads)
+
+    @unittest.skipIf(orjson is None, "orjson is not installed")
+    def test_auto_decoder_prefers_orjson(self):
+        """Test that orjson is used when it is installed."""
+        self.assertIs(get_decoder("auto"), orjson.loads)
+        self.assertEqual(get_decoder()(json.dumps(INCIDENTS).encode()), INCIDENTS)
+
+
+class TestProjection(unittest.TestCase):
+    """Test that only the fields of a projection are kept."""
+
+    def test_paths_go_through_lists(self):
+        """Test that a path through a list applies to every item."""
+        tree = compile_projection(
+            ["total", "incidents.pagedTeams", "incidents.transitions"]
+        )
+
+        self.assertEqual(
+            project(INCIDENTS, tree),
+            {
+                "total": 2,
+                "incidents": [
+                    {"pagedTeams": ["a"], "transitions": []},
+                    {"pagedTeams": ["b"]},
+                ],
+            },
+        )
+
+    def test_datastore_projection(self):
+        """Test that the cached datastore only holds the projected fields."""
+        service = TotalTestApi(
+            INCIDENTS,
+            {
+                "json_decoder": "json",
+                "datastores": {"total_datastore": {"projection": ["total"]}},
+            },
+        )
+
+        self.assertEqual(service.get_data_from_store("total_datastore"), {"total": 2})
+        self.assertEqual(service.get_metric("total"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
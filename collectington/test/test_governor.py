@@ -0,0 +1,84 @@
+"""Test that requests are kept within the rate limits of APIs."""
+import unittest
+
+from collectington.exceptions.collection_exceptions import RateLimitedException
+from collectington.governor import RequestGovernor, get_request_governor
+
+
+class TestRequestGovernor(unittest.TestCase):
+    """Test the token bucket and the handling of throttled responses."""
+
+    def test_token_bucket(self):
+        """Test that a burst is allowed and the next request waits for a token."""
+        governor = RequestGovernor(requests_per_second=1, burst=2, max_wait=1.5)
+
+        self.assertEqual(governor.reserve(), 0)
+        self.assertEqual(governor.reserve(), 0)
+        self.assertAlmostEqual(governor.reserve(), 1, delta=0.05)
+
+        with self.assertRaises(RateLimitedException):
+            governor.reserve()
+
+    def test_retry_after(self):
+        """Test that Retry-After blocks requests for the given number of seconds."""
+        governor = RequestGovernor(max_wait=0)
+
+        self.assertEqual(governor.record_response(429, {"Retry-After": "30"}), 30)
+
+        with self.assertRaises(RateLimitedException) as context:
+            governor.reserve()
+
+        self.assertAlmostEqual(context.exception.retry_after, 30, delta=1)
+
+    def test_adaptive_backoff(self):
+        """Test that the backoff doubles until a request succeeds."""
+        governor = RequestGovernor(max_backoff=3)
+
+        self.assertEqual(governor.record_response(429, {}), 1)
+        self.assertEqual(governor.record_response(429, {}), 2)
+        self.assertEqual(governor.record_response(429, {}), 3)
+
+        governor.record_response(200, {})
+
+        self.assertEqual(governor.record_response(429, {}), 1)
+
+    def test_no_remaining_requests(self):
+        """Test that a response without remaining requests blocks until the reset."""
+        governor = RequestGovernor(max_wait=0)
+
+        self.assertIsNone(
+            governor.record_response(
+                200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "20"}
+            )
+        )
+
+        with self.assertRaises(RateLimitedException):
+            governor.reserve()
+
+    def test_governor_by_host_and_key(self):
+        """Test that services share the governor of a host and API key."""
+        config = {"key_header": "X-Api-Key"}
+
+        first = get_request_governor("https://a.test/x", {"X-Api-Key": "1"}, config)
+
+        self.assertIs(
+            get_request_governor("https://a.test/y", {"X-Api-Key": "1"}, config), first
+        )
+        self.assertIsNot(
+            get_request_governor("https://a.test/x", {"X-Api-Key": "2"}, config), first
+        )
+
+    def test_changed_limits_are_applied(self):
+        """Test that a new rate_limit block updates the governor it shares."""
+        first = get_request_governor("https://b.test/x", {}, {"max_wait": 5})
+        first.blocked_until = float("inf")
+
+        governor = get_request_governor("https://b.test/x", {}, {"max_wait": 1})
+
+        self.assertIs(governor, first)
+        self.assertEqual(governor.max_wait, 1)
+        self.assertEqual(governor.blocked_until, float("inf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Test the helpers of metric methods."""
+import random
+import unittest
+
+from datetime import datetime, timedelta, timezone
+
+from collectington.helpers import (
+    MinMax,
+    RunningMean,
+    TDigest,
+    minutes_between,
+    parse_timestamp,
+)
+
+
+class TestTimestamps(unittest.TestCase):
+    """Test that ISO-8601 timestamps are parsed as expected."""
+
+    def test_parse_timestamp(self):
+        """Test the UTC designator and offsets with and without a colon."""
+        expected = datetime(2021, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+        self.assertEqual(parse_timestamp("2021-03-01T12:30:00Z"), expected)
+        self.assertEqual(parse_timestamp("2021-03-01T12:30:00+00:00"), expected)
+        self.assertEqual(parse_timestamp("2021-03-01T14:30:00+0200"), expected)
+        self.assertEqual(
+            parse_timestamp("2021-03-01T12:30:00-01:00").utcoffset(),
+            timedelta(hours=-1),
+        )
+
+    def test_minutes_between(self):
+        """Test the number of minutes between two timestamps."""
+        self.assertEqual(
+            minutes_between("2021-03-01T12:30:00Z", "2021-03-01T13:00:30Z"), 30.5
+        )
+
+
+class TestAggregators(unittest.TestCase):
+    """Test that the aggregators are fed one value at a time."""
+
+    def test_running_mean(self):
+        """Test the mean of a generator, and of no values."""
+        mean = RunningMean()
+        self.assertIsNone(mean.mean)
+
+        mean.update(value for value in range(1, 5))
+        mean.add(10)
+
+        self.assertEqual(mean.mean, 4)
+        self.assertEqual(mean.count, 5)
+
+    def test_min_max(self):
+        """Test the lowest and highest values."""
+        min_max = MinMax()
+        min_max.update(iter([3, -1, 7, 2]))
+
+        self.assertEqual((min_max.min, min_max.max), (-1, 7))
+
+    def test_t_digest(self):
+        """Test that quantiles are accurate with far fewer centroids than values."""
+        values = [random.Random(seed).uniform(0, 1000) for seed in range(20000)]
+        digest = TDigest()
+        digest.update(values)
+        values.sort()
+
+        for quantile in [0.01, 0.5, 0.9, 0.99]:
+            self.assertAlmostEqual(
+                digest.quantile(quantile),
+                values[int(quantile * len(values))],
+                delta=10,
+            )
+
+        self.assertLess(len(digest.centroids), 200)
+        self.assertEqual(digest.quantile(0), values[0])
+        self.assertEqual(digest.quantile(1), values[-1])
+        self.assertIsNone(TDigest().quantile(0.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Test that incremental datastores only keep track of new records."""
+import unittest
+
+from collectington.incremental import IncrementalDatastore
+from collectington.test.test_collectington_api import TotalTestApi
+
+
+def incidents(*numbers_and_times):
+    """Return a response with an incident for every number and start time."""
+    return {
+        "incidents": [
+            {"incidentNumber": number, "startTime": start_time}
+            for number, start_time in numbers_and_times
+        ]
+    }
+
+
+class TestIncrementalDatastore(unittest.TestCase):
+    """Test the watermark and the de-duplication of records."""
+
+    def setUp(self):
+        self.incremental_datastore = IncrementalDatastore(
+            watermark_param="startedAfter",
+            watermark_field="startTime",
+            records_path="incidents",
+            key_field="incidentNumber",
+        )
+
+    def test_watermark_advances(self):
+        """Test that requests ask for the records after the latest record."""
+        self.assertEqual(self.incremental_datastore.get_params({"a": 1}), {"a": 1})
+
+        self.incremental_datastore.merge(incidents((1, "2024-01-01T10:00:00Z")))
+
+        self.assertEqual(
+            self.incremental_datastore.get_params({"a": 1}),
+            {"a": 1, "startedAfter": "2024-01-01T10:00:00Z"},
+        )
+
+    def test_overlapping_windows_are_de_duplicated(self):
+        """Test that a record sent again replaces the previous one."""
+        self.incremental_datastore.merge(
+            incidents((1, "2024-01-01T10:00:00Z"), (2, "2024-01-01T10:01:00Z"))
+        )
+        response = incidents((2, "2024-01-01T10:01:00Z"), (3, "2024-01-01T10:02:00Z"))
+        response["incidents"][0]["phase"] = "RESOLVED"
+
+        document, new_records = self.incremental_datastore.merge(response)
+
+        self.assertEqual(
+            [incident["incidentNumber"] for incident in document["incidents"]],
+            [1, 2, 3],
+        )
+        self.assertEqual(document["incidents"][1]["phase"], "RESOLVED")
+        self.assertEqual(
+            new_records, [{"incidentNumber": 3, "startTime": "2024-01-01T10:02:00Z"}]
+        )
+        self.assertEqual(self.incremental_datastore.records_seen, 3)
+
+    def test_oldest_records_are_dropped(self):
+        """Test that no more than max_records records are kept."""
+        self.incremental_datastore.max_records = 2
+
+        document, _ = self.incremental_datastore.merge(
+            incidents((1, "10:00"), (2, "10:01"), (3, "10:02"))
+        )
+
+        self.assertEqual(
+            [incident["incidentNumber"] for incident in document["incidents"]],
+            [2, 3],
+        )
+        self.assertEqual(self.incremental_datastore.records_seen, 3)
+
+
+class TestIncrementalService(unittest.TestCase):
+    """Test that a service reads an incremental datastore from its watermark."""
+
+    def test_only_new_records_are_requested(self):
+        """Test that the watermark is sent and the records are kept across reads."""
+        service = TotalTestApi(
+            incidents((1, "10:00")),
+            {
+                "cache": {"ttl": 0},
+                "datastores": {
+                    "total_datastore": {
+                        "incremental": {
+                            "watermark_param": "startedAfter",
+                            "watermark_field": "startTime",
+                            "records_path": "incidents",
+                            "key_field": "incidentNumber",
+                        }
+                    }
+                },
+            },
+        )
+        service.params = {"limit": 10}
+
+        service.get_data_from_store("total_datastore")
+        service.transport.payload = incidents((1, "10:00"), (2, "10:05"))
+        document = service.get_data_from_store("total_datastore")
+
+        self.assertEqual(
+            [params for _, params, _ in service.transport.requests],
+            [{"limit": 10}, {"limit": 10, "startedAfter": "10:00"}],
+        )
+        self.assertEqual(len(document["incidents"]), 2)
+        self.assertEqual(service.params, {"limit": 10})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Test that paginated datastores are read as expected."""
+import json
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from prometheus_client import CollectorRegistry
+
+from collectington.collectington_api import CollectingtonApi, register_metric_class
+
+INCIDENTS = [{"incidentNumber": number} for number in range(25)]
+
+
+class PaginatedHandler(BaseHTTPRequestHandler):
+    """Serve the incidents with offset, cursor or Link header pagination."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a page of incidents."""
+        url = urlparse(self.path)
+        query = {key: int(value[0]) for key, value in parse_qs(url.query).items()}
+        headers = {}
+
+        if url.path == "/offset":
+            start = query["offset"]
+            end = start + query["limit"]
+            body = {"total": len(INCIDENTS), "incidents": INCIDENTS[start:end]}
+        elif url.path == "/cursor":
+            start = query.get("cursor", 0)
+            end = start + 10
+            body = {"incidents": INCIDENTS[start:end], "next_cursor": end < 25 and end}
+        else:
+            page = query.get("page", 0)
+            body = INCIDENTS[page * 10 : page * 10 + 10]
+            if page < 2:
+                headers["Link"] = (
+                    f"<http://127.0.0.1:{self.server.server_port}/link?page={page + 1}>"
+                    '; rel="next"'
+                )
+
+        content = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Keep the test output quiet."""
+
+
+@register_metric_class
+class PaginatedApi(CollectingtonApi):
+    """A service with a single paginated datastore."""
+
+    def __init__(self, api_url, datastore_config):
+        super().__init__()
+        self.config = {
+            "services": {"paginated": {"datastores": {"incidents": datastore_config}}}
+        }
+        self.service_name = "paginated"
+        self.api_url = api_url
+        self.registry = CollectorRegistry()
+
+
+class TestPagination(unittest.TestCase):
+    """Test every pagination strategy against a local server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PaginatedHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_offset_pages_are_collected(self):
+        """Test that every page is gathered into the first page of the datastore."""
+        service = PaginatedApi(
+            f"{self.base_url}/offset",
+            {
+                "pagination": {
+                    "strategy": "offset",
+                    "records_path": "incidents",
+                    "page_size": 10,
+                }
+            },
+        )
+
+        datastore = service.get_data_from_store("incidents")
+
+        self.assertEqual(datastore["total"], 25)
+        self.assertEqual(datastore["incidents"], INCIDENTS)
+
+    def test_cursor_records_are_streamed(self):
+        """Test that records are yielded page by page following the cursor."""
+        service = PaginatedApi(
+            f"{self.base_url}/cursor",
+            {
+                "pagination": {"strategy": "cursor", "records_path": "incidents"},
+                "stream": True,
+            },
+        )
+
+        self.assertEqual(list(service.iter_datastore_records("incidents")), INCIDENTS)
+
+    def test_link_header_records_are_streamed(self):
+        """Test that the next page is read from the Link header."""
+        service = PaginatedApi(
+            f"{self.base_url}/link",
+            {"pagination": {"strategy": "link"}, "stream": True},
+        )
+
+        records = service.iter_datastore_records("incidents")
+
+        self.assertEqual(next(records), INCIDENTS[0])
+        self.assertEqual(list(records), INCIDENTS[1:])
+
+    def test_max_pages(self):
+        """Test that reading stops after max_pages."""
+        service = PaginatedApi(
+            f"{self.base_url}/offset",
+            {
+                "pagination": {
+                    "strategy": "offset",
+                    "records_path": "incidents",
+                    "page_size": 10,
+                    "max_pages": 2,
+                }
+            },
+        )
+
+        self.assertEqual(len(list(service.iter_datastore_records("incidents"))), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Test that config changes are detected as expected."""
+import json
+import os
+import tempfile
+import unittest
+
+from collectington.reloader import ConfigReloader
+
+CONFIG = {
+    "api_call_intervals": 60,
+    "log_level": "INFO",
+    "services": {
+        "splunk": {
+            "service_class": "SplunkApi",
+            "service_module": "splunk_api",
+            "port": 8000,
+            "api_url": "http://localhost",
+            "prometheus_metrics_mapping": {"counter": ["number_of_incidents"]},
+        }
+    },
+}
+
+
+class TestConfigReloader(unittest.TestCase):
+    """Test that the config is only read again when it has to be."""
+
+    def setUp(self):
+        file_descriptor, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(file_descriptor)
+        self.write_config(CONFIG)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_config(self, config, mtime_ns=None):
+        """Write a config, and move its modification time forward."""
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(config if isinstance(config, str) else json.dumps(config))
+
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_watched_file_is_reloaded_when_modified(self):
+        """Test that a modified file is reloaded once."""
+        reloader = ConfigReloader(self.path, watch=True)
+
+        self.assertIsNone(reloader.poll())
+
+        self.write_config({**CONFIG, "api_call_intervals": 30}, mtime_ns=10**18)
+
+        self.assertEqual(reloader.poll()["api_call_intervals"], 30)
+        self.assertIsNone(reloader.poll())
+
+    def test_invalid_config_is_ignored(self):
+        """Test that an invalid config does not replace the current one."""
+        reloader = ConfigReloader(self.path)
+        self.write_config("{", mtime_ns=10**18)
+
+        self.assertIsNone(reloader.poll())
+
+        reloader.request_reload()
+
+        self.assertIsNone(reloader.poll())
+
+    def test_config_of_the_wrong_shape_is_ignored(self):
+        """Test that a config failing validation with a TypeError is ignored too."""
+        reloader = ConfigReloader(self.path)
+        self.write_config({**CONFIG, "services": {"splunk": 3}})
+        reloader.request_reload()
+
+        self.assertIsNone(reloader.poll())
+
+
+if __name__ == "__main__":
+    unittest.main()
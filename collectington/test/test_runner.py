@@ -0,0 +1,434 @@
+"""Test that the runner is processing requests as expected."""
+import copy
+import os
+import tempfile
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from prometheus_client import REGISTRY, CollectorRegistry
+
+from collectington.async_collectington_api import AsyncCollectingtonApi
+from collectington.collectington_api import (
+    CollectingtonApi,
+    cpu_bound,
+    datastore_view,
+    enable_delta_metric,
+    register_metric,
+    register_metric_class,
+)
+from collectington.process_pool import create_process_pool
+from collectington.runner import (
+    ServiceRunner,
+    checkpoint_state,
+    create_metric_executor,
+    create_service_runners,
+    evaluate_metrics_concurrently,
+    process_request,
+    run,
+    schedule_service_runner,
+)
+from collectington.scheduler import Scheduler
+from collectington.state_store import create_state_store
+
+MULTI_SERVICE_CONFIG = {
+    "api_call_intervals": 60,
+    "log_level": "INFO",
+    "port": 8000,
+    "services": {
+        name: {
+            "service_class": "MultiServiceApi",
+            "service_module": __name__,
+            "api_url": "http://localhost",
+            "prometheus_metrics_mapping": {"gauge": [f"{name}_metric"]},
+            **extra,
+        }
+        for name, extra in [
+            ("first", {}),
+            ("second", {"api_call_intervals": 5}),
+            ("third", {"port": 8001}),
+        ]
+    },
+}
+
+
+class FakeService:
+    """A service that records what gets published to Prometheus."""
+
+    def __init__(self, metric_delays):
+        self.metric_delays = metric_delays
+        self.published = []
+
+    def get_metric(self, metric, defer_delta=False):
+        """Return the metric name length after sleeping for the metric delay."""
+        time.sleep(self.metric_delays[metric])
+        return len(metric)
+
+    def get_metric_delta(self, metric, value):
+        """None of the metrics are delta metrics."""
+        return value
+
+    def publish_metric_values(self, metric_values, list_of_metric_instances):
+        """Record every publish."""
+        self.published.append(metric_values)
+
+
+class TestProcessRequest(unittest.TestCase):
+    """Test that metrics are evaluated and published once per cycle."""
+
+    def test_sequential_mode(self):
+        """Test that every metric is published when no executor is provided."""
+        service = FakeService({"a": 0, "bb": 0})
+
+        process_request(service, ["a", "bb"], [])
+
+        self.assertEqual(service.published, [{"a": 1, "bb": 2}])
+
+    def test_concurrent_mode_publishes_once(self):
+        """Test that concurrent metrics are published together in a single call."""
+        service = FakeService({"a": 0.2, "bb": 0.2, "ccc": 0.2})
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            start = time.monotonic()
+            process_request(service, ["a", "bb", "ccc"], [], executor, 5)
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(service.published, [{"a": 1, "bb": 2, "ccc": 3}])
+        self.assertLess(elapsed, 0.5)
+
+    def test_concurrent_mode_timeout_reports_missing(self):
+        """Test that a metric that times out is left out instead of stalling the cycle."""
+        service = FakeService({"fast": 0, "slow": 1})
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            process_request(service, ["fast", "slow"], [], executor, 0.2)
+
+        self.assertEqual(service.published, [{"fast": 4}])
+
+    def test_sequential_mode_keeps_metric_timeout(self):
+        """Test that the timeout of CPU-bound metrics is kept in sequential mode."""
+        executor, metric_timeout = create_metric_executor(
+            {"execution": {"process_workers": 2, "metric_timeout": 5}}
+        )
+
+        self.assertIsNone(executor)
+        self.assertEqual(metric_timeout, 5)
+
+    def test_late_delta_metric_is_counted_next_cycle(self):
+        """Test that a delta metric that timed out does not lose its increment."""
+        service = SlowDeltaApi([(0, 10), (0.5, 15), (0, 20)])
+
+        cycles = []
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for _ in range(3):
+                cycles.append(
+                    evaluate_metrics_concurrently(
+                        service, ["slow_total"], executor, 0.2
+                    )
+                )
+                # let the metric that timed out finish before the next cycle
+                time.sleep(0.4)
+
+        self.assertEqual(cycles, [{"slow_total": 10}, {}, {"slow_total": 10}])
+
+
+@register_metric_class
+class SlowDeltaApi(CollectingtonApi):
+    """A service with a delta metric that takes a given time to return each total."""
+
+    def __init__(self, delays_and_totals):
+        super().__init__()
+        self.service_name = "slow_delta"
+        self.registry = CollectorRegistry()
+        self.delays_and_totals = list(delays_and_totals)
+
+    @register_metric("slow_total")
+    @enable_delta_metric
+    def get_slow_total(self):
+        """Return the next total after its delay."""
+        delay, total = self.delays_and_totals.pop(0)
+        time.sleep(delay)
+        return total
+
+
+@register_metric_class
+class MultiServiceApi(CollectingtonApi):
+    """A service class that is shared by every service of the multi service config."""
+
+    @register_metric("first_metric")
+    def get_first_metric(self):
+        """Return a constant."""
+        return 1
+
+
+@register_metric_class
+class AsyncMultiServiceApi(AsyncCollectingtonApi):
+    """An async service class for the services of the multi service config."""
+
+    @register_metric("first_metric")
+    async def get_first_metric(self):
+        """Return a constant."""
+        return 1
+
+
+class TestCreateServiceRunners(unittest.TestCase):
+    """Test that many services can be set up in a single process."""
+
+    def test_services_are_grouped_by_port(self):
+        """Test that services sharing a port share a registry and get their own schedule."""
+        service_names = ["first", "second", "third"]
+
+        service_runners, registries = create_service_runners(
+            MULTI_SERVICE_CONFIG, service_names
+        )
+
+        self.assertEqual(sorted(registries), [8000, 8001])
+        self.assertIs(registries[8000], REGISTRY)
+        self.assertIsNot(registries[8001], REGISTRY)
+        self.assertIs(service_runners[0].service.registry, registries[8000])
+        self.assertIs(service_runners[1].service.registry, registries[8000])
+        self.assertIs(service_runners[2].service.registry, registries[8001])
+        self.assertEqual([runner.interval for runner in service_runners], [60, 5, 60])
+        self.assertEqual(
+            [runner.service.service_name for runner in service_runners], service_names
+        )
+
+        for service_runner in service_runners:
+            for p_instance in service_runner.metric_instances_list:
+                service_runner.service.registry.unregister(p_instance)
+
+    def test_unknown_service(self):
+        """Ensure a service that is not in the config raises a ValueError."""
+        with self.assertRaises(ValueError):
+            create_service_runners(MULTI_SERVICE_CONFIG, ["missing"])
+
+    def test_async_service_needs_async_engine(self):
+        """Ensure an async service under the threaded engine raises a ValueError."""
+        config = copy.deepcopy(MULTI_SERVICE_CONFIG)
+        config["services"]["first"]["service_class"] = "AsyncMultiServiceApi"
+
+        with self.assertRaises(ValueError):
+            ServiceRunner(config, "first", CollectorRegistry())
+
+
+@register_metric_class
+class CpuBoundApi(CollectingtonApi):
+    """A service whose metrics are computed from a fixed datastore."""
+
+    def __init__(self):
+        super().__init__()
+        self.service_name = "cpu_bound"
+        self.registry = CollectorRegistry()
+        self.datastore = {"durations": [1, 2, 3, 6]}
+        self.published = []
+
+    def get_data_from_store(self, name_of_datastore):
+        """Return the fixed datastore."""
+        return self.datastore
+
+    def publish_metric_values(self, metric_values, list_of_metric_instances):
+        """Record every publish."""
+        self.published.append(metric_values)
+
+    @datastore_view("durations")
+    def durations(self, response):
+        """Return the durations of the datastore."""
+        return response["durations"]
+
+    @register_metric("total_duration")
+    @enable_delta_metric
+    @cpu_bound("durations")
+    def get_total_duration(self):
+        """Return the sum of the durations."""
+        return sum(self.durations())
+
+    @register_metric("longest_duration")
+    @cpu_bound("durations")
+    def get_longest_duration(self):
+        """Return the longest duration."""
+        return max(self.durations())
+
+    @register_metric("number_of_durations")
+    def get_number_of_durations(self):
+        """Return the number of durations, in the service process."""
+        return len(self.datastore["durations"])
+
+
+class TestProcessPool(unittest.TestCase):
+    """Test that CPU-bound metrics are evaluated in a process pool."""
+
+    def test_cpu_bound_metrics_are_merged(self):
+        """Test that pool results and delta metrics are published with the others."""
+        service = CpuBoundApi()
+        metrics_list = ["total_duration", "longest_duration", "number_of_durations"]
+        process_pool = create_process_pool({"execution": {"process_workers": 2}})
+
+        with process_pool:
+            process_request(service, metrics_list, [], process_pool=process_pool)
+            service.datastore = {"durations": [1, 2, 3, 6, 8]}
+            process_request(service, metrics_list, [], process_pool=process_pool)
+
+        self.assertEqual(
+            service.published,
+            [
+                {"total_duration": 12, "longest_duration": 6, "number_of_durations": 4},
+                {"total_duration": 8, "longest_duration": 8, "number_of_durations": 5},
+            ],
+        )
+
+
+class TestReload(unittest.TestCase):
+    """Test that a service is reloaded without losing the series that did not change."""
+
+    def test_only_changed_metrics_are_replaced(self):
+        """Test that a metric that changed type is replaced and the others are kept."""
+        config = copy.deepcopy(MULTI_SERVICE_CONFIG)
+        config["services"]["first"]["prometheus_metrics_mapping"] = {
+            "gauge": ["first_metric", "other_metric"]
+        }
+        registry = CollectorRegistry()
+        service_runner = ServiceRunner(config, "first", registry)
+        service_runner.process()
+
+        new_config = copy.deepcopy(config)
+        new_config["services"]["first"]["api_call_intervals"] = 30
+        new_config["services"]["first"]["prometheus_metrics_mapping"] = {
+            "gauge": ["first_metric"],
+            "counter": ["other_metric"],
+        }
+
+        self.assertTrue(service_runner.reload(new_config))
+        self.assertEqual(service_runner.interval, 30)
+        self.assertEqual(registry.get_sample_value("first_metric"), 1)
+        self.assertIsNone(registry.get_sample_value("other_metric"))
+        self.assertEqual(registry.get_sample_value("other_metric_total"), 0)
+        self.assertFalse(service_runner.reload(copy.deepcopy(new_config)))
+
+    def test_changed_datastores_are_reset_with_the_cache(self):
+        """Test that datastores that changed are reset when the cache changed too."""
+        config = copy.deepcopy(MULTI_SERVICE_CONFIG)
+        config["services"]["first"]["datastores"] = {"incidents": {}, "totals": {}}
+        service_runner = ServiceRunner(config, "first", CollectorRegistry())
+        service = service_runner.service
+        service._incremental_datastores = {"incidents": object(), "totals": object()}
+
+        new_config = copy.deepcopy(config)
+        new_config["services"]["first"]["cache"] = {"ttl": 30}
+        new_config["services"]["first"]["datastores"]["incidents"] = {"ttl": 10}
+        service_runner.reload(new_config)
+
+        self.assertEqual(list(service._incremental_datastores), ["totals"])
+        self.assertIsNone(service.data_store)
+
+
+class TestScrapeCollection(unittest.TestCase):
+    """Test that a service collected on scrape runs a cycle on every scrape."""
+
+    def test_cycle_runs_on_scrape(self):
+        """Test that nothing is evaluated until the registry is collected."""
+        config = copy.deepcopy(MULTI_SERVICE_CONFIG)
+        config["services"]["first"]["collection"] = "scrape"
+        registry = CollectorRegistry()
+        service_runner = ServiceRunner(config, "first", registry)
+        scheduler = Scheduler()
+        schedule_service_runner(scheduler, service_runner)
+
+        self.assertEqual(service_runner.jobs, [])
+        self.assertEqual(scheduler.jobs, [])
+
+        # every read of the registry is a scrape
+        self.assertEqual(registry.get_sample_value("first_metric"), 1)
+        self.assertEqual(
+            registry.get_sample_value(
+                "collectington_cycle_duration_seconds_count", {"service": "first"}
+            ),
+            2,
+        )
+
+        service_runner.stop()
+        self.assertIsNone(registry.get_sample_value("first_metric"))
+
+
+class TestRun(unittest.TestCase):
+    """Test that a failing cycle does not stop the process."""
+
+    def test_failing_cycle_is_counted(self):
+        """Test that an error in a cycle is counted instead of exiting."""
+        registry = CollectorRegistry()
+        service_runner = ServiceRunner(MULTI_SERVICE_CONFIG, "first", registry)
+
+        def process():
+            raise RuntimeError("Cycle failed")
+
+        service_runner.process = process
+        run(service_runner)
+
+        self.assertEqual(
+            registry.get_sample_value(
+                "collectington_errors_total",
+                {"service": "first", "stage": "cycle", "error": "RuntimeError"},
+            ),
+            1,
+        )
+
+    def test_cycle_with_failing_metric_is_not_successful(self):
+        """Test that only a cycle publishing every metric is a successful cycle."""
+        registry = CollectorRegistry()
+        service_runner = ServiceRunner(MULTI_SERVICE_CONFIG, "first", registry)
+        get_metric = service_runner.service.get_metric
+
+        def fail(metric, defer_delta=False):
+            raise RuntimeError("Upstream failed")
+
+        service_runner.service.get_metric = fail
+        service_runner.process()
+
+        self.assertIsNone(
+            registry.get_sample_value(
+                "collectington_last_successful_cycle_timestamp_seconds",
+                {"service": "first"},
+            )
+        )
+        self.assertEqual(
+            registry.get_sample_value(
+                "collectington_cycle_duration_seconds_count", {"service": "first"}
+            ),
+            1,
+        )
+
+        service_runner.service.get_metric = get_metric
+        service_runner.process()
+
+        self.assertIsNotNone(
+            registry.get_sample_value(
+                "collectington_last_successful_cycle_timestamp_seconds",
+                {"service": "first"},
+            )
+        )
+
+    def test_failing_checkpoint_is_counted(self):
+        """Test that a state that cannot be saved is counted instead of raising."""
+        registry = CollectorRegistry()
+        service_runner = ServiceRunner(MULTI_SERVICE_CONFIG, "first", registry)
+        service_runner.get_state = lambda: {"delta_metrics": {"total": Decimal(1)}}
+
+        with tempfile.TemporaryDirectory() as directory:
+            state_store = create_state_store(
+                {"path": os.path.join(directory, "state.json"), "backend": "file"}
+            )
+            checkpoint_state(state_store, [service_runner])
+
+        self.assertEqual(
+            registry.get_sample_value(
+                "collectington_errors_total",
+                {"service": "first", "stage": "checkpoint", "error": "TypeError"},
+            ),
+            1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
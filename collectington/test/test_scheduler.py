@@ -0,0 +1,75 @@
+"""Test that the scheduler is operating as expected."""
+import time
+import unittest
+
+from collectington.scheduler import Job, Scheduler
+
+
+class TestJob(unittest.TestCase):
+    """Test that job ticks are on fixed boundaries."""
+
+    def test_next_tick_is_on_boundary(self):
+        """Test that ticks are aligned on the interval, shifted by the job offset."""
+        job = Job("job", 60, lambda: None)
+        job.offset = 5
+
+        self.assertEqual(job.next_tick(1000), 1025)
+        self.assertEqual(job.next_tick(1025), 1085)
+
+    def test_jitter_is_bounded(self):
+        """Test that the offset never exceeds the jitter or the interval."""
+        self.assertLessEqual(Job("job", 60, lambda: None, jitter=2).offset, 2)
+        self.assertLessEqual(Job("job", 1, lambda: None, jitter=30).offset, 1)
+
+    def test_missed_ticks_are_skipped(self):
+        """Test that an overrun skips the missed ticks and counts them."""
+        job = Job("job", 10, lambda: None)
+
+        self.assertEqual(job.count_skipped_ticks(100, 110), 0)
+        self.assertEqual(job.count_skipped_ticks(110, 140), 2)
+        self.assertEqual(job.skipped_ticks, 2)
+
+
+class TestScheduler(unittest.TestCase):
+    """Test that jobs run on their schedule."""
+
+    def test_slow_job_does_not_drift(self):
+        """Test that the processing time is not added to the interval."""
+        runs = []
+
+        def slow_job():
+            runs.append(time.time())
+            time.sleep(0.1)
+
+        scheduler = Scheduler()
+        scheduler.add_job("slow", 0.2, slow_job)
+        scheduler.start()
+        time.sleep(0.95)
+        scheduler.stop()
+
+        # runs once at start, then on every 0.2 second boundary
+        self.assertGreaterEqual(len(runs), 5)
+        for previous, current in zip(runs[1:], runs[2:]):
+            self.assertAlmostEqual(current - previous, 0.2, delta=0.05)
+
+    def test_jobs_change_while_running(self):
+        """Test that a job added to a running scheduler starts and a removed one stops."""
+        runs = []
+
+        scheduler = Scheduler()
+        scheduler.start()
+        job = scheduler.add_job("job", 0.1, lambda: runs.append(time.time()))
+        time.sleep(0.25)
+        scheduler.remove_job(job)
+        time.sleep(0.15)
+        count = len(runs)
+        time.sleep(0.2)
+        scheduler.stop()
+
+        self.assertGreaterEqual(count, 2)
+        self.assertEqual(len(runs), count)
+        self.assertEqual(scheduler.jobs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
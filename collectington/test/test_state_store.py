@@ -0,0 +1,49 @@
+"""Test that the state of services is saved as expected."""
+import os
+import tempfile
+import unittest
+
+from collectington.state_store import create_state_store
+
+
+class TestStateStore(unittest.TestCase):
+    """Test that every backend saves and loads the state of services."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_backend(self, backend):
+        """Test that a backend merges the state of services."""
+        path = os.path.join(self.directory.name, f"state.{backend}")
+        state_store = create_state_store({"path": path, "backend": backend})
+
+        self.assertEqual(state_store.load(), {})
+
+        state_store.save({"first": {"delta_metrics": {"total": 1}}})
+        state_store.save({"second": {"delta_metrics": {"total": 2}}})
+        state_store.save({"first": {"delta_metrics": {"total": 3}}})
+
+        self.assertEqual(
+            create_state_store({"path": path, "backend": backend}).load(),
+            {
+                "first": {"delta_metrics": {"total": 3}},
+                "second": {"delta_metrics": {"total": 2}},
+            },
+        )
+
+    def test_file_backend(self):
+        """Test the JSON file backend, which leaves no temporary file behind."""
+        self.check_backend("file")
+
+        self.assertEqual(os.listdir(self.directory.name), ["state.file"])
+
+    def test_sqlite_backend(self):
+        """Test the SQLite backend."""
+        self.check_backend("sqlite")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Test that the HTTP transport is operating as expected."""
+import unittest
+
+from collectington.transport import HttpTransport, DEFAULT_TRANSPORT_CONFIG
+
+
+class TestHttpTransport(unittest.TestCase):
+    """Test that the transport is set up from config correctly."""
+
+    def test_from_config_uses_defaults(self):
+        """Test that missing fields fall back to the default transport config."""
+        transport = HttpTransport.from_config(None)
+
+        self.assertEqual(
+            transport.timeout,
+            (
+                DEFAULT_TRANSPORT_CONFIG["connect_timeout"],
+                DEFAULT_TRANSPORT_CONFIG["read_timeout"],
+            ),
+        )
+        self.assertEqual(transport.session.headers["Accept-Encoding"], "gzip, deflate")
+
+    def test_from_config_overrides(self):
+        """Test that the pool, timeouts, retries and gzip are read from config."""
+        transport = HttpTransport.from_config(
+            {"pool_size": 3, "read_timeout": 10, "retries": 1, "gzip": False}
+        )
+        adapter = transport.session.get_adapter("https://example.com")
+
+        self.assertEqual(transport.timeout[1], 10)
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertEqual(adapter.max_retries.total, 1)
+        self.assertIn("GET", adapter.max_retries.allowed_methods)
+        self.assertEqual(transport.session.headers["Accept-Encoding"], "identity")
+
+    def test_retries_do_not_wait_for_retry_after(self):
+        """Test that a Retry-After header never makes a retry sleep inline."""
+        retry = (
+            HttpTransport.from_config(None)
+            .session.get_adapter("https://example.com")
+            .max_retries
+        )
+
+        self.assertFalse(retry.respect_retry_after_header)
+        self.assertIn(503, retry.status_forcelist)
+
+    def test_rate_limited_transport_leaves_throttling_to_the_governor(self):
+        """Test that throttled responses are neither retried nor waited for."""
+        retry = (
+            HttpTransport.from_config(None, rate_limited=True)
+            .session.get_adapter("https://example.com")
+            .max_retries
+        )
+
+        self.assertFalse(retry.respect_retry_after_header)
+        self.assertNotIn(503, retry.status_forcelist)
+        self.assertNotIn(429, retry.status_forcelist)
+        self.assertIn(502, retry.status_forcelist)
+
+
+if __name__ == "__main__":
+    unittest.main()
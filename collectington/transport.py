@@ -0,0 +1,104 @@
+"""Module that defines how API data is requested over HTTP."""
+import requests
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TRANSPORT_CONFIG = {
+    "pool_size": 10,
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    "retries": 3,
+    "backoff_factor": 0.5,
+    "gzip": True,
+}
+
+# Only server side errors are retried, the request is considered failed otherwise
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Statuses an API throttles with, left to the request governor of rate limited services
+THROTTLED_STATUS_CODES = (429, 503)
+
+
+class HttpTransport:
+    """
+    A pooled, keep-alive HTTP transport that is owned by a single service.
+
+    Every request goes through the same requests.Session so TCP and TLS connections
+    are reused between polls instead of being set up again for every API call.
+
+    The transport is pluggable: any object with a `get(url, params, headers)` method that
+    returns a requests.Response-like object and a `close()` method can be assigned to
+    `CollectingtonApi.transport`.
+
+    Retries never sleep for the Retry-After header of a response, which could block the
+    worker for as long as the API asks: they only back off by `backoff_factor`. A
+    `rate_limited` transport does not retry throttled responses either, they are
+    returned right away so the request governor can back off without blocking the
+    worker.
+    """
+
+    def __init__(
+        self,
+        pool_size=DEFAULT_TRANSPORT_CONFIG["pool_size"],
+        connect_timeout=DEFAULT_TRANSPORT_CONFIG["connect_timeout"],
+        read_timeout=DEFAULT_TRANSPORT_CONFIG["read_timeout"],
+        retries=DEFAULT_TRANSPORT_CONFIG["retries"],
+        backoff_factor=DEFAULT_TRANSPORT_CONFIG["backoff_factor"],
+        gzip=DEFAULT_TRANSPORT_CONFIG["gzip"],
+        rate_limited=False,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+
+        status_codes = RETRY_STATUS_CODES
+        if rate_limited:
+            status_codes = tuple(
+                status_code
+                for status_code in RETRY_STATUS_CODES
+                if status_code not in THROTTLED_STATUS_CODES
+            )
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_codes,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept-Encoding"] = (
+            "gzip, deflate" if gzip else "identity"
+        )
+
+    @classmethod
+    def from_config(cls, transport_config, rate_limited=False):
+        """
+        Create a transport from the `transport` block of a service config. A service
+        with a `rate_limit` block has a rate_limited transport.
+        """
+        options = {**DEFAULT_TRANSPORT_CONFIG, **(transport_config or {})}
+
+        return cls(**options, rate_limited=rate_limited)
+
+    def get(self, url, params=None, headers=None, stream=False):
+        """
+        Send an idempotent GET request using the pooled session. A streamed response
+        body is only downloaded as it is read.
+        """
+        return self.session.get(
+            url, params=params, headers=headers, timeout=self.timeout, stream=stream
+        )
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
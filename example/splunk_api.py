@@ -1,12 +1,12 @@
 import os
 import requests
-import datetime
-import statistics
 
 from utils import *
 from collectington.config import *
+from collectington.helpers import RunningMean, minutes_between
 from collectington.collectington_api import (
     CollectingtonApi,
+    datastore_view,
     enable_delta_metric,
     register_metric_class,
     register_metric,
@@ -52,6 +52,8 @@ class SplunkApi(CollectingtonApi):
             "X-VO-Api-Id": self.api_id,
         }
 
+        # the window of both datastores, splunk_datastore is then read from its latest
+        # incident while splunk_transitions reads the whole window again, see config.json
         self.params = {"startedAfter": get_iso_timestamp_x_min_ago(1)}
         self.name_of_datastore = "splunk_datastore"
 
@@ -114,80 +116,69 @@ class SplunkApi(CollectingtonApi):
 
         return time_triggered_dict, time_acknowledged_dict, time_resolved_dict
 
-    def calculate_time_diff_in_min(self, list_of_time_tuples):
-        list_of_time_diff = []
-
-        for time_1, time_2 in list_of_time_tuples:
-            t1 = datetime.strptime(time_1, "%Y-%m-%dT%H:%M:%S%z")
-            t2 = datetime.strptime(time_2, "%Y-%m-%dT%H:%M:%S%z")
-
-            time_diff = (t2 - t1).total_seconds() / 60
-
-            list_of_time_diff.append(time_diff)
-
-        return list_of_time_diff
-
-    def create_list_of_time_diff(self, time_triggered_dict, event_action_dict):
-        list_of_triggered_and_actioned_events = []
+    @datastore_view("splunk_transitions")
+    def transitions(self, response):
+        """
+        The transitions of every incident, shared by every metric that needs them.
+        This is only computed again when the datastore is refreshed.
 
-        for alert_id, triggered_time in time_triggered_dict.items():
-            if alert_id in event_action_dict:
-                list_of_triggered_and_actioned_events.append(
-                    (triggered_time, event_action_dict[alert_id])
-                )
+        Incidents are acknowledged and resolved after they are first read, so their
+        transitions are read again from a datastore that is not incremental.
+        """
+        return self.create_transitions_dict(response)
 
-        list_of_time_diff = self.calculate_time_diff_in_min(
-            list_of_triggered_and_actioned_events
+    def calculate_mean_time_diff_in_min(self, time_triggered_dict, event_action_dict):
+        """
+        The timestamps are parsed once however many cycles their incidents are returned
+        for, and the mean is computed without building a list of time differences.
+        """
+        mean_time_diff = RunningMean()
+        mean_time_diff.update(
+            minutes_between(triggered_time, event_action_dict[alert_id])
+            for alert_id, triggered_time in time_triggered_dict.items()
+            if alert_id in event_action_dict
         )
 
-        return list_of_time_diff
+        return mean_time_diff.mean
 
     @register_metric("number_of_incidents")
     @enable_delta_metric
     def get_number_of_incidents(self):
-        self.params = {}  # override params to get all time total figure
+        # only the incidents after the latest one are requested, see config.json
+        self.get_data_from_store(self.name_of_datastore)
 
-        response = self.get_data_from_store(self.name_of_datastore)
-        total_incidents = response["total"]
-
-        return total_incidents
+        return self.get_incremental_datastore(self.name_of_datastore).records_seen
 
     @register_metric("time_taken_to_resolve")
     def get_time_taken_to_resolve(self):
-        response = self.get_data_from_store(self.name_of_datastore)
-        list_of_time_triggered_and_resolved = []
-
         (
             time_triggered_dict,
             time_acknowledged_dict,
             time_resolved_dict,
-        ) = self.create_transitions_dict(response)
+        ) = self.transitions()
 
-        list_of_time_diff = self.create_list_of_time_diff(
+        mean_time_diff = self.calculate_mean_time_diff_in_min(
             time_triggered_dict, time_resolved_dict
         )
 
-        if not list_of_time_diff:
+        if mean_time_diff is None:
             return None
 
-        return int(statistics.mean(list_of_time_diff))
+        return int(mean_time_diff)
 
     @register_metric("time_taken_to_acknowledge")
     def get_time_taken_to_acknowledge(self):
-        response = self.get_data_from_store(self.name_of_datastore)
-        list_of_time_triggered_and_acknowledged = []
-
         (
             time_triggered_dict,
             time_acknowledged_dict,
             time_resolved_dict,
-        ) = self.create_transitions_dict(response)
+        ) = self.transitions()
 
-        list_of_time_diff = self.create_list_of_time_diff(
+        mean_time_diff = self.calculate_mean_time_diff_in_min(
             time_triggered_dict, time_acknowledged_dict
         )
 
-        if not list_of_time_diff:
+        if mean_time_diff is None:
             return None
 
-        return int(statistics.mean(list_of_time_diff))
+        return int(mean_time_diff)
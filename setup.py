@@ -9,8 +9,9 @@ with open(path.join(this_directory, 'README.md'), encoding='utf-8') as f:
 
 setup(
     name="collectington",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks"]),
     install_requires=["prometheus-client", "termcolor", "pyfiglet", "requests"],
+    extras_require={"async": ["aiohttp"], "stream": ["ijson"], "fast": ["orjson"]},
     scripts=["cton"],
     license="MIT",
     version="0.1.4",
@@ -24,7 +25,11 @@ setup(
     package_dir={"collectington": "collectington"},
     classifiers=[
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "License :: OSI Approved :: MIT License",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.9",
 )